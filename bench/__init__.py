@@ -0,0 +1 @@
+"""Benchmarks for the Monkey interpreter; run ``python -m bench --help``."""
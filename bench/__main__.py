@@ -0,0 +1,174 @@
+import argparse
+import dataclasses
+import json
+import sys
+from typing import List, Optional
+from monkey import engine
+from . import generator
+from . import runner
+from . import scaling
+from . import workloads
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argparser = argparse.ArgumentParser(
+        prog="python -m bench", description="Monkey interpreter benchmarks"
+    )
+    commands = argparser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run benchmarks and write JSON results")
+    run.add_argument("-o", "--output", help="write results to this file")
+    run.add_argument(
+        "--engine",
+        action="append",
+        choices=sorted(engine.ENGINES),
+        help="engine for macro benchmarks, may be repeated (default: all)",
+    )
+    run.add_argument("--repeat", type=int, default=10, help="samples per benchmark")
+    run.add_argument("--warmup", type=int, default=1, help="untimed runs first")
+    run.add_argument("--scale", type=int, default=1, help="workload size factor")
+    run.add_argument(
+        "-k", "--filter", default="", help="only benchmarks whose name contains this"
+    )
+    run.add_argument(
+        "--only", choices=["micro", "macro"], help="run one kind of workload"
+    )
+
+    cmp = commands.add_parser("compare", help="compare two result files")
+    cmp.add_argument("base")
+    cmp.add_argument("new")
+    cmp.add_argument(
+        "--alpha", type=float, default=0.05, help="significance level (0.05)"
+    )
+    cmp.add_argument(
+        "--threshold",
+        type=float,
+        default=0.05,
+        help="ignore median changes smaller than this fraction (0.05)",
+    )
+
+    gen = commands.add_parser("generate", help="write a generated Monkey program")
+    _add_shape_arguments(gen)
+    gen.add_argument("--statements", type=int, default=100)
+    gen.add_argument("-o", "--output", help="write the program to this file")
+
+    scl = commands.add_parser(
+        "scale", help="tabulate time and peak memory per phase against size"
+    )
+    _add_shape_arguments(scl)
+    scl.add_argument(
+        "--sizes",
+        default="250,500,1000,2000,4000",
+        help="comma-separated statement counts (%(default)s)",
+    )
+    scl.add_argument(
+        "--engine",
+        choices=sorted(engine.ENGINES),
+        default=engine.DEFAULT_ENGINE,
+        help="engine for the eval phase (default: %(default)s)",
+    )
+    scl.add_argument("--json", help="also write the measurements to this file")
+
+    args = argparser.parse_args(argv)
+    if args.command == "run":
+        return _run(args)
+    elif args.command == "generate":
+        return _generate(args)
+    elif args.command == "scale":
+        return _scale(args)
+    return _compare(args)
+
+
+def _add_shape_arguments(argparser: argparse.ArgumentParser) -> None:
+    defaults = generator.Shape()
+    argparser.add_argument("--seed", type=int, default=defaults.seed)
+    argparser.add_argument(
+        "--depth",
+        type=int,
+        default=defaults.expression_depth,
+        help="maximum expression depth",
+    )
+    argparser.add_argument(
+        "--nesting",
+        type=int,
+        default=defaults.function_nesting,
+        help="maximum function nesting",
+    )
+    argparser.add_argument(
+        "--identifiers",
+        type=int,
+        default=defaults.identifiers,
+        help="distinct top-level variable names",
+    )
+    argparser.add_argument(
+        "--fanout",
+        type=int,
+        default=defaults.call_fanout,
+        help="maximum calls per function body",
+    )
+
+
+def _shape(args: argparse.Namespace, statements: int) -> generator.Shape:
+    return generator.Shape(
+        statements=statements,
+        expression_depth=args.depth,
+        function_nesting=args.nesting,
+        identifiers=args.identifiers,
+        call_fanout=args.fanout,
+        seed=args.seed,
+    )
+
+
+def _run(args: argparse.Namespace) -> int:
+    engines = args.engine or list(engine.ENGINES)
+    benchmarks: List[workloads.Benchmark] = []
+    if args.only != "macro":
+        benchmarks.extend(workloads.micro(args.scale))
+    if args.only != "micro":
+        benchmarks.extend(workloads.macro(engines, args.scale))
+    benchmarks = [b for b in benchmarks if args.filter in b.name]
+
+    results = runner.run(benchmarks, args.repeat, args.warmup, sys.stdout)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+def _generate(args: argparse.Namespace) -> int:
+    source = generator.generate(_shape(args, args.statements))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(source)
+    else:
+        sys.stdout.write(source)
+    return 0
+
+
+def _scale(args: argparse.Namespace) -> int:
+    sizes = [int(size) for size in args.sizes.split(",")]
+    rows = scaling.scale(sizes, _shape(args, sizes[0]), args.engine, sys.stderr)
+    print(scaling.format_table(rows))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([dataclasses.asdict(row) for row in rows], f, indent=2)
+    return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    comparisons = runner.compare(base, new, args.alpha, args.threshold)
+    for comparison in comparisons:
+        print(comparison)
+    regressions = [c for c in comparisons if c.regression]
+    if regressions:
+        print(f"{len(regressions)} significant regression(s)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
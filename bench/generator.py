@@ -0,0 +1,184 @@
+import dataclasses
+import random
+from typing import List, Optional
+
+
+@dataclasses.dataclass(frozen=True)
+class Shape:
+    """Size and shape of a generated program.
+
+    ``statements`` counts top-level statements only. ``expression_depth``
+    bounds the nesting of operators, ifs and calls in one expression,
+    ``function_nesting`` how deep function literals may nest, and
+    ``identifiers`` how many distinct variable names are used. At most
+    ``call_fanout`` calls are made from one function body, and
+    ``call_budget`` caps the number of calls any single call may cause, so
+    evaluation time stays proportional to program size.
+    """
+
+    statements: int = 100
+    expression_depth: int = 3
+    function_nesting: int = 2
+    identifiers: int = 26
+    call_fanout: int = 2
+    call_budget: int = 50
+    seed: int = 0
+
+
+class _Function:
+    __slots__ = ("name", "arity", "cost")
+
+    def __init__(self, name: str, arity: int, cost: int) -> None:
+        self.name = name
+        self.arity = arity
+        self.cost = cost
+
+
+class _Scope:
+    """Integer variables and functions visible at one point."""
+
+    variables: List[str]
+    functions: List[_Function]
+
+    def __init__(self, outer: Optional["_Scope"] = None) -> None:
+        self.variables = list(outer.variables) if outer else []
+        self.functions = list(outer.functions) if outer else []
+
+
+class Generator:
+    """Emits valid Monkey programs that evaluate to an integer without errors.
+
+    Output depends only on the shape, ``seed`` included. Every value is an
+    integer, division is by non-zero literals only and functions call only
+    functions defined before them, so programs always terminate.
+    """
+
+    shape: Shape
+    _random: random.Random
+    _names: List[str]
+    _function_count: int
+    _local_count: int
+    _calls_left: int
+    _cost: int
+
+    def __init__(self, shape: Shape) -> None:
+        self.shape = shape
+        self._random = random.Random(shape.seed)
+        self._names = [_name("v", i) for i in range(max(1, shape.identifiers))]
+        self._function_count = 0
+        self._local_count = 0
+        self._calls_left = 0
+        self._cost = 0
+
+    def program(self) -> str:
+        scope = _Scope()
+        lines = []
+        for _ in range(max(0, self.shape.statements - 1)):
+            lines.append(self._statement(scope, 0))
+        lines.append(self._expression(scope, self.shape.expression_depth) + ";")
+        return "\n".join(lines) + "\n"
+
+    def _statement(self, scope: _Scope, nesting: int) -> str:
+        roll = self._random.random()
+        if roll < 0.3 and nesting < self.shape.function_nesting:
+            return self._function_statement(scope, nesting)
+        if roll < 0.8 or not scope.variables:
+            if nesting:
+                # Locals get fresh names: code in a function that runs before
+                # a local ``let`` would otherwise see different bindings in
+                # the dynamic and the slot-resolved engines.
+                name = _name("l", self._local_count)
+                self._local_count += 1
+            else:
+                name = self._random.choice(self._names)
+            value = self._expression(scope, self.shape.expression_depth)
+            if name not in scope.variables:
+                scope.variables.append(name)
+            return f"let {name} = {value};"
+        return self._expression(scope, self.shape.expression_depth) + ";"
+
+    def _function_statement(self, scope: _Scope, nesting: int) -> str:
+        name = _name("f", self._function_count)
+        self._function_count += 1
+        arity = self._random.randint(0, 3)
+        inner = _Scope(scope)
+        params = [_name("p", i) for i in range(arity)]
+        for param in params:
+            if param not in inner.variables:
+                inner.variables.append(param)
+
+        calls_left, cost = self._calls_left, self._cost
+        self._calls_left = self.shape.call_fanout
+        self._cost = 1
+        body = [
+            self._statement(inner, nesting + 1)
+            for _ in range(self._random.randint(0, 2))
+        ]
+        body.append(self._expression(inner, self.shape.expression_depth))
+        function = _Function(name, arity, self._cost)
+        self._calls_left, self._cost = calls_left, cost
+
+        scope.functions.append(function)
+        return f"let {name} = fn({', '.join(params)}) {{ {' '.join(body)} }};"
+
+    def _expression(self, scope: _Scope, depth: int) -> str:
+        if depth <= 0 or self._random.random() < 0.25:
+            return self._leaf(scope)
+        roll = self._random.random()
+        if roll < 0.25:
+            callee = self._callee(scope)
+            if callee is not None:
+                args = [self._expression(scope, depth - 1) for _ in range(callee.arity)]
+                return f"{callee.name}({', '.join(args)})"
+        if roll < 0.4:
+            left = self._expression(scope, depth - 1)
+            right = self._expression(scope, depth - 1)
+            op = self._random.choice(["<", ">", "==", "!="])
+            then = self._expression(scope, depth - 1)
+            otherwise = self._expression(scope, depth - 1)
+            return f"if ({left} {op} {right}) {{ {then} }} else {{ {otherwise} }}"
+        if roll < 0.45:
+            return f"-{self._expression(scope, depth - 1)}"
+        left = self._expression(scope, depth - 1)
+        op = self._random.choice(["+", "-", "+", "-", "*", "/"])
+        if op in ("*", "/"):
+            # Literal right operands keep values small and divisors non-zero.
+            return f"({left} {op} {self._random.randint(1, 9)})"
+        return f"({left} {op} {self._expression(scope, depth - 1)})"
+
+    def _leaf(self, scope: _Scope) -> str:
+        if scope.variables and self._random.random() < 0.6:
+            return self._random.choice(scope.variables)
+        return str(self._random.randint(0, 99))
+
+    def _callee(self, scope: _Scope) -> Optional[_Function]:
+        if self._calls_left <= 0 and self._cost > 0:
+            return None
+        affordable = [
+            f
+            for f in scope.functions[-8:]
+            if self._cost + f.cost <= self.shape.call_budget
+        ]
+        if not affordable:
+            return None
+        callee = self._random.choice(affordable)
+        if self._cost > 0:
+            # Inside a function body: account for what this call runs.
+            self._calls_left -= 1
+            self._cost += callee.cost
+        return callee
+
+
+def generate(shape: Shape) -> str:
+    """Returns the source of a program of the given shape."""
+    return Generator(shape).program()
+
+
+def _name(prefix: str, n: int) -> str:
+    # Monkey identifiers are letters and underscores only.
+    letters = ""
+    while True:
+        letters = chr(ord("a") + n % 26) + letters
+        n //= 26
+        if n == 0:
+            return f"{prefix}_{letters}"
@@ -0,0 +1,198 @@
+import datetime
+import gc
+import math
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .workloads import Benchmark
+
+FORMAT_VERSION = 1
+
+# Each sample repeats the workload until it takes at least this long, so
+# that timer resolution and call overhead do not dominate fast workloads.
+MIN_SAMPLE_TIME = 0.005
+
+
+def run(
+    benchmarks: Sequence[Benchmark],
+    repeat: int = 10,
+    warmup: int = 1,
+    progress: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """Times every benchmark and returns the JSON-ready results.
+
+    Each benchmark gets ``warmup`` untimed runs and then ``repeat`` samples.
+    A sample is the mean time of one call over ``loops`` calls.
+    """
+    results: Dict[str, Any] = {}
+    for bench in benchmarks:
+        fn = bench.setup()
+        for _ in range(warmup):
+            fn()
+        loops = _calibrate(fn)
+        times = []
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            times.append((time.perf_counter() - start) / loops)
+        results[bench.name] = {
+            "engine": bench.engine,
+            "loops": loops,
+            "times": times,
+        }
+        if progress is not None:
+            print(format_row(bench.name, times), file=progress)
+    return {
+        "version": FORMAT_VERSION,
+        "python": sys.version,
+        "platform": platform.platform(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "benchmarks": results,
+    }
+
+
+def _calibrate(fn: Any) -> int:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= MIN_SAMPLE_TIME:
+            return loops
+        loops *= 2
+
+
+def format_row(name: str, times: Sequence[float]) -> str:
+    median = statistics.median(times)
+    spread = statistics.stdev(times) / median if len(times) > 1 and median else 0.0
+    return f"{name:<36} {_format_time(median):>10} +- {spread:6.1%}"
+
+
+def _format_time(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+class Comparison:
+    """How one benchmark changed between two result files."""
+
+    name: str
+    base: float
+    new: float
+    p_value: float
+    significant: bool
+
+    def __init__(
+        self, name: str, base: float, new: float, p_value: float, significant: bool
+    ) -> None:
+        self.name = name
+        self.base = base
+        self.new = new
+        self.p_value = p_value
+        self.significant = significant
+
+    @property
+    def change(self) -> float:
+        """Relative change of the median; positive means slower."""
+        return self.new / self.base - 1
+
+    @property
+    def regression(self) -> bool:
+        return self.significant and self.change > 0
+
+    def __str__(self) -> str:
+        if not self.significant:
+            verdict = "not significant"
+        elif self.change > 0:
+            verdict = "SLOWER"
+        else:
+            verdict = "faster"
+        return (
+            f"{self.name:<36} {_format_time(self.base):>10} -> "
+            f"{_format_time(self.new):>10} {self.change:+7.1%}  "
+            f"p={self.p_value:.3f}  {verdict}"
+        )
+
+
+def compare(
+    base: Dict[str, Any],
+    new: Dict[str, Any],
+    alpha: float = 0.05,
+    threshold: float = 0.05,
+) -> List[Comparison]:
+    """Compares the benchmarks present in both result sets.
+
+    A change counts as significant when a two-sided Mann-Whitney U test
+    rejects equal distributions at level ``alpha`` and the medians differ by
+    more than ``threshold``, so that tiny but consistent shifts are not
+    reported.
+    """
+    comparisons = []
+    base_results = base["benchmarks"]
+    new_results = new["benchmarks"]
+    for name in base_results:
+        if name not in new_results:
+            continue
+        before = base_results[name]["times"]
+        after = new_results[name]["times"]
+        base_median = statistics.median(before)
+        new_median = statistics.median(after)
+        p_value = mann_whitney_u(before, after)
+        change = abs(new_median / base_median - 1)
+        significant = p_value < alpha and change > threshold
+        comparisons.append(
+            Comparison(name, base_median, new_median, p_value, significant)
+        )
+    return comparisons
+
+
+def mann_whitney_u(xs: Sequence[float], ys: Sequence[float]) -> float:
+    """Two-sided p-value of the Mann-Whitney U test.
+
+    Uses the normal approximation with tie and continuity corrections,
+    which is adequate from about eight samples per side. Timing samples are
+    rarely normally distributed, so a rank test suits them better than a
+    t-test.
+    """
+    n1 = len(xs)
+    n2 = len(ys)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    ranks, ties = _rank([(x, 0) for x in xs] + [(y, 1) for y in ys])
+    r1 = sum(rank for rank, group in ranks if group == 0)
+    u1 = r1 - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (abs(u1 - mean) - 0.5) / math.sqrt(variance)
+    if z <= 0:
+        return 1.0
+    return math.erfc(z / math.sqrt(2))
+
+
+def _rank(values: List[Tuple[float, int]]) -> Tuple[List[Tuple[float, int]], float]:
+    """Average ranks of ``(value, group)`` pairs and the tie term sum(t^3 - t)."""
+    ordered = sorted(values)
+    ranks: List[Tuple[float, int]] = []
+    ties = 0.0
+    i = 0
+    while i < len(ordered):
+        j = i
+        while j + 1 < len(ordered) and ordered[j + 1][0] == ordered[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1
+        for k in range(i, j + 1):
+            ranks.append((rank, ordered[k][1]))
+        t = j - i + 1
+        ties += t**3 - t
+        i = j + 1
+    return ranks, ties
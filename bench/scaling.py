@@ -0,0 +1,124 @@
+import dataclasses
+import gc
+import math
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from monkey import engine
+from monkey import lexer
+from monkey import parser
+from monkey import token
+from .generator import Shape, generate
+
+PHASES = ("lex", "parse", "eval")
+
+
+@dataclasses.dataclass
+class Row:
+    """Measurements for one generated program."""
+
+    statements: int
+    size: int
+    tokens: int
+    seconds: Dict[str, float]
+    peak_bytes: Dict[str, int]
+
+
+def measure(shape: Shape, engine_name: str = engine.DEFAULT_ENGINE) -> Row:
+    """Times each phase on a program of ``shape`` and records its peak memory.
+
+    Phases are isolated: parsing reads an already lexed token list and
+    evaluation runs an already parsed program. Peak memory is taken in a
+    second run under ``tracemalloc`` so that tracing does not skew the times.
+    """
+    source = generate(shape)
+    tokens: List[token.Token] = []
+    program: Any = None
+
+    def lex() -> None:
+        nonlocal tokens
+        tokens = list(lexer.tokenize(source))
+
+    def parse() -> None:
+        nonlocal program
+        psr = parser.Parser(tokens)
+        program = psr.parse()
+        if psr.errors:
+            raise engine.ParseError(psr.errors)
+
+    def run() -> None:
+        engine.new_engine(engine_name).run(program)
+
+    seconds: Dict[str, float] = {}
+    peak_bytes: Dict[str, int] = {}
+    for phase, fn in zip(PHASES, (lex, parse, run)):
+        seconds[phase] = _time(fn)
+        peak_bytes[phase] = _peak(fn)
+    return Row(shape.statements, len(source), len(tokens), seconds, peak_bytes)
+
+
+def _time(fn: Callable[[], None]) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _peak(fn: Callable[[], None]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def scale(
+    sizes: Sequence[int],
+    shape: Shape,
+    engine_name: str = engine.DEFAULT_ENGINE,
+    progress: Optional[Any] = None,
+) -> List[Row]:
+    """Measures programs of ``shape`` with each statement count in ``sizes``."""
+    rows = []
+    for size in sizes:
+        rows.append(measure(dataclasses.replace(shape, statements=size), engine_name))
+        if progress is not None:
+            print(f"measured {size} statements", file=progress)
+    return rows
+
+
+def exponent(rows: Sequence[Row], phase: str, i: int) -> Optional[float]:
+    """Local growth exponent of ``phase`` time between rows i-1 and i.
+
+    About 1 means linear in the token count; clearly above 1 marks where a
+    phase stops scaling linearly.
+    """
+    if i == 0:
+        return None
+    before, after = rows[i - 1], rows[i]
+    if before.tokens == after.tokens or not before.seconds[phase]:
+        return None
+    ratio = after.seconds[phase] / before.seconds[phase]
+    if ratio <= 0:
+        return None
+    return math.log(ratio) / math.log(after.tokens / before.tokens)
+
+
+def format_table(rows: Sequence[Row]) -> str:
+    header = f"{'stmts':>7} {'bytes':>10} {'tokens':>9}"
+    for phase in PHASES:
+        header += f" | {phase + ' ms':>10} {'k':>5} {'peak MB':>8}"
+    lines = [header, "-" * len(header)]
+    for i, row in enumerate(rows):
+        line = f"{row.statements:>7} {row.size:>10} {row.tokens:>9}"
+        for phase in PHASES:
+            k = exponent(rows, phase, i)
+            line += (
+                f" | {row.seconds[phase] * 1e3:>10.1f}"
+                f" {'' if k is None else format(k, '.2f'):>5}"
+                f" {row.peak_bytes[phase] / 1e6:>8.2f}"
+            )
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,179 @@
+import functools
+from typing import Callable, Dict, List
+from monkey import engine
+from monkey import evaluator
+from monkey import lexer
+from monkey import obj as objmod
+from monkey import parser
+from monkey import token
+from . import generator
+
+# A workload is set up once per run and returns the function that is timed.
+Setup = Callable[[], Callable[[], object]]
+
+
+class Benchmark:
+    """One named workload; ``engine`` is set for those run on an engine."""
+
+    name: str
+    setup: Setup
+    engine: str
+
+    def __init__(self, name: str, setup: Setup, engine: str = "") -> None:
+        self.name = name
+        self.setup = setup
+        self.engine = engine
+
+
+_SOURCE_LINE = "let add = fn(x, y) { if (x < y) { x + y * 2 } else { x - y / 3 } };\n"
+
+
+def _lex(source: str) -> Callable[[], object]:
+    def run() -> object:
+        lex = lexer.Lexer(source)
+        count = 0
+        while lex.next_token().type != token.EOF:
+            count += 1
+        return count
+
+    return run
+
+
+def _parse(source: str) -> Callable[[], object]:
+    def run() -> object:
+        psr = parser.Parser(lexer.Lexer(source))
+        program = psr.parse()
+        assert not psr.errors, psr.errors
+        return program
+
+    return run
+
+
+def _eval(source: str) -> Callable[[], object]:
+    program = engine.parse(source)
+
+    def run() -> object:
+        result = evaluator.eval(program, objmod.Environment())
+        assert not isinstance(result, objmod.Error), result
+        return result
+
+    return _unmemoized(run)
+
+
+def _on_engine(name: str, source: str) -> Callable[[], object]:
+    # Macro workloads go end to end: parse, optimize and run.
+    def run() -> object:
+        result = engine.run(source, name)
+        assert not isinstance(result, objmod.Error), result
+        return result
+
+    return _unmemoized(run)
+
+
+def _unmemoized(run: Callable[[], object]) -> Callable[[], object]:
+    """``run`` with the evaluator's memo switched off while it runs, so that
+    repeated runs time evaluation rather than hits in the memo.
+    """
+
+    def wrapper() -> object:
+        memo = evaluator.get_memo()
+        evaluator.set_memo(None)
+        try:
+            return run()
+        finally:
+            evaluator.set_memo(memo)
+
+    return wrapper
+
+
+def arithmetic_source(terms: int) -> str:
+    parts = [f"{i % 97 + 1} * {i % 13 + 2} - {i % 7 + 1}" for i in range(terms)]
+    return " + ".join(parts) + ";"
+
+
+CALLS_SOURCE = """
+let add = fn(a, b) { a + b };
+let count = fn(n, acc) { if (n == 0) { acc } else { count(n - 1, add(acc, 1)) } };
+count(%d, 0);
+"""
+
+LOOP_SOURCE = """
+let add = fn(a, b) { a + b };
+let n = %d;
+let acc = 0;
+while (n > 0) { acc = add(acc, 1); n = n - 1; }
+acc;
+"""
+
+CLOSURES_SOURCE = """
+let adder = fn(x) { fn(y) { x + y } };
+let apply = fn(n, acc) {
+  if (n == 0) { acc } else { apply(n - 1, adder(n)(acc)) }
+};
+apply(%d, 0);
+"""
+
+FIB_SOURCE = """
+let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+fib(%d);
+"""
+
+CLOSURE_CHAIN_SOURCE = """
+let chain = fn(n, f) {
+  if (n == 0) { f } else { chain(n - 1, fn(x) { f(x) + 1 }) }
+};
+chain(%d, fn(x) { x })(0);
+"""
+
+ARRAYS_SOURCE = """
+let n = %d;
+let xs = [];
+let i = 0;
+while (i < n) { xs = push(xs, i); i = i + 1; }
+let squares = map(xs, fn(x) { x * x });
+let total = 0;
+i = 0;
+while (i < len(squares)) { total = total + squares[i]; i = i + 1; }
+total - sum(squares) + reduce(xs, 0, fn(acc, x) { acc + x });
+"""
+
+
+def micro(scale: int = 1) -> List[Benchmark]:
+    source = _SOURCE_LINE * (200 * scale)
+    return [
+        Benchmark("micro.lexer.next_token", lambda: _lex(source)),
+        Benchmark("micro.parser.parse", lambda: _parse(source)),
+        Benchmark(
+            "micro.eval.arithmetic",
+            lambda: _eval(arithmetic_source(300 * scale)),
+        ),
+        Benchmark("micro.eval.calls", lambda: _eval(CALLS_SOURCE % (300 * scale))),
+        Benchmark("micro.eval.loop", lambda: _eval(LOOP_SOURCE % (300 * scale))),
+        Benchmark(
+            "micro.eval.closures", lambda: _eval(CLOSURES_SOURCE % (300 * scale))
+        ),
+    ]
+
+
+def macro(engines: List[str], scale: int = 1) -> List[Benchmark]:
+    sources: Dict[str, str] = {
+        "macro.fib": FIB_SOURCE % (14 + scale),
+        # Calling the chain recurses once per link in every engine, so its
+        # length stays within the default recursion limit.
+        "macro.closure_chain": CLOSURE_CHAIN_SOURCE % 120,
+        "macro.arrays": ARRAYS_SOURCE % (200 * scale),
+        "macro.generated": generator.generate(
+            generator.Shape(statements=300 * scale, seed=1)
+        ),
+    }
+    benchmarks: List[Benchmark] = []
+    for name, source in sources.items():
+        for eng in engines:
+            benchmarks.append(
+                Benchmark(
+                    f"{name}[{eng}]",
+                    functools.partial(_on_engine, eng, source),
+                    eng,
+                )
+            )
+    return benchmarks
@@ -1,13 +1,189 @@
+import argparse
 import sys
 import getpass
+from typing import Optional, Tuple
+from monkey import cache
+from monkey import engine
+from monkey import evaluator
+from monkey import metrics
+from monkey import obj
+from monkey import profiler
+from monkey import purity
 from monkey import repl
 
+# Engines that run functions through ``evaluator``, and so can be profiled
+# and feed the evaluation counters of --stats.
+EVALUATOR_ENGINES = ("eval", "slots")
+
+
+def integer_range(text: str) -> Tuple[int, int]:
+    low, _, high = text.partition(":")
+    try:
+        return int(low), int(high)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected LOW:HIGH, got {text!r}")
+
 
 def main():
-    print(
-        f"Hello {getpass.getuser()}! This is the Moneky programming language!")
+    argparser = argparse.ArgumentParser(description="The Monkey programming language")
+    argparser.add_argument("script", nargs="?", help="run this file instead of a REPL")
+    argparser.add_argument(
+        "--engine",
+        choices=sorted(engine.ENGINES),
+        default=engine.DEFAULT_ENGINE,
+        help="execution engine (default: %(default)s)",
+    )
+    optimize = argparser.add_mutually_exclusive_group()
+    optimize.add_argument(
+        "--optimize",
+        dest="optimize",
+        action="store_true",
+        default=None,
+        help="optimize the AST before evaluation (default for scripts)",
+    )
+    optimize.add_argument(
+        "--no-optimize",
+        dest="optimize",
+        action="store_false",
+        help="evaluate the AST as parsed (default for the REPL)",
+    )
+    argparser.add_argument(
+        "--cache",
+        action="store_true",
+        help=f"reuse the parsed script from {cache.CACHE_DIR}/",
+    )
+    argparser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print time spent per Monkey function to stderr",
+    )
+    argparser.add_argument(
+        "--sample",
+        action="store_true",
+        help="like --profile, but sample the Monkey call stack instead",
+    )
+    argparser.add_argument(
+        "--profile-stacks",
+        metavar="FILE",
+        help="write profiled call stacks to FILE in collapsed-stack format",
+    )
+    argparser.add_argument(
+        "--stats",
+        action="store_true",
+        help="print phase times and evaluator counters to stderr on exit",
+    )
+    argparser.add_argument(
+        "--stats-format",
+        choices=["text", "json", "prometheus"],
+        default="text",
+        help="format of --stats (default: %(default)s)",
+    )
+    argparser.add_argument(
+        "--memo-size",
+        type=int,
+        default=0,
+        metavar="N",
+        help="results of pure function calls to keep, for example"
+        f" {purity.DEFAULT_MAXSIZE}, 0 to disable (%(default)s)",
+    )
+    argparser.add_argument(
+        "--small-integers",
+        type=integer_range,
+        default="{}:{}".format(*obj.DEFAULT_SMALL_INTEGERS),
+        metavar="LOW:HIGH",
+        help="interned integers, given as --small-integers=LOW:HIGH, an empty"
+        " range such as 0:-1 to disable (%(default)s)",
+    )
+    argparser.add_argument(
+        "--environment-pool",
+        type=int,
+        default=obj.DEFAULT_ENVIRONMENT_POOL,
+        metavar="N",
+        help="environments of returned calls to keep for reuse, 0 to disable"
+        " (%(default)s)",
+    )
+    args = argparser.parse_args()
+
+    evaluator.set_memo(purity.Memo(args.memo_size) if args.memo_size > 0 else None)
+    obj.set_small_integers(*args.small_integers)
+    obj.set_environment_pool(args.environment_pool)
+
+    if args.stats and args.cache:
+        argparser.error("--stats measures every phase and cannot use --cache")
+    if args.stats and args.engine not in EVALUATOR_ENGINES:
+        argparser.error(f"--stats needs --engine {' or '.join(EVALUATOR_ENGINES)}")
+    stats = metrics.Metrics() if args.stats else None
+
+    profiling = args.profile or args.sample or args.profile_stacks
+    if profiling and not args.script:
+        argparser.error("--profile, --sample and --profile-stacks need a script")
+    if args.profile and args.sample:
+        argparser.error("--profile and --sample exclude each other")
+    if profiling and args.engine not in EVALUATOR_ENGINES:
+        argparser.error(f"profiling needs --engine {' or '.join(EVALUATOR_ENGINES)}")
+
+    if args.script:
+        optimize_script = args.optimize is not False
+        if not profiling:
+            status = run_script(
+                args.script, args.engine, optimize_script, args.cache, stats
+            )
+            print_stats(stats, args.stats_format)
+            sys.exit(status)
+        prof: profiler.Hook
+        prof = profiler.Sampler() if args.sample else profiler.Profiler()
+        with prof:
+            status = run_script(
+                args.script, args.engine, optimize_script, args.cache, stats
+            )
+        if args.profile or args.sample:
+            print(prof.table(), file=sys.stderr)
+        if args.profile_stacks:
+            with open(args.profile_stacks, "w", encoding="utf-8") as f:
+                f.write(prof.collapsed())
+        print_stats(stats, args.stats_format)
+        sys.exit(status)
+
+    print(f"Hello {getpass.getuser()}! This is the Moneky programming language!")
     print("Feel free to type in commands")
-    repl.start(sys.stdin, sys.stdout)
+    repl.start(sys.stdin, sys.stdout, args.engine, bool(args.optimize), stats)
+    print_stats(stats, args.stats_format)
+
+
+def run_script(
+    path: str,
+    engine_name: str,
+    optimize: bool,
+    use_cache: bool = False,
+    stats: Optional[metrics.Metrics] = None,
+) -> int:
+    try:
+        if stats is None:
+            result = engine.run_file(path, engine_name, optimize, use_cache)
+        else:
+            with open(path, encoding="utf-8") as f:
+                source = f.read()
+            result = engine.run(source, engine_name, optimize, stats)
+    except engine.ParseError as e:
+        repl.print_parser_errors(sys.stderr, e.errors)
+        return 1
+    if isinstance(result, obj.Error):
+        print(str(result), file=sys.stderr)
+        return 1
+    if result is not obj.NULL:
+        print(str(result))
+    return 0
+
+
+def print_stats(stats: Optional[metrics.Metrics], format: str) -> None:
+    if stats is None:
+        return
+    if format == "json":
+        print(stats.json(), file=sys.stderr)
+    elif format == "prometheus":
+        print(stats.prometheus(), end="", file=sys.stderr)
+    else:
+        print(stats.format(), file=sys.stderr)
 
 
 if __name__ == "__main__":
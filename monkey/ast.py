@@ -59,6 +59,18 @@ class LetStatement(Statement):
         return buffer.getvalue()
 
 
+@dataclasses.dataclass(frozen=True)
+class AssignStatement(Statement):
+    """Rebinds ``name`` where it is bound, which must be somewhere."""
+
+    token: tokenmod.Token
+    name: Identifier
+    value: Expression
+
+    def __str__(self) -> str:
+        return f"{self.name} = {self.value};"
+
+
 @dataclasses.dataclass(frozen=True)
 class ReturnStatement(Statement):
     token: tokenmod.Token
@@ -163,11 +175,27 @@ class IfExpression(Expression):
         return buffer.getvalue()
 
 
+@dataclasses.dataclass(frozen=True)
+class WhileStatement(Statement):
+    token: tokenmod.Token
+    condition: Expression
+    body: BlockStatement
+
+    def __str__(self) -> str:
+        return f"while {str(self.condition)} {str(self.body)}"
+
+
 @dataclasses.dataclass(frozen=True)
 class FunctionLiteral(Expression):
     token: tokenmod.Token
     parameters: List[Identifier]
     body: BlockStatement
+    # Whether the body contains function literals, the only way anything
+    # can keep the environment of a call after it returns.
+    makes_closures: bool = dataclasses.field(init=False, compare=False, repr=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "makes_closures", _contains_function(self.body))
 
     def __str__(self) -> str:
         buffer = io.StringIO()
@@ -199,3 +227,56 @@ class CallExpression(Expression):
             print(str(argument), file=buffer, end='')
         print(f")", file=buffer, end='')
         return buffer.getvalue()
+
+
+@dataclasses.dataclass(frozen=True)
+class ArrayLiteral(Expression):
+    token: tokenmod.Token
+    elements: List[Expression]
+
+    def __str__(self) -> str:
+        return "[" + ", ".join(str(element) for element in self.elements) + "]"
+
+
+@dataclasses.dataclass(frozen=True)
+class IndexExpression(Expression):
+    token: tokenmod.Token
+    left: Expression
+    index: Expression
+
+    def __str__(self) -> str:
+        return f"({str(self.left)}[{str(self.index)}])"
+
+
+@dataclasses.dataclass(frozen=True)
+class ResolvedIdentifier(Identifier):
+    """An identifier bound to a slot ``depth`` frames up from the current one.
+
+    While that slot is unbound the identifier stands for ``outer``, the
+    next enclosing binding of the same name, whose depth counts from the
+    same frame.
+    """
+
+    depth: int
+    slot: int
+    outer: Optional["ResolvedIdentifier"] = None
+
+
+@dataclasses.dataclass(frozen=True)
+class ResolvedFunctionLiteral(FunctionLiteral):
+    """A function literal whose calls need a frame of ``frame_size`` slots."""
+
+    frame_size: int
+
+
+def _contains_function(node: Node) -> bool:
+    pending: List[object] = [node]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, FunctionLiteral):
+            return True
+        if isinstance(value, Node):
+            pending.extend(vars(value).values())
+        elif isinstance(value, list):
+            pending.extend(value)
+    return False
@@ -0,0 +1,146 @@
+import array
+from typing import Dict, List, Optional, cast
+from . import obj as objmod
+from .obj import NULL, ARRAY_TAG, ERROR_TAG, INTEGER_TAG
+
+Object = objmod.Object
+Array = objmod.Array
+Error = objmod.Error
+integer = objmod.integer
+
+
+def lookup(name: str) -> Optional[objmod.Builtin]:
+    """The builtin called ``name``, if there is one."""
+    return BUILTINS.get(name)
+
+
+def index(left: Object, index: Object) -> Object:
+    """``left[index]``: an element, NULL when out of range, or an Error."""
+    if left.tag == ARRAY_TAG and index.tag == INTEGER_TAG:
+        return cast(Array, left).at(cast(objmod.Integer, index).value)
+    return Error(f"index operator not supported: {left.type()}")
+
+
+def _arity(args: List[Object], want: int) -> Optional[Error]:
+    if len(args) != want:
+        return Error(f"wrong number of arguments: want={want}, got={len(args)}")
+    return None
+
+
+def _array_error(name: str, arg: Object) -> Error:
+    return Error(f"argument to `{name}` must be ARRAY, got {arg.type()}")
+
+
+def _len(args: List[Object], apply: objmod.Apply) -> Object:
+    error = _arity(args, 1)
+    if error is not None:
+        return error
+    if args[0].tag != ARRAY_TAG:
+        return Error(f"argument to `len` not supported, got {args[0].type()}")
+    return integer(len(cast(Array, args[0])))
+
+
+def _first(args: List[Object], apply: objmod.Apply) -> Object:
+    error = _arity(args, 1)
+    if error is not None:
+        return error
+    if args[0].tag != ARRAY_TAG:
+        return _array_error("first", args[0])
+    return cast(Array, args[0]).at(0)
+
+
+def _rest(args: List[Object], apply: objmod.Apply) -> Object:
+    error = _arity(args, 1)
+    if error is not None:
+        return error
+    if args[0].tag != ARRAY_TAG:
+        return _array_error("rest", args[0])
+    elements = cast(Array, args[0]).elements
+    if not elements:
+        return NULL
+    return Array(elements[1:])
+
+
+def _push(args: List[Object], apply: objmod.Apply) -> Object:
+    error = _arity(args, 2)
+    if error is not None:
+        return error
+    if args[0].tag != ARRAY_TAG:
+        return _array_error("push", args[0])
+    arr = cast(Array, args[0])
+    value = args[1]
+    if arr.packed and value.tag == INTEGER_TAG:
+        packed = array.array("q", cast("array.array[int]", arr.elements))
+        try:
+            packed.append(cast(objmod.Integer, value).value)
+            return Array(packed)
+        except OverflowError:
+            pass
+    elements = arr.objects()
+    elements.append(value)
+    return Array(elements)
+
+
+def _map(args: List[Object], apply: objmod.Apply) -> Object:
+    error = _arity(args, 2)
+    if error is not None:
+        return error
+    if args[0].tag != ARRAY_TAG:
+        return _array_error("map", args[0])
+    fn = args[1]
+    results: List[Object] = []
+    for element in cast(Array, args[0]).objects():
+        result = apply(fn, [element])
+        if result.tag == ERROR_TAG:
+            return result
+        results.append(result)
+    return objmod.array_of(results)
+
+
+def _reduce(args: List[Object], apply: objmod.Apply) -> Object:
+    error = _arity(args, 3)
+    if error is not None:
+        return error
+    if args[0].tag != ARRAY_TAG:
+        return _array_error("reduce", args[0])
+    result = args[1]
+    fn = args[2]
+    for element in cast(Array, args[0]).objects():
+        result = apply(fn, [result, element])
+        if result.tag == ERROR_TAG:
+            return result
+    return result
+
+
+def _sum(args: List[Object], apply: objmod.Apply) -> Object:
+    error = _arity(args, 1)
+    if error is not None:
+        return error
+    if args[0].tag != ARRAY_TAG:
+        return _array_error("sum", args[0])
+    arr = cast(Array, args[0])
+    if arr.packed:
+        return integer(sum(cast("array.array[int]", arr.elements)))
+    total = 0
+    for element in cast(List[Object], arr.elements):
+        if element.tag != INTEGER_TAG:
+            return Error(f"argument to `sum` must hold INTEGER, got {element.type()}")
+        total += cast(objmod.Integer, element).value
+    return integer(total)
+
+
+# Functions every engine falls back to for names nothing has bound. They
+# work on the elements of arrays directly, so that a packed array is summed,
+# sliced or extended without boxing its integers.
+BUILTINS: Dict[str, objmod.Builtin] = {
+    name: objmod.Builtin(name, fn)
+    for name, fn in (
+        ("len", _len),
+        ("first", _first),
+        ("rest", _rest),
+        ("push", _push),
+        ("map", _map),
+        ("reduce", _reduce),
+        ("sum", _sum),
+    )
+}
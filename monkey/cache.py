@@ -0,0 +1,240 @@
+import dataclasses
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from . import ast
+from . import capture
+from . import code
+from . import compiler
+from . import lexer
+from . import obj as objmod
+from . import optimizer
+from . import parser
+from . import resolver
+from . import token
+
+CACHE_DIR = "__monkeycache__"
+
+# Modules whose code decides what a cached program looks like, this one
+# included for the format of entries. Editing any of them changes the
+# interpreter tag, which invalidates every entry.
+_SOURCES = (
+    token,
+    lexer,
+    ast,
+    parser,
+    optimizer,
+    resolver,
+    capture,
+    code,
+    compiler,
+    objmod,
+    sys.modules[__name__],
+)
+
+_KEY_SIZE = hashlib.sha256().digest_size
+
+_tag: Optional[bytes] = None
+
+
+def interpreter_tag() -> bytes:
+    """Digest of the Python version and of the interpreter's own sources."""
+    global _tag
+    if _tag is None:
+        digest = hashlib.sha256(sys.implementation.cache_tag.encode())
+        for module in _SOURCES:
+            with open(module.__file__ or "", "rb") as f:
+                digest.update(f.read())
+        _tag = digest.digest()
+    return _tag
+
+
+def source_key(source: bytes, kind: str) -> bytes:
+    """The key an entry of ``kind`` built from ``source`` is stored under."""
+    digest = hashlib.sha256(interpreter_tag())
+    digest.update(kind.encode())
+    digest.update(b"\0")
+    digest.update(source)
+    return digest.digest()
+
+
+def cache_path(path: str, kind: str) -> str:
+    """Where the entry of ``kind`` for the script at ``path`` lives.
+
+    Like ``__pycache__`` the directory sits next to the script. There is one
+    entry per script and kind, overwritten whenever its key changes, so stale
+    entries do not pile up.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, CACHE_DIR, f"{name}.{kind}")
+
+
+def load(path: str, kind: str, key: bytes) -> Optional[bytes]:
+    """The payload stored for the script at ``path``, if ``key`` matches."""
+    try:
+        with open(cache_path(path, kind), "rb") as f:
+            if f.read(_KEY_SIZE) != key:
+                return None
+            return f.read()
+    except OSError:
+        return None
+
+
+def store(path: str, kind: str, key: bytes, data: bytes) -> None:
+    """Writes an entry; failing only means the next run rebuilds it."""
+    target = cache_path(path, kind)
+    try:
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(key)
+                f.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            os.remove(tmp)
+            raise
+    except OSError:
+        pass
+
+
+# Programs are stored as marshalled nested tuples: every node becomes
+# (class index, field...), with its token replaced by an index into a table
+# of distinct tokens. Unlike pickle this needs no per-object metadata.
+_NODE_CLASSES: List[type] = [
+    ast.Program,
+    ast.Identifier,
+    ast.LetStatement,
+    ast.ReturnStatement,
+    ast.BlockStatement,
+    ast.ExpressionStatement,
+    ast.NullExpression,
+    ast.IntegerLiteral,
+    ast.PrefixExpression,
+    ast.InfixExpression,
+    ast.Boolean,
+    ast.IfExpression,
+    ast.FunctionLiteral,
+    ast.CallExpression,
+    ast.ResolvedIdentifier,
+    ast.ResolvedFunctionLiteral,
+    ast.AssignStatement,
+    ast.WhileStatement,
+    ast.ArrayLiteral,
+    ast.IndexExpression,
+]
+_node_indexes: Dict[type, int] = {cls: i for i, cls in enumerate(_NODE_CLASSES)}
+_node_fields: List[Tuple[str, ...]] = [
+    tuple(f.name for f in dataclasses.fields(cls) if f.init) for cls in _NODE_CLASSES
+]
+_has_token: List[bool] = [
+    bool(fields) and fields[0] == "token" for fields in _node_fields
+]
+
+
+def dump_program(program: ast.Program) -> bytes:
+    tokens: Dict[Tuple[str, Optional[str], int], int] = {}
+
+    def encode(value: Any) -> Any:
+        if isinstance(value, ast.Node):
+            i = _node_indexes[type(value)]
+            fields = _node_fields[i]
+            out: List[Any] = [i]
+            if _has_token[i]:
+                tok = value.token
+                key = (tok.type, tok.literal, tok.line)
+                out.append(tokens.setdefault(key, len(tokens)))
+                fields = fields[1:]
+            for name in fields:
+                out.append(encode(getattr(value, name)))
+            return tuple(out)
+        if isinstance(value, list):
+            return [encode(item) for item in value]
+        return value
+
+    tree = encode(program)
+    return marshal.dumps((list(tokens), tree))
+
+
+def load_program(data: bytes) -> ast.Program:
+    keys, tree = marshal.loads(data)
+    tokens = [token.Token(type, literal, line) for type, literal, line in keys]
+    classes = _NODE_CLASSES
+    has_token = _has_token
+
+    def decode(value: Any) -> Any:
+        kind = type(value)
+        if kind is tuple:
+            i = value[0]
+            if has_token[i]:
+                return classes[i](tokens[value[1]], *map(decode, value[2:]))
+            return classes[i](*map(decode, value[1:]))
+        if kind is list:
+            return list(map(decode, value))
+        return value
+
+    return decode(tree)
+
+
+def dump_bytecode(bytecode: compiler.Bytecode) -> bytes:
+    constants: List[Any] = []
+    for const in bytecode.constants:
+        if isinstance(const, objmod.Integer):
+            constants.append(const.value)
+        elif isinstance(const, objmod.CompiledFunction):
+            constants.append(
+                (
+                    const.instructions,
+                    const.num_locals,
+                    const.num_parameters,
+                    const.names,
+                    const.source,
+                    const.fallbacks,
+                )
+            )
+        else:
+            raise TypeError(f"cannot cache constant {const.type()}")
+    return marshal.dumps((bytecode.instructions, constants, bytecode.global_names))
+
+
+def load_bytecode(data: bytes) -> compiler.Bytecode:
+    instructions, constants, global_names = marshal.loads(data)
+    objects: List[objmod.Object] = []
+    for const in constants:
+        if type(const) is int:
+            objects.append(objmod.integer(const))
+        else:
+            objects.append(objmod.CompiledFunction(*const))
+    return compiler.Bytecode(instructions, objects, global_names)
+
+
+def cached(
+    path: str,
+    kind: str,
+    build: Callable[[str], Any],
+    encode: Callable[[Any], bytes],
+    decode: Callable[[bytes], Any],
+) -> Any:
+    """Decodes the entry of ``kind`` for the script at ``path``, or builds
+    the result from the source text and stores it.
+    """
+    with open(path, "rb") as f:
+        source = f.read()
+    key = source_key(source, kind)
+    data = load(path, kind, key)
+    if data is not None:
+        try:
+            return decode(data)
+        except (EOFError, ValueError, TypeError, IndexError):
+            pass
+    result = build(source.decode("utf-8"))
+    try:
+        data = encode(result)
+    except (ValueError, TypeError, RecursionError):
+        return result
+    store(path, kind, key, data)
+    return result
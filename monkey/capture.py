@@ -0,0 +1,320 @@
+import dataclasses
+import weakref
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple, Union, cast
+from . import ast
+from . import obj as objmod
+
+# How a closure made in environment ``env`` captures it: ``env`` itself,
+# the outer environment of ``env``, or a new environment holding copies of
+# the bindings it reads, enclosed by the outermost (global) environment.
+SHARE = 0
+OUTER = 1
+COPY = 2
+
+
+@dataclasses.dataclass(frozen=True)
+class Capture:
+    """What closures made from a function literal keep of their environment.
+
+    Without a Capture a closure keeps the environment it was made in, and
+    with it every binding of every enclosing call. OUTER skips the frame of
+    the enclosing call when the body reads none of its bindings. COPY keeps
+    only the bindings of ``names`` outside the global environment, copied
+    when the closure is made; it is chosen only when no ``let`` can bind any
+    of those names afterwards, and none of them is ever assigned. Globals
+    are always read live.
+    """
+
+    mode: int
+    names: Tuple[str, ...] = ()
+
+
+def free_names(literal: ast.FunctionLiteral) -> FrozenSet[str]:
+    """Names the body of ``literal``, or of a function nested in it, may read
+    from an enclosing scope.
+
+    A call with too few arguments leaves parameters unbound, so parameters
+    that are read count as free too.
+    """
+    return _free_names(literal, {})
+
+
+# Captures of analyzed literals by id, and the top-level nodes that have
+# been analyzed. Nodes are held weakly, so that the tables keep no tree
+# alive, and entries go with their node.
+_captures: Dict[int, Tuple["weakref.ref[ast.FunctionLiteral]", Capture]] = {}
+_analyzed: Dict[int, "weakref.ref[ast.Node]"] = {}
+_TABLE_SIZE = 1 << 16
+
+
+def _forget_analyzed(key: int, ref: "weakref.ref[ast.Node]") -> None:
+    if _analyzed.get(key) is ref:
+        del _analyzed[key]
+
+
+def _forget_capture(key: int, ref: "weakref.ref[ast.FunctionLiteral]") -> None:
+    entry = _captures.get(key)
+    if entry is not None and entry[0] is ref:
+        del _captures[key]
+
+
+def analyze(node: ast.Node) -> None:
+    """Works out captures for the functions nested in function literals in
+    ``node``, a program or statement run in the global environment.
+    """
+    ref = _analyzed.get(id(node))
+    if ref is not None and ref() is node:
+        return
+    if len(_captures) >= _TABLE_SIZE or len(_analyzed) >= _TABLE_SIZE:
+        _captures.clear()
+        _analyzed.clear()
+    key = id(node)
+    _analyzed[key] = weakref.ref(node, lambda ref: _forget_analyzed(key, ref))
+    if isinstance(node, ast.Program):
+        _Planner(_assigned_names(node)).body(node.statements, None)
+    elif isinstance(node, ast.Statement):
+        _Planner(_assigned_names(node)).body([node], None)
+
+
+def capture(literal: ast.FunctionLiteral) -> Optional[Capture]:
+    """The capture of an analyzed ``literal``, or None if its closures keep
+    the environment they are made in.
+    """
+    entry = _captures.get(id(literal))
+    return None if entry is None or entry[0]() is not literal else entry[1]
+
+
+def closure_env(
+    literal: ast.FunctionLiteral, env: objmod.Environment
+) -> objmod.Environment:
+    """The environment to keep in a closure made from ``literal`` in ``env``."""
+    entry = _captures.get(id(literal))
+    if entry is None or entry[0]() is not literal:
+        return env
+    mode = entry[1].mode
+    if mode == COPY:
+        return env.capture(entry[1].names)
+    if mode == OUTER:
+        # Only chosen inside functions, whose calls have an outer environment.
+        return cast(objmod.Environment, env.up(1))
+    return env
+
+
+class _Scope:
+    """What the analysis knows about the environment of a call.
+
+    ``bound`` holds the names the call may bind, ``outer`` the names the
+    environment its function was made with may hold outside the global one,
+    and ``unstable`` those of them a ``let`` may bind later.
+    """
+
+    bound: Set[str]
+    outer: Set[str]
+    unstable: Set[str]
+
+    def __init__(self, outer: Set[str], unstable: Set[str]) -> None:
+        self.bound = set()
+        self.outer = outer
+        self.unstable = unstable
+
+
+class _Planner:
+    # What a body does, in evaluation order: make a closure, or bind a name.
+    _events: List[Union[ast.FunctionLiteral, str]]
+    _free: Dict[int, FrozenSet[str]]
+    # Names assigned anywhere in the node analyzed. Only code nested in a
+    # function can assign the bindings of its calls, so any binding may
+    # change after any closure is made, and copies of them would go stale.
+    _assigned: FrozenSet[str]
+
+    def __init__(self, assigned: FrozenSet[str]) -> None:
+        self._events = []
+        self._free = {}
+        self._assigned = assigned
+
+    def body(self, statements: List[ast.Statement], scope: Optional[_Scope]) -> None:
+        """Plans the functions nested in the literals that ``statements`` make
+        when run in a call with ``scope``, or at top level for None.
+        """
+        outer_events = self._events
+        self._events = []
+        for stmt in statements:
+            self.statement(stmt)
+        events = self._events
+        self._events = outer_events
+
+        # Names bound after each literal is made, latest literal first.
+        later: Set[str] = set()
+        made: List[Tuple[ast.FunctionLiteral, Set[str]]] = []
+        for event in reversed(events):
+            if isinstance(event, str):
+                later.add(event)
+            else:
+                made.append((event, set(later)))
+        if scope is not None:
+            scope.bound |= later
+        for literal, bound_later in reversed(made):
+            self.function(literal, bound_later, scope)
+
+    def function(
+        self, literal: ast.FunctionLiteral, later: Set[str], scope: Optional[_Scope]
+    ) -> None:
+        if scope is None:
+            # Top-level closures keep the global environment.
+            inner = _Scope(set(), set())
+        else:
+            free = set(_free_names(literal, self._free))
+            visible = scope.bound | scope.outer
+            relevant = free & visible
+            unstable = free & (later | scope.unstable | self._assigned)
+            if not relevant:
+                found = Capture(OUTER)
+                inner = _Scope(scope.outer, scope.unstable)
+            elif unstable:
+                found = Capture(SHARE)
+                inner = _Scope(visible, unstable)
+            elif not scope.outer and scope.bound <= free:
+                # The call's environment holds nothing the body does not read.
+                found = Capture(SHARE)
+                inner = _Scope(set(scope.bound), set())
+            else:
+                found = Capture(COPY, tuple(sorted(relevant)))
+                inner = _Scope(relevant, set())
+            key = id(literal)
+            ref = weakref.ref(literal, lambda ref: _forget_capture(key, ref))
+            _captures[key] = (ref, found)
+        inner.bound.update(p.value for p in literal.parameters)
+        self.body(literal.body.statements, inner)
+
+    def statement(self, stmt: ast.Statement) -> None:
+        if isinstance(stmt, ast.LetStatement):
+            self.expression(stmt.value)
+            self._events.append(stmt.name.value)
+        elif isinstance(stmt, ast.ReturnStatement):
+            self.expression(stmt.return_value)
+        elif isinstance(stmt, ast.ExpressionStatement):
+            self.expression(stmt.expression)
+        elif isinstance(stmt, ast.BlockStatement):
+            for inner in stmt.statements:
+                self.statement(inner)
+        elif isinstance(stmt, ast.AssignStatement):
+            self.expression(stmt.value)
+        elif isinstance(stmt, ast.WhileStatement):
+            start = len(self._events)
+            self.expression(stmt.condition)
+            for inner in stmt.body.statements:
+                self.statement(inner)
+            # The loop runs its lets again after every literal in it made a
+            # closure, so they count as bound later for all of them.
+            self._events.extend(
+                [event for event in self._events[start:] if isinstance(event, str)]
+            )
+
+    def expression(self, node: Optional[ast.Node]) -> None:
+        if isinstance(node, ast.PrefixExpression):
+            self.expression(node.right)
+        elif isinstance(node, ast.InfixExpression):
+            self.expression(node.left)
+            self.expression(node.right)
+        elif isinstance(node, ast.IfExpression):
+            self.expression(node.condition)
+            self.statement(node.consequence)
+            if node.alternative is not None:
+                self.statement(node.alternative)
+        elif isinstance(node, ast.CallExpression):
+            self.expression(node.function)
+            for arg in node.arguments:
+                self.expression(arg)
+        elif isinstance(node, ast.ArrayLiteral):
+            for element in node.elements:
+                self.expression(element)
+        elif isinstance(node, ast.IndexExpression):
+            self.expression(node.left)
+            self.expression(node.index)
+        elif isinstance(node, ast.FunctionLiteral):
+            # Literals nested in this one are planned with its body.
+            self._events.append(node)
+
+
+def _free_names(
+    literal: ast.FunctionLiteral, memo: Dict[int, FrozenSet[str]]
+) -> FrozenSet[str]:
+    found = memo.get(id(literal))
+    if found is None:
+        free: Set[str] = set()
+        _free_in_block(literal.body.statements, set(), free, memo)
+        found = frozenset(free)
+        memo[id(literal)] = found
+    return found
+
+
+def _free_in_block(
+    statements: List[ast.Statement],
+    bound: Set[str],
+    free: Set[str],
+    memo: Dict[int, FrozenSet[str]],
+) -> None:
+    # As in purity, a let in a branch may not run, so names it binds are
+    # bound only inside the branch.
+    for stmt in statements:
+        if isinstance(stmt, ast.LetStatement):
+            _free_in_expression(stmt.value, bound, free, memo)
+            bound.add(stmt.name.value)
+        elif isinstance(stmt, ast.ReturnStatement):
+            _free_in_expression(stmt.return_value, bound, free, memo)
+        elif isinstance(stmt, ast.ExpressionStatement):
+            _free_in_expression(stmt.expression, bound, free, memo)
+        elif isinstance(stmt, ast.AssignStatement):
+            _free_in_expression(stmt.value, bound, free, memo)
+            if stmt.name.value not in bound:
+                free.add(stmt.name.value)
+        elif isinstance(stmt, ast.WhileStatement):
+            _free_in_expression(stmt.condition, bound, free, memo)
+            _free_in_block(stmt.body.statements, set(bound), free, memo)
+
+
+def _free_in_expression(
+    node: Optional[ast.Node],
+    bound: Set[str],
+    free: Set[str],
+    memo: Dict[int, FrozenSet[str]],
+) -> None:
+    if isinstance(node, ast.Identifier):
+        if node.value not in bound:
+            free.add(node.value)
+    elif isinstance(node, ast.PrefixExpression):
+        _free_in_expression(node.right, bound, free, memo)
+    elif isinstance(node, ast.InfixExpression):
+        _free_in_expression(node.left, bound, free, memo)
+        _free_in_expression(node.right, bound, free, memo)
+    elif isinstance(node, ast.IfExpression):
+        _free_in_expression(node.condition, bound, free, memo)
+        _free_in_block(node.consequence.statements, set(bound), free, memo)
+        if node.alternative is not None:
+            _free_in_block(node.alternative.statements, set(bound), free, memo)
+    elif isinstance(node, ast.CallExpression):
+        _free_in_expression(node.function, bound, free, memo)
+        for arg in node.arguments:
+            _free_in_expression(arg, bound, free, memo)
+    elif isinstance(node, ast.ArrayLiteral):
+        for element in node.elements:
+            _free_in_expression(element, bound, free, memo)
+    elif isinstance(node, ast.IndexExpression):
+        _free_in_expression(node.left, bound, free, memo)
+        _free_in_expression(node.index, bound, free, memo)
+    elif isinstance(node, ast.FunctionLiteral):
+        free |= _free_names(node, memo) - bound
+
+
+def _assigned_names(node: ast.Node) -> FrozenSet[str]:
+    names: Set[str] = set()
+    pending: List[object] = [node]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, ast.AssignStatement):
+            names.add(value.name.value)
+        if isinstance(value, ast.Node):
+            pending.extend(vars(value).values())
+        elif isinstance(value, list):
+            pending.extend(value)
+    return frozenset(names)
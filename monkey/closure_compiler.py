@@ -0,0 +1,569 @@
+import operator
+from typing import Any, Callable, Dict, List, NoReturn, Optional, Tuple, cast
+from . import ast
+from . import builtins
+from . import capture
+from . import obj as objmod
+from .obj import NULL, TRUE, FALSE
+
+Code = Callable[[objmod.Environment], objmod.Object]
+
+Integer = objmod.Integer
+integer = objmod.integer
+ReturnValue = objmod.ReturnValue
+Builtin = objmod.Builtin
+Error = objmod.Error
+holds_function = objmod.holds_function
+acquire_environment = objmod.acquire_environment
+release_environment = objmod.release_environment
+
+# Assignments of functions to bindings outside the environment they run in;
+# see evaluator._end_calls.
+_escapes = 0
+
+
+class MonkeyError(Exception):
+    """Raised by compiled code for Monkey runtime errors."""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.error = objmod.Error(message)
+
+
+class _TailCall(objmod.Object):
+    """A call in tail position, handed back to ``_call`` to run."""
+
+    __slots__ = ("func", "vals")
+
+    def __init__(self, func: objmod.Object, vals: List[objmod.Object]) -> None:
+        self.func = func
+        self.vals = vals
+
+    def type(self) -> str:
+        return "TAIL_CALL"
+
+
+class ClosureFunction(objmod.Function):
+    __slots__ = ("code",)
+
+    env: objmod.Environment
+    code: Code
+
+    def __init__(
+        self,
+        parameters: List[ast.Identifier],
+        body: ast.BlockStatement,
+        env: objmod.Environment,
+        code: Code,
+        pooled: bool = False,
+    ) -> None:
+        super().__init__(parameters, body, env, pooled)
+        self.code = code
+
+
+def compile_program(program: ast.Program) -> Code:
+    """Builds a tree of Python closures for ``program`` once.
+
+    The returned callable runs the program in the given environment and
+    returns the same objects ``evaluator.eval`` would, errors included.
+    """
+    capture.analyze(program)
+    block, _ = _compile_block(program.statements, True)
+
+    def run(env: objmod.Environment) -> objmod.Object:
+        try:
+            result: Any = block(env)
+            if type(result) is _TailCall:
+                result = _call(result.func, result.vals)
+        except MonkeyError as e:
+            return e.error
+        if type(result) is ReturnValue:
+            return result.value
+        return result
+
+    return run
+
+
+def compile_statement(stmt: ast.Statement) -> Code:
+    """Builds closures for one top-level statement.
+
+    Unlike ``compile_program`` the result of a ``return`` is left wrapped in
+    a ``ReturnValue``, so the caller can tell that the program should stop.
+    """
+    capture.analyze(stmt)
+    code, _ = _compile_statement(stmt, False)
+
+    def run(env: objmod.Environment) -> objmod.Object:
+        try:
+            return code(env)
+        except MonkeyError as e:
+            return e.error
+
+    return run
+
+
+def _compile_block(statements: List[ast.Statement], tail: bool) -> Tuple[Code, bool]:
+    """Compiles a statement list.
+
+    ``tail`` is true when the value of the block is the value of the
+    enclosing function or program, so a trailing ``return`` can be compiled
+    as a plain expression and a trailing call as a ``_TailCall``. The second
+    result tells whether the block may produce a ``ReturnValue`` that the
+    caller has to unwrap.
+    """
+    if not statements:
+        return (lambda env: NULL, False)
+    last = len(statements) - 1
+    compiled = [
+        _compile_statement(stmt, tail and i == last)
+        for i, stmt in enumerate(statements)
+    ]
+    codes = [c for c, _ in compiled]
+    checks = [may_return for _, may_return in compiled]
+    may_return = any(checks)
+
+    if len(codes) == 1:
+        return (codes[0], may_return)
+
+    if not may_return:
+
+        def block(env: objmod.Environment) -> objmod.Object:
+            result: objmod.Object = NULL
+            for code in codes:
+                result = code(env)
+            return result
+
+        return (block, False)
+
+    pairs = list(zip(codes, checks))
+
+    def returning_block(env: objmod.Environment) -> objmod.Object:
+        result: objmod.Object = NULL
+        for code, check in pairs:
+            result = code(env)
+            if check and type(result) is ReturnValue:
+                return result
+        return result
+
+    return (returning_block, True)
+
+
+def _compile_statement(stmt: ast.Statement, tail: bool) -> Tuple[Code, bool]:
+    if isinstance(stmt, ast.ExpressionStatement):
+        expr = cast(ast.Expression, stmt.expression)
+        if isinstance(expr, ast.IfExpression):
+            return _compile_if_expression(expr, tail)
+        if tail and isinstance(expr, ast.CallExpression):
+            return (_compile_tail_call(expr), False)
+        return (_compile_expression(expr), False)
+    elif isinstance(stmt, ast.LetStatement):
+        return (_compile_let_statement(stmt), False)
+    elif isinstance(stmt, ast.AssignStatement):
+        return (_compile_assign_statement(stmt), False)
+    elif isinstance(stmt, ast.WhileStatement):
+        return _compile_while_statement(stmt)
+    elif isinstance(stmt, ast.ReturnStatement):
+        expr = cast(ast.Expression, stmt.return_value)
+        if tail and isinstance(expr, ast.CallExpression):
+            return (_compile_tail_call(expr), False)
+        value = _compile_expression(expr)
+        if tail:
+            return (value, False)
+
+        def ret(env: objmod.Environment) -> objmod.Object:
+            return ReturnValue(value(env))
+
+        return (ret, True)
+    return (lambda env: NULL, False)
+
+
+def _compile_let_statement(stmt: ast.LetStatement) -> Code:
+    name = stmt.name.value
+    value = _compile_expression(cast(ast.Expression, stmt.value))
+
+    def let(env: objmod.Environment) -> objmod.Object:
+        env.set(name, value(env))
+        return NULL
+
+    return let
+
+
+def _compile_assign_statement(stmt: ast.AssignStatement) -> Code:
+    name = stmt.name.value
+    value = _compile_expression(stmt.value)
+
+    def assign(env: objmod.Environment) -> objmod.Object:
+        global _escapes
+        val = value(env)
+        holder = env.assign(name, val)
+        if holder is None:
+            raise MonkeyError(f"identifier not found: {name}")
+        if holder is not env and holds_function(val):
+            _escapes += 1
+        return NULL
+
+    return assign
+
+
+def _compile_while_statement(stmt: ast.WhileStatement) -> Tuple[Code, bool]:
+    condition = _compile_expression(stmt.condition)
+    body, may_return = _compile_block(stmt.body.statements, False)
+
+    if not may_return:
+
+        def loop(env: objmod.Environment) -> objmod.Object:
+            cond = condition(env)
+            while cond is not FALSE and cond is not NULL:
+                body(env)
+                cond = condition(env)
+            return NULL
+
+        return (loop, False)
+
+    def returning_loop(env: objmod.Environment) -> objmod.Object:
+        cond = condition(env)
+        while cond is not FALSE and cond is not NULL:
+            result = body(env)
+            if type(result) is ReturnValue:
+                return result
+            cond = condition(env)
+        return NULL
+
+    return (returning_loop, True)
+
+
+def _compile_expression(node: ast.Expression) -> Code:
+    if isinstance(node, ast.IntegerLiteral):
+        const: objmod.Object = integer(node.value)
+        return lambda env: const
+    elif isinstance(node, ast.Boolean):
+        boolean = TRUE if node.value else FALSE
+        return lambda env: boolean
+    elif isinstance(node, ast.Identifier):
+        return _compile_identifier(node)
+    elif isinstance(node, ast.PrefixExpression):
+        return _compile_prefix_expression(node)
+    elif isinstance(node, ast.InfixExpression):
+        return _compile_infix_expression(node)
+    elif isinstance(node, ast.IfExpression):
+        return _compile_if_expression(node, False)[0]
+    elif isinstance(node, ast.FunctionLiteral):
+        return _compile_function_literal(node)
+    elif isinstance(node, ast.CallExpression):
+        return _compile_call_expression(node)
+    elif isinstance(node, ast.ArrayLiteral):
+        return _compile_array_literal(node)
+    elif isinstance(node, ast.IndexExpression):
+        return _compile_index_expression(node)
+    return lambda env: NULL
+
+
+def _compile_identifier(node: ast.Identifier) -> Code:
+    name = node.value
+
+    def identifier(env: objmod.Environment) -> objmod.Object:
+        val, ok = env.get(name)
+        if not ok:
+            builtin = builtins.lookup(name)
+            if builtin is None:
+                raise MonkeyError(f"identifier not found: {name}")
+            return builtin
+        return val
+
+    return identifier
+
+
+def _compile_array_literal(node: ast.ArrayLiteral) -> Code:
+    elements = [_compile_expression(element) for element in node.elements]
+    array_of = objmod.array_of
+
+    def array(env: objmod.Environment) -> objmod.Object:
+        return array_of([element(env) for element in elements])
+
+    return array
+
+
+def _compile_index_expression(node: ast.IndexExpression) -> Code:
+    left = _compile_expression(node.left)
+    index = _compile_expression(node.index)
+
+    def index_expression(env: objmod.Environment) -> objmod.Object:
+        result: Any = builtins.index(left(env), index(env))
+        if type(result) is Error:
+            raise MonkeyError(result.message)
+        return result
+
+    return index_expression
+
+
+def _compile_prefix_expression(node: ast.PrefixExpression) -> Code:
+    right = _compile_expression(node.right)
+    if node.operator == "!":
+
+        def bang(env: objmod.Environment) -> objmod.Object:
+            val = right(env)
+            return TRUE if val is FALSE or val is NULL else FALSE
+
+        return bang
+    elif node.operator == "-":
+
+        def minus(env: objmod.Environment) -> objmod.Object:
+            val: Any = right(env)
+            if type(val) is not Integer:
+                raise MonkeyError(f"unknown operator: -{val.type()}")
+            return integer(-val.value)
+
+        return minus
+
+    op = node.operator
+
+    def unknown(env: objmod.Environment) -> objmod.Object:
+        raise MonkeyError(f"unknown operator: {op}{right(env).type()}")
+
+    return unknown
+
+
+_arithmetic_operators: Dict[str, Callable[[int, int], int]] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.floordiv,
+}
+
+_comparison_operators: Dict[str, Callable[[int, int], bool]] = {
+    "<": operator.lt,
+    ">": operator.gt,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def _compile_infix_expression(node: ast.InfixExpression) -> Code:
+    op = node.operator
+    left = _compile_expression(node.left)
+    right = _compile_expression(node.right)
+
+    arith = _arithmetic_operators.get(op)
+    if arith is not None:
+        fn = arith
+        if isinstance(node.right, ast.IntegerLiteral):
+            # "n - 1" style: the right operand never needs to be evaluated.
+            constant = node.right.value
+            boxed = integer(constant)
+
+            def arith_const(env: objmod.Environment) -> objmod.Object:
+                lval: Any = left(env)
+                if type(lval) is Integer:
+                    return integer(fn(lval.value, constant))
+                return _infix_error(lval, op, boxed)
+
+            return arith_const
+
+        def arith_expr(env: objmod.Environment) -> objmod.Object:
+            lval: Any = left(env)
+            rval: Any = right(env)
+            if type(lval) is Integer and type(rval) is Integer:
+                return integer(fn(lval.value, rval.value))
+            return _infix_error(lval, op, rval)
+
+        return arith_expr
+
+    cmp = _comparison_operators.get(op)
+    if cmp is None:
+
+        def unknown(env: objmod.Environment) -> objmod.Object:
+            return _infix_error(left(env), op, right(env))
+
+        return unknown
+
+    compare = cmp
+    identity = op in ("==", "!=")
+    negate = op == "!="
+
+    def comparison(env: objmod.Environment) -> objmod.Object:
+        lval: Any = left(env)
+        rval: Any = right(env)
+        if type(lval) is Integer and type(rval) is Integer:
+            return TRUE if compare(lval.value, rval.value) else FALSE
+        if identity:
+            return TRUE if (lval is rval) != negate else FALSE
+        return _infix_error(lval, op, rval)
+
+    return comparison
+
+
+def _infix_error(left: objmod.Object, op: str, right: objmod.Object) -> NoReturn:
+    if left.type() != right.type():
+        raise MonkeyError(f"type mismatch: {left.type()} {op} {right.type()}")
+    raise MonkeyError(f"unknown operator: {left.type()} {op} {right.type()}")
+
+
+def _compile_if_expression(node: ast.IfExpression, tail: bool) -> Tuple[Code, bool]:
+    condition = _compile_expression(node.condition)
+    consequence, cnsq_returns = _compile_block(node.consequence.statements, tail)
+    alternative: Optional[Code] = None
+    alt_returns = False
+    if node.alternative is not None:
+        alternative, alt_returns = _compile_block(node.alternative.statements, tail)
+
+    if alternative is None:
+
+        def if_then(env: objmod.Environment) -> objmod.Object:
+            cond = condition(env)
+            if cond is not FALSE and cond is not NULL:
+                return consequence(env)
+            return NULL
+
+        return (if_then, cnsq_returns)
+
+    otherwise = alternative
+
+    def if_else(env: objmod.Environment) -> objmod.Object:
+        cond = condition(env)
+        if cond is not FALSE and cond is not NULL:
+            return consequence(env)
+        return otherwise(env)
+
+    return (if_else, cnsq_returns or alt_returns)
+
+
+def _compile_function_literal(node: ast.FunctionLiteral) -> Code:
+    parameters = node.parameters
+    body_ast = node.body
+    body, may_return = _compile_block(node.body.statements, True)
+
+    if may_return:
+        inner = body
+
+        def unwrapping_body(env: objmod.Environment) -> objmod.Object:
+            result: Any = inner(env)
+            if type(result) is ReturnValue:
+                return result.value
+            return result
+
+        body = unwrapping_body
+
+    code = body
+    pooled = not node.makes_closures
+    found = capture.capture(node)
+
+    if found is not None and found.mode == capture.COPY:
+        names = found.names
+
+        def copying_function(env: objmod.Environment) -> objmod.Object:
+            return ClosureFunction(
+                parameters, body_ast, env.capture(names), code, pooled
+            )
+
+        return copying_function
+    elif found is not None and found.mode == capture.OUTER:
+
+        def outer_function(env: objmod.Environment) -> objmod.Object:
+            outer = cast(objmod.Environment, env.up(1))
+            return ClosureFunction(parameters, body_ast, outer, code, pooled)
+
+        return outer_function
+
+    def function(env: objmod.Environment) -> objmod.Object:
+        return ClosureFunction(parameters, body_ast, env, code, pooled)
+
+    return function
+
+
+def _compile_call_expression(node: ast.CallExpression) -> Code:
+    function = _compile_expression(node.function)
+    args = [_compile_expression(arg) for arg in node.arguments]
+
+    # Calls of functions that make no closures run inline; the rest, and
+    # any tail call the body hands back, go through _call.
+    if len(args) == 1:
+        arg0 = args[0]
+
+        def call1(env: objmod.Environment) -> objmod.Object:
+            func: Any = function(env)
+            val = arg0(env)
+            if type(func) is not ClosureFunction or not func.pooled:
+                return _call(func, [val])
+            call_env = acquire_environment(func.env)
+            if func.parameters:
+                call_env.set(func.parameters[0].value, val)
+            result: Any = func.code(call_env)
+            release_environment(call_env)
+            if type(result) is _TailCall:
+                return _call(result.func, result.vals)
+            return result
+
+        return call1
+
+    def call(env: objmod.Environment) -> objmod.Object:
+        func: Any = function(env)
+        vals = [arg(env) for arg in args]
+        if type(func) is not ClosureFunction or not func.pooled:
+            return _call(func, vals)
+        call_env = acquire_environment(func.env)
+        for param, val in zip(func.parameters, vals):
+            call_env.set(param.value, val)
+        result: Any = func.code(call_env)
+        release_environment(call_env)
+        if type(result) is _TailCall:
+            return _call(result.func, result.vals)
+        return result
+
+    return call
+
+
+def _compile_tail_call(node: ast.CallExpression) -> Code:
+    function = _compile_expression(node.function)
+    args = [_compile_expression(arg) for arg in node.arguments]
+
+    def tail_call(env: objmod.Environment) -> objmod.Object:
+        return _TailCall(function(env), [arg(env) for arg in args])
+
+    return tail_call
+
+
+def _call(func: Any, vals: List[objmod.Object]) -> objmod.Object:
+    """Calls ``func`` with ``vals``.
+
+    Calls in tail position come back as ``_TailCall`` and are run by this
+    loop, so tail recursion does not grow the Python stack.
+    """
+    finished: Optional[List[objmod.Environment]] = None
+    escapes = _escapes
+    while True:
+        if type(func) is not ClosureFunction:
+            result: Any = _call_builtin(func, vals)
+        else:
+            call_env = acquire_environment(func.env)
+            for param, val in zip(func.parameters, vals):
+                call_env.set(param.value, val)
+            result = func.code(call_env)
+            if func.pooled:
+                release_environment(call_env)
+            elif finished is None:
+                finished = [call_env]
+            else:
+                finished.append(call_env)
+            if type(result) is _TailCall:
+                func = result.func
+                vals = result.vals
+                continue
+        if (
+            finished is not None
+            and not holds_function(result)
+            and _escapes == escapes
+        ):
+            # As in evaluator._end_calls, nothing made in the calls can
+            # have kept their environments, so drop the cycles through them.
+            for call_env in finished:
+                call_env.close()
+        return result
+
+
+def _call_builtin(func: Any, vals: List[objmod.Object]) -> objmod.Object:
+    if type(func) is not Builtin:
+        raise MonkeyError(f"not a function: {func.type()}")
+    result: Any = func.fn(vals, _call)
+    if type(result) is Error:
+        raise MonkeyError(result.message)
+    return result
@@ -0,0 +1,139 @@
+import dataclasses
+import io
+from typing import Dict, List, Tuple
+
+# An instruction stream is a flat list of ints: every opcode is followed by
+# its operands, one list element per operand.
+Instructions = List[int]
+
+OP_CONSTANT = 0
+OP_POP = 1
+OP_ADD = 2
+OP_SUB = 3
+OP_MUL = 4
+OP_DIV = 5
+OP_TRUE = 6
+OP_FALSE = 7
+OP_EQUAL = 8
+OP_NOT_EQUAL = 9
+OP_GREATER_THAN = 10
+OP_LESS_THAN = 11
+OP_MINUS = 12
+OP_BANG = 13
+OP_JUMP_NOT_TRUTHY = 14
+OP_JUMP = 15
+OP_NULL = 16
+OP_GET_GLOBAL = 17
+OP_SET_GLOBAL = 18
+OP_GET_LOCAL = 19
+OP_SET_LOCAL = 20
+OP_CALL = 21
+OP_RETURN_VALUE = 22
+OP_RETURN = 23
+OP_CLOSURE = 24
+OP_GET_FREE = 25
+OP_CURRENT_CLOSURE = 26
+OP_ASSIGN_GLOBAL = 27
+OP_SET_FREE = 28
+OP_ARRAY = 29
+OP_INDEX = 30
+OP_MAKE_CELL = 31
+OP_GET_LOCAL_CELL = 32
+OP_SET_LOCAL_CELL = 33
+OP_GET_FREE_CELL = 34
+OP_ASSIGN_LOCAL = 35
+OP_ASSIGN_LOCAL_CELL = 36
+OP_CAPTURE_LOCAL = 37
+OP_CAPTURE_FREE = 38
+
+
+@dataclasses.dataclass(frozen=True)
+class Definition:
+    name: str
+    operand_count: int
+
+
+_definitions: Dict[int, Definition] = {
+    OP_CONSTANT: Definition("OpConstant", 1),
+    OP_POP: Definition("OpPop", 0),
+    OP_ADD: Definition("OpAdd", 0),
+    OP_SUB: Definition("OpSub", 0),
+    OP_MUL: Definition("OpMul", 0),
+    OP_DIV: Definition("OpDiv", 0),
+    OP_TRUE: Definition("OpTrue", 0),
+    OP_FALSE: Definition("OpFalse", 0),
+    OP_EQUAL: Definition("OpEqual", 0),
+    OP_NOT_EQUAL: Definition("OpNotEqual", 0),
+    OP_GREATER_THAN: Definition("OpGreaterThan", 0),
+    OP_LESS_THAN: Definition("OpLessThan", 0),
+    OP_MINUS: Definition("OpMinus", 0),
+    OP_BANG: Definition("OpBang", 0),
+    OP_JUMP_NOT_TRUTHY: Definition("OpJumpNotTruthy", 1),
+    OP_JUMP: Definition("OpJump", 1),
+    OP_NULL: Definition("OpNull", 0),
+    OP_GET_GLOBAL: Definition("OpGetGlobal", 1),
+    OP_SET_GLOBAL: Definition("OpSetGlobal", 1),
+    OP_GET_LOCAL: Definition("OpGetLocal", 1),
+    OP_SET_LOCAL: Definition("OpSetLocal", 1),
+    OP_CALL: Definition("OpCall", 1),
+    OP_RETURN_VALUE: Definition("OpReturnValue", 0),
+    OP_RETURN: Definition("OpReturn", 0),
+    OP_CLOSURE: Definition("OpClosure", 2),
+    OP_GET_FREE: Definition("OpGetFree", 1),
+    OP_CURRENT_CLOSURE: Definition("OpCurrentClosure", 0),
+    OP_ASSIGN_GLOBAL: Definition("OpAssignGlobal", 1),
+    OP_SET_FREE: Definition("OpSetFree", 1),
+    OP_ARRAY: Definition("OpArray", 1),
+    OP_INDEX: Definition("OpIndex", 0),
+    OP_MAKE_CELL: Definition("OpMakeCell", 1),
+    OP_GET_LOCAL_CELL: Definition("OpGetLocalCell", 1),
+    OP_SET_LOCAL_CELL: Definition("OpSetLocalCell", 1),
+    OP_GET_FREE_CELL: Definition("OpGetFreeCell", 1),
+    OP_ASSIGN_LOCAL: Definition("OpAssignLocal", 1),
+    OP_ASSIGN_LOCAL_CELL: Definition("OpAssignLocalCell", 1),
+    OP_CAPTURE_LOCAL: Definition("OpCaptureLocal", 1),
+    OP_CAPTURE_FREE: Definition("OpCaptureFree", 1),
+}
+
+
+def lookup(op: int) -> Definition:
+    defn = _definitions.get(op)
+    if defn is None:
+        raise KeyError(f"opcode {op} undefined")
+    return defn
+
+
+def make(op: int, *operands: int) -> Instructions:
+    defn = _definitions.get(op)
+    if defn is None or len(operands) != defn.operand_count:
+        return []
+    return [op, *operands]
+
+
+def read_operands(
+    defn: Definition, ins: Instructions, offset: int
+) -> Tuple[List[int], int]:
+    operands = ins[offset : offset + defn.operand_count]
+    return (operands, defn.operand_count)
+
+
+def instructions_to_str(ins: Instructions) -> str:
+    buffer = io.StringIO()
+    i = 0
+    while i < len(ins):
+        defn = lookup(ins[i])
+        operands, read = read_operands(defn, ins, i + 1)
+        print(f"{i:04d} {_fmt_instruction(defn, operands)}", file=buffer)
+        i += 1 + read
+    return buffer.getvalue()
+
+
+def _fmt_instruction(defn: Definition, operands: List[int]) -> str:
+    if len(operands) != defn.operand_count:
+        return (
+            f"ERROR: operand len {len(operands)} does not match defined "
+            f"{defn.operand_count}\n"
+        )
+    if defn.operand_count == 0:
+        return defn.name
+    return " ".join([defn.name] + [str(o) for o in operands])
@@ -0,0 +1,512 @@
+import dataclasses
+from typing import Dict, List, Optional, Set, Tuple, Union, cast
+from . import ast
+from . import capture
+from . import code
+from . import obj as objmod
+from . import resolver
+
+GLOBAL_SCOPE = "GLOBAL"
+LOCAL_SCOPE = "LOCAL"
+FREE_SCOPE = "FREE"
+FUNCTION_SCOPE = "FUNCTION"
+
+
+@dataclasses.dataclass(frozen=True)
+class Symbol:
+    name: str
+    scope: str
+    index: int
+    # Whether the binding lives in an obj.Cell shared with closures.
+    cell: bool = False
+
+
+class SymbolTable:
+    """Names bound in one function body (or at the top level).
+
+    ``cells`` holds the names whose bindings closures may see change. Locals
+    among them live in cells; globals are shared anyway, but a function
+    bound to one of them cannot refer to itself as the current closure.
+
+    As in ``resolver.Resolver``, every ``let`` of a function body gets a
+    local up front, but ``hidden`` keeps a name from the body itself until
+    its ``let``; code before that resolves the name in the enclosing scopes,
+    as the evaluator does. Nested functions see every local. A read of a
+    local or free variable that is still unbound goes on to the next
+    enclosing binding of its name, found by ``fallback``.
+    """
+
+    outer: Optional["SymbolTable"]
+    free_symbols: List[Symbol]
+    num_definitions: int
+    cells: Set[str]
+    hidden: Set[str]
+    _store: Dict[str, Symbol]
+    # Free variables and the name of the function being defined.
+    _outer_store: Dict[str, Symbol]
+
+    def __init__(self, outer: Optional["SymbolTable"] = None) -> None:
+        self.outer = outer
+        self.free_symbols = []
+        self.num_definitions = 0
+        self.cells = set()
+        self.hidden = set()
+        self._store = {}
+        self._outer_store = {}
+
+    def define(self, name: str) -> Symbol:
+        # Rebinding a name in the same scope reuses its slot, so a REPL
+        # session does not grow the globals every time a name is re-let.
+        scope = LOCAL_SCOPE if self.outer else GLOBAL_SCOPE
+        existing = self._store.get(name)
+        if existing is not None and existing.scope == scope:
+            return existing
+        cell = scope == LOCAL_SCOPE and name in self.cells
+        symbol = Symbol(name, scope, self.num_definitions, cell)
+        self._store[name] = symbol
+        self.num_definitions += 1
+        return symbol
+
+    def define_function_name(self, name: str) -> Symbol:
+        symbol = Symbol(name, FUNCTION_SCOPE, 0)
+        self._outer_store[name] = symbol
+        return symbol
+
+    def resolve(self, name: str, nested: bool = False) -> Optional[Symbol]:
+        """The symbol ``name`` refers to in this body, or in a function
+        nested in it for ``nested``.
+        """
+        symbol = self._store.get(name)
+        if symbol is not None and (nested or name not in self.hidden):
+            return symbol
+        return self._resolve_outer(name)
+
+    def fallback(self, symbol: Symbol) -> Optional[Symbol]:
+        """The symbol the name of local or free ``symbol`` refers to while
+        ``symbol`` is unbound, captured as a free variable if need be, or
+        None for a symbol that is always bound.
+        """
+        if symbol.scope == LOCAL_SCOPE:
+            found = self._resolve_outer(symbol.name)
+        elif symbol.scope == FREE_SCOPE:
+            outer = cast(SymbolTable, self.outer)
+            found = outer.fallback(self.free_symbols[symbol.index])
+            if found is not None and found.scope != GLOBAL_SCOPE:
+                found = self._capture(found)
+        else:
+            return None
+        if found is None:
+            found = self.global_table().define(symbol.name)
+        return found
+
+    def fallbacks(self, num_locals: int) -> List[Optional[Tuple[str, int]]]:
+        """The fallbacks of the locals, padded to ``num_locals``, and of the
+        free variables, as ``obj.CompiledFunction`` keeps them.
+        """
+        fallbacks: List[Optional[Tuple[str, int]]] = [None] * num_locals
+        for symbol in list(self._store.values()):
+            if symbol.scope == LOCAL_SCOPE:
+                fallbacks[symbol.index] = _entry(self.fallback(symbol))
+        # Capturing a fallback adds a free variable, which needs one in turn.
+        i = 0
+        while i < len(self.free_symbols):
+            original = self.free_symbols[i]
+            free = Symbol(original.name, FREE_SCOPE, i, original.cell)
+            fallbacks.append(_entry(self.fallback(free)))
+            i += 1
+        return fallbacks
+
+    def global_table(self) -> "SymbolTable":
+        table = self
+        while table.outer is not None:
+            table = table.outer
+        return table
+
+    def names(self) -> List[str]:
+        names = [""] * self.num_definitions
+        for symbol in self._store.values():
+            if symbol.scope in (GLOBAL_SCOPE, LOCAL_SCOPE):
+                names[symbol.index] = symbol.name
+        return names
+
+    def _resolve_outer(self, name: str) -> Optional[Symbol]:
+        symbol = self._outer_store.get(name)
+        if symbol is not None or self.outer is None:
+            return symbol
+        symbol = self.outer.resolve(name, True)
+        if symbol is None or symbol.scope == GLOBAL_SCOPE:
+            return symbol
+        return self._define_free(symbol)
+
+    def _define_free(self, original: Symbol) -> Symbol:
+        symbol = self._capture(original)
+        self._outer_store[original.name] = symbol
+        return symbol
+
+    def _capture(self, original: Symbol) -> Symbol:
+        """A free variable holding ``original``, which the name need not
+        resolve to.
+        """
+        if original in self.free_symbols:
+            index = self.free_symbols.index(original)
+        else:
+            self.free_symbols.append(original)
+            index = len(self.free_symbols) - 1
+        return Symbol(original.name, FREE_SCOPE, index, original.cell)
+
+
+def _entry(symbol: Optional[Symbol]) -> Optional[Tuple[str, int]]:
+    return None if symbol is None else (symbol.scope, symbol.index)
+
+
+@dataclasses.dataclass(frozen=True)
+class Bytecode:
+    instructions: code.Instructions
+    constants: List[objmod.Object]
+    global_names: List[str]
+
+
+class Compiler:
+    """Lowers an ``ast.Program`` to a flat instruction stream for ``vm.VM``.
+
+    Names that cannot be resolved at compile time are bound to a global slot
+    on first use, so functions may refer to globals defined later in the
+    program just like they can in the tree-walking evaluator. A builtin is
+    such a global that is never set.
+
+    Names bound anywhere in a function body are locals of its calls, with
+    the visibility described in ``SymbolTable``. Closures hold copies of the
+    values of their free variables, except for locals that some closure or
+    the call itself assigns or binds again after a closure may have
+    captured them. Those live in an ``obj.Cell`` that the call and all its
+    closures share, and are read and written through it.
+    """
+
+    _constants: List[objmod.Object]
+    _symbol_table: SymbolTable
+    _scopes: List[code.Instructions]
+
+    def __init__(
+        self,
+        symbol_table: Optional[SymbolTable] = None,
+        constants: Optional[List[objmod.Object]] = None,
+    ) -> None:
+        self._constants = constants if constants is not None else []
+        self._symbol_table = symbol_table if symbol_table else SymbolTable()
+        self._scopes = [[]]
+
+    def compile(self, program: ast.Program) -> None:
+        statements = program.statements
+        self._symbol_table.global_table().cells |= _cell_names(statements)
+        for stmt in statements:
+            self._compile_statement(stmt)
+        if not statements or not isinstance(statements[-1], ast.ExpressionStatement):
+            # The result of a program is the last popped value; keep it NULL
+            # when the program does not end with an expression.
+            self._emit(code.OP_NULL)
+            self._emit(code.OP_POP)
+        self._emit(code.OP_RETURN)
+
+    def bytecode(self) -> Bytecode:
+        return Bytecode(
+            self._scopes[-1],
+            self._constants,
+            self._symbol_table.global_table().names(),
+        )
+
+    def _compile_statement(self, stmt: ast.Statement) -> None:
+        if isinstance(stmt, ast.ExpressionStatement):
+            self._compile_expression(cast(ast.Expression, stmt.expression))
+            self._emit(code.OP_POP)
+        elif isinstance(stmt, ast.LetStatement):
+            name = stmt.name.value
+            if isinstance(stmt.value, ast.FunctionLiteral):
+                self._compile_function_literal(stmt.value, name)
+            else:
+                self._compile_expression(cast(ast.Expression, stmt.value))
+            symbol = self._symbol_table.define(name)
+            self._symbol_table.hidden.discard(name)
+            if symbol.scope == GLOBAL_SCOPE:
+                self._emit(code.OP_SET_GLOBAL, symbol.index)
+            elif symbol.cell:
+                self._emit(code.OP_SET_LOCAL_CELL, symbol.index)
+            else:
+                self._emit(code.OP_SET_LOCAL, symbol.index)
+        elif isinstance(stmt, ast.ReturnStatement):
+            self._compile_expression(cast(ast.Expression, stmt.return_value))
+            self._emit(code.OP_RETURN_VALUE)
+        elif isinstance(stmt, ast.AssignStatement):
+            self._compile_expression(stmt.value)
+            self._assign_symbol(stmt.name.value)
+        elif isinstance(stmt, ast.WhileStatement):
+            start = len(self._scopes[-1])
+            self._compile_expression(stmt.condition)
+            jump_not_truthy = self._emit(code.OP_JUMP_NOT_TRUTHY, -1)
+            for inner in stmt.body.statements:
+                self._compile_statement(inner)
+            self._emit(code.OP_JUMP, start)
+            self._change_operand(jump_not_truthy, len(self._scopes[-1]))
+
+    def _compile_block_value(self, block: ast.BlockStatement) -> None:
+        """Compiles a block so that it leaves exactly one value on the stack."""
+        statements = block.statements
+        if not statements:
+            self._emit(code.OP_NULL)
+            return
+        for stmt in statements[:-1]:
+            self._compile_statement(stmt)
+        last = statements[-1]
+        if isinstance(last, ast.ExpressionStatement):
+            self._compile_expression(cast(ast.Expression, last.expression))
+        else:
+            self._compile_statement(last)
+            if not isinstance(last, ast.ReturnStatement):
+                self._emit(code.OP_NULL)
+
+    def _compile_expression(self, node: ast.Expression) -> None:
+        if isinstance(node, ast.IntegerLiteral):
+            self._emit(code.OP_CONSTANT, self._add_constant(objmod.integer(node.value)))
+        elif isinstance(node, ast.Boolean):
+            self._emit(code.OP_TRUE if node.value else code.OP_FALSE)
+        elif isinstance(node, ast.PrefixExpression):
+            self._compile_expression(node.right)
+            if node.operator == "!":
+                self._emit(code.OP_BANG)
+            elif node.operator == "-":
+                self._emit(code.OP_MINUS)
+        elif isinstance(node, ast.InfixExpression):
+            self._compile_expression(node.left)
+            self._compile_expression(node.right)
+            op = _infix_opcodes.get(node.operator)
+            if op is not None:
+                self._emit(op)
+        elif isinstance(node, ast.Identifier):
+            self._load_symbol(self._resolve(node.value))
+        elif isinstance(node, ast.IfExpression):
+            self._compile_if_expression(node)
+        elif isinstance(node, ast.FunctionLiteral):
+            self._compile_function_literal(node)
+        elif isinstance(node, ast.CallExpression):
+            self._compile_expression(node.function)
+            for arg in node.arguments:
+                self._compile_expression(arg)
+            self._emit(code.OP_CALL, len(node.arguments))
+        elif isinstance(node, ast.ArrayLiteral):
+            for element in node.elements:
+                self._compile_expression(element)
+            self._emit(code.OP_ARRAY, len(node.elements))
+        elif isinstance(node, ast.IndexExpression):
+            self._compile_expression(node.left)
+            self._compile_expression(node.index)
+            self._emit(code.OP_INDEX)
+        else:
+            self._emit(code.OP_NULL)
+
+    def _compile_if_expression(self, node: ast.IfExpression) -> None:
+        self._compile_expression(node.condition)
+        jump_not_truthy = self._emit(code.OP_JUMP_NOT_TRUTHY, -1)
+        self._compile_block_value(node.consequence)
+        jump = self._emit(code.OP_JUMP, -1)
+        self._change_operand(jump_not_truthy, len(self._scopes[-1]))
+        if node.alternative is None:
+            self._emit(code.OP_NULL)
+        else:
+            self._compile_block_value(node.alternative)
+        self._change_operand(jump, len(self._scopes[-1]))
+
+    def _compile_function_literal(
+        self, node: ast.FunctionLiteral, name: Optional[str] = None
+    ) -> None:
+        statements = node.body.statements
+        outer = self._symbol_table
+        self._scopes.append([])
+        self._symbol_table = SymbolTable(outer)
+        if name is not None and name not in outer.cells:
+            self._symbol_table.define_function_name(name)
+        parameters = [param.value for param in node.parameters]
+        lets = resolver.collect_lets(statements)
+        self._symbol_table.cells = _cell_names(statements) & {*parameters, *lets}
+        self._symbol_table.hidden = set(lets) - set(parameters)
+        for param in parameters:
+            self._symbol_table.define(param)
+        for let in lets:
+            self._symbol_table.define(let)
+        # Cells must exist before any closure can capture them, so the
+        # locals that need one are bound to it on entry.
+        for cell_name in sorted(self._symbol_table.cells):
+            symbol = self._symbol_table.define(cell_name)
+            self._emit(code.OP_MAKE_CELL, symbol.index)
+        self._compile_block_value(node.body)
+        self._emit(code.OP_RETURN_VALUE)
+
+        num_locals = max(self._symbol_table.num_definitions, len(node.parameters))
+        fallbacks = self._symbol_table.fallbacks(num_locals)
+        free_symbols = self._symbol_table.free_symbols
+        names = self._symbol_table.names()
+        names.extend([""] * (num_locals - len(names)))
+        names.extend(symbol.name for symbol in free_symbols)
+        instructions = self._scopes.pop()
+        self._symbol_table = cast(SymbolTable, self._symbol_table.outer)
+
+        for symbol in free_symbols:
+            self._load_captured(symbol)
+        fn = objmod.CompiledFunction(
+            instructions,
+            num_locals,
+            len(node.parameters),
+            names,
+            objmod.function_source(node.parameters, node.body),
+            fallbacks,
+        )
+        self._emit(code.OP_CLOSURE, self._add_constant(fn), len(free_symbols))
+
+    def _resolve(self, name: str) -> Symbol:
+        symbol = self._symbol_table.resolve(name)
+        if symbol is None:
+            symbol = self._symbol_table.global_table().define(name)
+        return symbol
+
+    def _load_symbol(self, symbol: Symbol) -> None:
+        if symbol.scope == GLOBAL_SCOPE:
+            self._emit(code.OP_GET_GLOBAL, symbol.index)
+        elif symbol.scope == LOCAL_SCOPE:
+            op = code.OP_GET_LOCAL_CELL if symbol.cell else code.OP_GET_LOCAL
+            self._emit(op, symbol.index)
+        elif symbol.scope == FREE_SCOPE:
+            op = code.OP_GET_FREE_CELL if symbol.cell else code.OP_GET_FREE
+            self._emit(op, symbol.index)
+        else:
+            self._emit(code.OP_CURRENT_CLOSURE)
+
+    def _load_captured(self, symbol: Symbol) -> None:
+        """Loads what a closure keeps of ``symbol``: its cell if it has one,
+        or else its value, None while it is unbound.
+        """
+        if symbol.scope == LOCAL_SCOPE:
+            self._emit(code.OP_CAPTURE_LOCAL, symbol.index)
+        elif symbol.scope == FREE_SCOPE:
+            self._emit(code.OP_CAPTURE_FREE, symbol.index)
+        else:
+            self._emit(code.OP_CURRENT_CLOSURE)
+
+    def _assign_symbol(self, name: str) -> None:
+        symbol = self._resolve(name)
+        if symbol.scope == GLOBAL_SCOPE:
+            # Unlike a let, fails if the global is not bound yet.
+            self._emit(code.OP_ASSIGN_GLOBAL, symbol.index)
+        elif symbol.scope == LOCAL_SCOPE:
+            # Unlike a let, assigns the fallback if the local is not bound.
+            op = code.OP_ASSIGN_LOCAL_CELL if symbol.cell else code.OP_ASSIGN_LOCAL
+            self._emit(op, symbol.index)
+        else:
+            # A free variable that is assigned is in a cell of the call that
+            # binds it. So is the name of the function being defined, which
+            # therefore never resolves to the current closure here.
+            self._emit(code.OP_SET_FREE, symbol.index)
+
+    def _add_constant(self, obj: objmod.Object) -> int:
+        self._constants.append(obj)
+        return len(self._constants) - 1
+
+    def _emit(self, op: int, *operands: int) -> int:
+        instructions = self._scopes[-1]
+        pos = len(instructions)
+        instructions.extend(code.make(op, *operands))
+        return pos
+
+    def _change_operand(self, pos: int, operand: int) -> None:
+        self._scopes[-1][pos + 1] = operand
+
+
+_infix_opcodes: Dict[str, int] = {
+    "+": code.OP_ADD,
+    "-": code.OP_SUB,
+    "*": code.OP_MUL,
+    "/": code.OP_DIV,
+    "==": code.OP_EQUAL,
+    "!=": code.OP_NOT_EQUAL,
+    ">": code.OP_GREATER_THAN,
+    "<": code.OP_LESS_THAN,
+}
+
+
+def _cell_names(statements: List[ast.Statement]) -> Set[str]:
+    """Names that functions nested in ``statements`` may read or assign and
+    that are assigned somewhere in them, or bound by a ``let`` after such a
+    function is made.
+    """
+    assigned: Set[str] = set()
+    pending: List[object] = list(statements)
+    while pending:
+        value = pending.pop()
+        if isinstance(value, ast.AssignStatement):
+            assigned.add(value.name.value)
+        if isinstance(value, ast.Node):
+            pending.extend(vars(value).values())
+        elif isinstance(value, list):
+            pending.extend(value)
+
+    events: List[Union[ast.FunctionLiteral, str]] = []
+    for stmt in statements:
+        _add_events(stmt, events)
+    cells: Set[str] = set()
+    later: Set[str] = set()
+    for event in reversed(events):
+        if isinstance(event, str):
+            later.add(event)
+        else:
+            cells |= capture.free_names(event) & (assigned | later)
+    return cells
+
+
+def _add_events(
+    node: Optional[ast.Node], events: List[Union[ast.FunctionLiteral, str]]
+) -> None:
+    """Adds what ``node`` does, in evaluation order, to ``events``: make a
+    closure from a function literal, or bind a name with a ``let``.
+    """
+    if isinstance(node, ast.LetStatement):
+        if isinstance(node.value, ast.FunctionLiteral):
+            # The function refers to itself as the current closure, which
+            # is as if its name were bound before it is made.
+            events.append(node.name.value)
+            events.append(node.value)
+        else:
+            _add_events(node.value, events)
+            events.append(node.name.value)
+    elif isinstance(node, ast.ReturnStatement):
+        _add_events(node.return_value, events)
+    elif isinstance(node, ast.ExpressionStatement):
+        _add_events(node.expression, events)
+    elif isinstance(node, ast.AssignStatement):
+        _add_events(node.value, events)
+    elif isinstance(node, ast.BlockStatement):
+        for stmt in node.statements:
+            _add_events(stmt, events)
+    elif isinstance(node, ast.WhileStatement):
+        start = len(events)
+        _add_events(node.condition, events)
+        _add_events(node.body, events)
+        # The loop runs its lets again after every literal in it is made.
+        events.extend([event for event in events[start:] if isinstance(event, str)])
+    elif isinstance(node, ast.FunctionLiteral):
+        events.append(node)
+    elif isinstance(node, ast.PrefixExpression):
+        _add_events(node.right, events)
+    elif isinstance(node, ast.InfixExpression):
+        _add_events(node.left, events)
+        _add_events(node.right, events)
+    elif isinstance(node, ast.IfExpression):
+        _add_events(node.condition, events)
+        _add_events(node.consequence, events)
+        _add_events(node.alternative, events)
+    elif isinstance(node, ast.CallExpression):
+        _add_events(node.function, events)
+        for arg in node.arguments:
+            _add_events(arg, events)
+    elif isinstance(node, ast.ArrayLiteral):
+        for element in node.elements:
+            _add_events(element, events)
+    elif isinstance(node, ast.IndexExpression):
+        _add_events(node.left, events)
+        _add_events(node.index, events)
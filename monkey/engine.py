@@ -0,0 +1,309 @@
+import mmap
+import os
+from typing import Callable, Dict, Iterator, List, Optional
+from . import ast
+from . import cache
+from . import closure_compiler
+from . import compiler
+from . import evaluator
+from . import lexer
+from . import metrics as metricsmod
+from . import obj as objmod
+from . import optimizer
+from . import parser
+from . import resolver
+from . import stack_evaluator
+from . import vm
+
+DEFAULT_ENGINE = "eval"
+
+
+class ParseError(Exception):
+    def __init__(self, errors: List[str]) -> None:
+        super().__init__("\n".join(errors))
+        self.errors = errors
+
+
+class Engine:
+    """Runs parsed programs and keeps global state between runs."""
+
+    def run(self, program: ast.Program) -> objmod.Object:
+        raise NotImplementedError()
+
+    def run_statement(self, stmt: ast.Statement) -> objmod.Object:
+        """Runs one top-level statement against the same global state.
+
+        A top-level ``return`` comes back as an ``obj.ReturnValue`` so that
+        a caller feeding a program statement by statement knows to stop.
+        """
+        raise NotImplementedError()
+
+    def run_cached(self, path: str, optimize: bool = True) -> objmod.Object:
+        """Runs the script at ``path``, reusing its cached program."""
+        return self.run(load_file(path, optimize))
+
+
+class EvaluatorEngine(Engine):
+    """The recursive tree-walking evaluator."""
+
+    env: objmod.Environment
+
+    def __init__(self) -> None:
+        self.env = objmod.Environment()
+
+    def run(self, program: ast.Program) -> objmod.Object:
+        return evaluator.eval(program, self.env)
+
+    def run_statement(self, stmt: ast.Statement) -> objmod.Object:
+        return evaluator.eval(stmt, self.env)
+
+
+class StackEngine(Engine):
+    """The evaluator with an explicit heap stack instead of Python recursion."""
+
+    env: objmod.Environment
+
+    def __init__(self) -> None:
+        self.env = objmod.Environment()
+
+    def run(self, program: ast.Program) -> objmod.Object:
+        return stack_evaluator.eval(program, self.env)
+
+    def run_statement(self, stmt: ast.Statement) -> objmod.Object:
+        return stack_evaluator.eval(stmt, self.env)
+
+
+class SlotEngine(Engine):
+    """The tree-walking evaluator on a resolved, slot-indexed program."""
+
+    resolver: resolver.Resolver
+    frame: objmod.Frame
+
+    def __init__(self) -> None:
+        self.resolver = resolver.Resolver()
+        self.frame = objmod.Frame(0)
+
+    def run(self, program: ast.Program) -> objmod.Object:
+        resolved = self.resolver.resolve(program)
+        self.frame.grow(self.resolver.global_count)
+        return evaluator.eval(resolved, self.frame)
+
+    def run_statement(self, stmt: ast.Statement) -> objmod.Object:
+        resolved = self.resolver.resolve(ast.Program([stmt]))
+        self.frame.grow(self.resolver.global_count)
+        return evaluator.eval(resolved.statements[0], self.frame)
+
+
+class ClosureEngine(Engine):
+    """Turns the AST into pre-bound Python closures and calls them."""
+
+    env: objmod.Environment
+
+    def __init__(self) -> None:
+        self.env = objmod.Environment()
+
+    def run(self, program: ast.Program) -> objmod.Object:
+        return closure_compiler.compile_program(program)(self.env)
+
+    def run_statement(self, stmt: ast.Statement) -> objmod.Object:
+        return closure_compiler.compile_statement(stmt)(self.env)
+
+
+class VMEngine(Engine):
+    """Compiles to bytecode and runs it on the stack-based VM."""
+
+    symbol_table: compiler.SymbolTable
+    constants: List[objmod.Object]
+    globals: List[Optional[objmod.Object]]
+
+    def __init__(self) -> None:
+        self.symbol_table = compiler.SymbolTable()
+        self.constants = []
+        self.globals = []
+
+    def run(self, program: ast.Program) -> objmod.Object:
+        return self._machine(program).run()
+
+    def run_statement(self, stmt: ast.Statement) -> objmod.Object:
+        machine = self._machine(ast.Program([stmt]))
+        result = machine.run()
+        if machine.returned:
+            return objmod.ReturnValue(result)
+        return result
+
+    def run_cached(self, path: str, optimize: bool = True) -> objmod.Object:
+        if self.constants or self.globals:
+            # Cached bytecode is compiled for a VM without earlier globals.
+            return super().run_cached(path, optimize)
+        bytecode = load_bytecode(path, optimize)
+        for name in bytecode.global_names:
+            self.symbol_table.define(name)
+        self.constants.extend(bytecode.constants)
+        return vm.VM(bytecode, self.globals).run()
+
+    def _machine(self, program: ast.Program) -> vm.VM:
+        comp = compiler.Compiler(self.symbol_table, self.constants)
+        comp.compile(program)
+        return vm.VM(comp.bytecode(), self.globals)
+
+
+ENGINES: Dict[str, Callable[[], Engine]] = {
+    "eval": EvaluatorEngine,
+    "slots": SlotEngine,
+    "stack": StackEngine,
+    "closure": ClosureEngine,
+    "vm": VMEngine,
+}
+
+
+def new_engine(name: str = DEFAULT_ENGINE) -> Engine:
+    factory = ENGINES.get(name)
+    if factory is None:
+        raise ValueError(f"unknown engine: {name}")
+    return factory()
+
+
+def parse(source: str) -> ast.Program:
+    psr = parser.Parser(lexer.Lexer(source))
+    program = psr.parse()
+    if len(psr.errors) > 0:
+        raise ParseError(psr.errors)
+    return program
+
+
+def run(
+    source: str,
+    engine: str = DEFAULT_ENGINE,
+    optimize: bool = True,
+    metrics: Optional[metricsmod.Metrics] = None,
+) -> objmod.Object:
+    """Parses and runs ``source`` on a fresh engine and returns the result.
+
+    With ``metrics`` the run goes through ``run_measured``.
+    """
+    if metrics is not None:
+        return run_measured(new_engine(engine), source, optimize, metrics)
+    program = parse(source)
+    if optimize:
+        program = optimizer.optimize(program)
+    return new_engine(engine).run(program)
+
+
+def run_measured(
+    eng: Engine, source: str, optimize: bool, metrics: metricsmod.Metrics
+) -> objmod.Object:
+    """Runs ``source`` on ``eng`` one phase at a time, recording ``metrics``.
+
+    The source is lexed completely before parsing starts, so that the two
+    phases can be timed apart. Raises ParseError like ``parse``.
+    """
+    with metrics.phase("lex"):
+        tokens = lexer.scan(source)
+    metrics.tokens += len(tokens) - 1
+    with metrics.phase("parse"):
+        psr = parser.Parser(tokens)
+        program = psr.parse()
+    if len(psr.errors) > 0:
+        raise ParseError(psr.errors)
+    metrics.nodes_built += metricsmod.count_nodes(program)
+    if optimize:
+        with metrics.phase("optimize"):
+            program = optimizer.optimize(program)
+    metrics.runs += 1
+    with metrics.phase("eval"), metrics.counting():
+        return eng.run(program)
+
+
+def parse_file(path: str) -> Iterator[ast.Statement]:
+    """Yields the top-level statements of the script at ``path`` in order.
+
+    The file is memory-mapped and lexed lazily, and each statement is
+    yielded as soon as it is parsed, so neither the source text nor the
+    whole AST is ever held in memory. ParseError is raised at the first
+    statement that fails to parse.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            tokens = lexer.tokenize_bytes(data)
+            try:
+                psr = parser.Parser(tokens)
+                for stmt in psr.parse_statements():
+                    if len(psr.errors) > 0:
+                        break
+                    yield stmt
+                if len(psr.errors) > 0:
+                    raise ParseError(psr.errors)
+            finally:
+                # The lexer holds a view of the map until it is closed.
+                tokens.close()
+
+
+def load_file(path: str, optimize: bool = True) -> ast.Program:
+    """Parses, and optionally optimizes, the script at ``path`` through the
+    on-disk cache (see ``cache.cached``).
+    """
+    kind = "ast.opt" if optimize else "ast"
+    return cache.cached(
+        path,
+        kind,
+        lambda source: _build_program(source, optimize),
+        cache.dump_program,
+        cache.load_program,
+    )
+
+
+def load_bytecode(path: str, optimize: bool = True) -> compiler.Bytecode:
+    """Compiles the script at ``path`` for a fresh VM through the on-disk
+    cache.
+    """
+
+    def build(source: str) -> compiler.Bytecode:
+        comp = compiler.Compiler()
+        comp.compile(_build_program(source, optimize))
+        return comp.bytecode()
+
+    kind = "bytecode.opt" if optimize else "bytecode"
+    return cache.cached(path, kind, build, cache.dump_bytecode, cache.load_bytecode)
+
+
+def _build_program(source: str, optimize: bool) -> ast.Program:
+    program = parse(source)
+    if optimize:
+        program = optimizer.optimize(program)
+    return program
+
+
+def run_file(
+    path: str,
+    engine: str = DEFAULT_ENGINE,
+    optimize: bool = True,
+    use_cache: bool = False,
+) -> objmod.Object:
+    """Runs the script at ``path`` one top-level statement at a time.
+
+    Statements flow from ``parse_file`` through the optimizer into the
+    engine, so memory is bounded by the largest statement plus whatever the
+    program itself keeps alive, however large the file. Statements before a
+    parse error have already run when ParseError is raised.
+
+    With ``use_cache`` the whole program is loaded through the on-disk
+    cache instead, which is faster for scripts that are run repeatedly but
+    holds the complete program in memory.
+    """
+    eng = new_engine(engine)
+    if use_cache:
+        return eng.run_cached(path, optimize)
+    result: objmod.Object = objmod.NULL
+    for stmt in parse_file(path):
+        statements = [stmt]
+        if optimize:
+            statements = optimizer.optimize(ast.Program(statements)).statements
+        for s in statements:
+            result = eng.run_statement(s)
+            if isinstance(result, objmod.ReturnValue):
+                return result.value
+            if isinstance(result, objmod.Error):
+                return result
+    return result
@@ -1,34 +1,115 @@
-from typing import cast, Optional, Tuple, List
+from typing import cast, Dict, Optional, Set, Tuple, List, TYPE_CHECKING
 from . import obj as objmod
 from . import ast
-from .obj import NULL, TRUE, FALSE
-
-
-def eval(node: ast.Node, env: objmod.Environment) -> objmod.Object:
+from . import builtins
+from . import capture
+from . import purity
+from .obj import NULL, TRUE, FALSE, INTEGER_TAG, RETURN_VALUE_TAG, FUNCTION_TAG
+from .obj import ERROR_TAG, BUILTIN_TAG
+from .obj import integer
+
+if TYPE_CHECKING:
+    from .metrics import Metrics
+    from .profiler import Hook
+
+# The enabled ``profiler.Hook``, if any. It is checked once per function
+# call, function literal and ``let``, so profiling costs nothing when off.
+_profiler: Optional["Hook"] = None
+
+def get_profiler() -> Optional["Hook"]:
+    return _profiler
+
+
+def set_profiler(profiler: Optional["Hook"]) -> None:
+    """Reports function events to ``profiler`` from now on, or to nothing
+    for None; see ``profiler.Hook.enable``.
+    """
+    global _profiler
+    _profiler = profiler
+
+
+# Results of calls to pure functions, or None to always evaluate calls.
+# Off unless set, since it costs memory for every function body it sees.
+_memo: Optional[purity.Memo] = None
+
+
+def get_memo() -> Optional[purity.Memo]:
+    return _memo
+
+
+def set_memo(memo: Optional[purity.Memo]) -> None:
+    global _memo
+    _memo = memo
+
+
+# Assignments of functions to bindings outside the environment they run in,
+# through which a closure may outlive the call that made it.
+_escapes = 0
+
+# Inline caches for identifiers and call sites evaluated in an Environment,
+# keyed by id of node. They are cleared when ``eval`` returns, so that they
+# keep no node alive and no id is reused while they hold it: every node
+# evaluated is part of the tree ``eval`` was given. An identifier remembers
+# how many levels out its binding was found. Every environment a node is
+# evaluated in has the same lexical nesting, and parameters are bound in all
+# of them alike, so the depth stays right unless a let in a function body
+# binds the name: whether that let ran differs between calls. Such names are
+# in _local_names and cached only at depth 0; adding one bumps _epoch,
+# dropping older entries.
+# A call site remembers the global environment and the function bound
+# there, checked against the version of the name, which a let rebinding it
+# bumps as well.
+_identifiers: Dict[int, Tuple[int, int]] = {}
+_call_sites: Dict[int, Tuple[str, int, int, objmod.Environment, objmod.Function]] = {}
+_epoch = 0
+_local_names: Set[str] = set()
+_versions: Dict[str, int] = {}
+_INLINE_CACHE_SIZE = 1 << 16
+
+
+class MonkeyError(Exception):
+    """Raised where a Monkey runtime error happens; ``eval`` returns it."""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.error = objmod.Error(message)
+
+
+def eval(node: ast.Node, env: objmod.Scope) -> objmod.Object:
+    """Evaluates ``node`` in ``env``, returning a runtime error as obj.Error."""
+    if type(env) is objmod.Environment:
+        capture.analyze(node)
+    try:
+        return _eval(node, env)
+    except MonkeyError as e:
+        return e.error
+    finally:
+        _identifiers.clear()
+        _call_sites.clear()
+
+
+def _eval(node: ast.Node, env: objmod.Scope) -> objmod.Object:
     if isinstance(node, ast.Program):
         program = cast(ast.Program, node)
         return _eval_program(program, env)
     elif isinstance(node, ast.ExpressionStatement):
         expr = cast(ast.ExpressionStatement, node)
-        return eval(cast(ast.Node, expr.expression), env)
+        return _eval(cast(ast.Node, expr.expression), env)
     elif isinstance(node, ast.IntegerLiteral):
-        return objmod.Integer(node.value)
+        boxed = _literals.get(node.value)
+        if boxed is None:
+            boxed = literal(node)
+        return boxed
     elif isinstance(node, ast.Boolean):
         return _native_to_boolean_object(node.value)
     elif isinstance(node, ast.PrefixExpression):
         prefixexpr = cast(ast.PrefixExpression, node)
-        right = eval(prefixexpr.right, env)
-        if _is_error(right):
-            return right
+        right = _eval(prefixexpr.right, env)
         return _eval_prefix_expression(prefixexpr.operator, right)
     elif isinstance(node, ast.InfixExpression):
         infixexpr = cast(ast.InfixExpression, node)
-        left = eval(infixexpr.left, env)
-        if _is_error(left):
-            return left
-        right = eval(infixexpr.right, env)
-        if _is_error(right):
-            return right
+        left = _eval(infixexpr.left, env)
+        right = _eval(infixexpr.right, env)
         return _eval_infix_expression(left, infixexpr.operator, right)
     elif isinstance(node, ast.BlockStatement):
         block = cast(ast.BlockStatement, node)
@@ -38,66 +119,212 @@ def eval(node: ast.Node, env: objmod.Environment) -> objmod.Object:
         return _eval_if_expression(ifexp, env)
     elif isinstance(node, ast.ReturnStatement):
         ret = cast(ast.ReturnStatement, node)
-        val = eval(cast(ast.Expression, ret.return_value), env)
-        if _is_error(val):
-            return val
+        val = _eval(cast(ast.Expression, ret.return_value), env)
         return objmod.ReturnValue(val)
     elif isinstance(node, ast.LetStatement):
         letstmt = cast(ast.LetStatement, node)
-        val = eval(cast(ast.Node, letstmt.value), env)
-        if _is_error(val):
-            return val
-        env.set(node.name.value, val)
+        val = _eval(cast(ast.Node, letstmt.value), env)
+        name = letstmt.name
+        if _memo is not None and name.value in _memo.watched:
+            _memo.invalidate()
+        if _profiler is not None and isinstance(letstmt.value, ast.FunctionLiteral):
+            _profiler.bind(letstmt.value, name.value)
+        if isinstance(name, ast.ResolvedIdentifier):
+            cast(objmod.Frame, env).slots[name.slot] = val
+        else:
+            environment = cast(objmod.Environment, env)
+            if environment.up(1) is None:
+                if environment.get_at(0, name.value) is not None:
+                    _versions[name.value] = _versions.get(name.value, 0) + 1
+            elif name.value not in _local_names:
+                _add_local_name(name.value)
+            environment.set(name.value, val)
+    elif isinstance(node, ast.ResolvedIdentifier):
+        return _eval_resolved_identifier(node, cast(objmod.Frame, env))
     elif isinstance(node, ast.Identifier):
-        ident = cast(ast.Identifier, node)
-        val, ok = env.get(ident.value)
-        if not ok:
-            return objmod.Error(f"identifier not found: {ident.value}")
-        return val
+        environment = cast(objmod.Environment, env)
+        cached = _identifiers.get(id(node))
+        if cached is not None and cached[0] == _epoch:
+            bound = environment.get_at(cached[1], node.value)
+            if bound is not None:
+                return bound
+        return _resolve_identifier(node, environment)
     elif isinstance(node, ast.FunctionLiteral):
+        if _profiler is not None:
+            _profiler.define(node)
+        if isinstance(node, ast.ResolvedFunctionLiteral):
+            return objmod.SlotFunction(node.parameters, node.body, env, node.frame_size)
         fn = cast(ast.FunctionLiteral, node)
-        return objmod.Function(fn.parameters, fn.body, env)
+        environment = capture.closure_env(fn, cast(objmod.Environment, env))
+        pooled = not fn.makes_closures
+        return objmod.Function(fn.parameters, fn.body, environment, pooled)
     elif isinstance(node, ast.CallExpression):
         callexp = cast(ast.CallExpression, node)
-        func = eval(callexp.function, env)
-        if _is_error(func):
-            return func
-        args, err = _eval_expression(callexp.arguments, env)
-        if err is not NULL:
-            return cast(objmod.Object, err)
+        if _metrics is not None and type(callexp.function) is ast.Identifier:
+            _count(callexp.function)
+        site = _call_sites.get(id(callexp))
+        if (
+            site is not None
+            and site[1] == _versions.get(site[0], 0)
+            and cast(objmod.Environment, env).up(site[2]) is site[3]
+        ):
+            func: objmod.Object = site[4]
+        else:
+            func = _resolve_callee(callexp, env)
+        args = _eval_expression(callexp.arguments, env)
         return _apply_function(func, args)
+    elif isinstance(node, ast.ArrayLiteral):
+        return objmod.array_of(_eval_expression(node.elements, env))
+    elif isinstance(node, ast.IndexExpression):
+        left = _eval(node.left, env)
+        index = _eval(node.index, env)
+        return _eval_index_expression(left, index)
+    elif isinstance(node, ast.WhileStatement):
+        return _eval_while_statement(node, env)
+    elif isinstance(node, ast.AssignStatement):
+        _eval_assign_statement(node, env)
     return NULL
 
 
-def _eval_program(program: ast.Program, env: objmod.Environment) -> objmod.Object:
+def _eval_program(program: ast.Program, env: objmod.Scope) -> objmod.Object:
     result: objmod.Object = NULL
 
     for stmt in program.statements:
-        result = eval(stmt, env)
-        if isinstance(result, objmod.ReturnValue):
-            retval = cast(objmod.ReturnValue, result)
-            return retval.value
-        elif isinstance(result, objmod.Error):
-            return result
+        result = _eval(stmt, env)
+        if result.tag == RETURN_VALUE_TAG:
+            return cast(objmod.ReturnValue, result).value
 
     return result
 
 
 def _eval_block_statements(
-    block: ast.BlockStatement, env: objmod.Environment
+    block: ast.BlockStatement, env: objmod.Scope
 ) -> objmod.Object:
     result: objmod.Object = NULL
 
     for stmt in block.statements:
-        result = eval(stmt, env)
-        rt = result.type()
-        if rt == objmod.RETURN_VALUE_OBJ or rt == objmod.ERROR_OBJ:
+        result = _eval(stmt, env)
+        if result.tag == RETURN_VALUE_TAG:
             return result
     return result
 
 
-def _is_error(obj: objmod.Object) -> bool:
-    return obj.type() == objmod.ERROR_OBJ
+def _eval_while_statement(
+    loop: ast.WhileStatement, env: objmod.Scope
+) -> objmod.Object:
+    condition = loop.condition
+    statements = loop.body.statements
+    while True:
+        cond = _eval(condition, env)
+        if cond is FALSE or cond is NULL:
+            return NULL
+        for stmt in statements:
+            if type(stmt) is ast.AssignStatement:
+                # The common case in loops, dispatched here rather than at
+                # the end of the chain in _eval.
+                if _metrics is not None:
+                    _count(stmt)
+                _eval_assign_statement(cast(ast.AssignStatement, stmt), env)
+                continue
+            result = _eval(stmt, env)
+            if result.tag == RETURN_VALUE_TAG:
+                return result
+
+
+def _eval_assign_statement(assign: ast.AssignStatement, env: objmod.Scope) -> None:
+    global _escapes
+    val = _eval(assign.value, env)
+    name = assign.name
+    if isinstance(name, ast.ResolvedIdentifier):
+        # Assigns the innermost binding that is bound, as lookups read it.
+        target: Optional[ast.ResolvedIdentifier] = name
+        while target is not None:
+            frame = cast(objmod.Frame, env)
+            depth = target.depth
+            while depth:
+                frame = cast(objmod.Frame, frame.outer)
+                depth -= 1
+            if frame.slots[target.slot] is not None:
+                frame.slots[target.slot] = val
+                break
+            target = target.outer
+        else:
+            raise MonkeyError(f"identifier not found: {name.value}")
+    else:
+        holder = cast(objmod.Environment, env).assign(name.value, val)
+        if holder is None:
+            raise MonkeyError(f"identifier not found: {name.value}")
+        if holder.up(1) is None:
+            _versions[name.value] = _versions.get(name.value, 0) + 1
+        if holder is not env and objmod.holds_function(val):
+            _escapes += 1
+    if _memo is not None and name.value in _memo.watched:
+        _memo.invalidate()
+
+
+def _eval_resolved_identifier(
+    ident: ast.ResolvedIdentifier, frame: objmod.Frame
+) -> objmod.Object:
+    scope = frame
+    depth = ident.depth
+    while depth:
+        scope = cast(objmod.Frame, scope.outer)
+        depth -= 1
+    val = scope.slots[ident.slot]
+    if val is None:
+        if ident.outer is not None:
+            return _eval_resolved_identifier(ident.outer, frame)
+        return _builtin(ident.value)
+    return val
+
+
+def _resolve_identifier(
+    ident: ast.Identifier, env: objmod.Environment
+) -> objmod.Object:
+    name = ident.value
+    depth, val = env.find(name)
+    if val is None:
+        return _builtin(name)
+    if depth == 0 or name not in _local_names:
+        if len(_identifiers) >= _INLINE_CACHE_SIZE:
+            _identifiers.clear()
+        _identifiers[id(ident)] = (_epoch, depth)
+    return val
+
+
+def _builtin(name: str) -> objmod.Builtin:
+    """The builtin an identifier bound nowhere refers to."""
+    builtin = builtins.lookup(name)
+    if builtin is None:
+        raise MonkeyError(f"identifier not found: {name}")
+    return builtin
+
+
+def _add_local_name(name: str) -> None:
+    global _epoch
+    _local_names.add(name)
+    _epoch += 1
+    _versions[name] = _versions.get(name, 0) + 1
+
+
+def _resolve_callee(callexp: ast.CallExpression, env: objmod.Scope) -> objmod.Object:
+    callee = callexp.function
+    if type(callee) is not ast.Identifier:
+        return _eval(callee, env)
+    name = cast(ast.Identifier, callee).value
+    environment = cast(objmod.Environment, env)
+    depth, val = environment.find(name)
+    if val is None:
+        return _builtin(name)
+    if val.tag == FUNCTION_TAG and name not in _local_names:
+        holder = cast(objmod.Environment, environment.up(depth))
+        if holder.up(1) is None:
+            if len(_call_sites) >= _INLINE_CACHE_SIZE:
+                _call_sites.clear()
+            version = _versions.get(name, 0)
+            function = cast(objmod.Function, val)
+            _call_sites[id(callexp)] = (name, version, depth, holder, function)
+    return val
 
 
 def _eval_prefix_expression(op: str, right: objmod.Object) -> objmod.Object:
@@ -106,7 +333,7 @@ def _eval_prefix_expression(op: str, right: objmod.Object) -> objmod.Object:
     elif op == "-":
         return _eval_minux_prefix_operator_expression(right)
     else:
-        return objmod.Error(f"unknown operator: {op}{right.type()}")
+        raise MonkeyError(f"unknown operator: {op}{right.type()}")
 
 
 def _eval_bang_operator_expression(right: objmod.Object) -> objmod.Object:
@@ -121,11 +348,11 @@ def _eval_bang_operator_expression(right: objmod.Object) -> objmod.Object:
 
 
 def _eval_minux_prefix_operator_expression(right: objmod.Object) -> objmod.Object:
-    if right.type() == objmod.INTEGER_OBJ:
+    if right.tag == INTEGER_TAG:
         intobj = cast(objmod.Integer, right)
-        return objmod.Integer(-intobj.value)
+        return integer(-intobj.value)
     else:
-        return objmod.Error(f"unknown operator: -{right.type()}")
+        raise MonkeyError(f"unknown operator: -{right.type()}")
 
 
 def _native_to_boolean_object(input: bool):
@@ -135,16 +362,16 @@ def _native_to_boolean_object(input: bool):
 def _eval_infix_expression(
     left: objmod.Object, op: str, right: objmod.Object
 ) -> objmod.Object:
-    if left.type() == objmod.INTEGER_OBJ and right.type() == objmod.INTEGER_OBJ:
+    if left.tag == INTEGER_TAG and right.tag == INTEGER_TAG:
         return _eval_integer_infix_expression(left, op, right)
     elif op == "==":
         return _native_to_boolean_object(left is right)
     elif op == "!=":
         return _native_to_boolean_object(left is not right)
     elif left.type() != right.type():
-        return objmod.Error(f"type mismatch: {left.type()} {op} {right.type()}")
+        raise MonkeyError(f"type mismatch: {left.type()} {op} {right.type()}")
     else:
-        return objmod.Error(f"unknown operator: {left.type()} {op} {right.type()}")
+        raise MonkeyError(f"unknown operator: {left.type()} {op} {right.type()}")
 
 
 def _eval_integer_infix_expression(
@@ -153,13 +380,13 @@ def _eval_integer_infix_expression(
     leftval = cast(objmod.Integer, left).value
     rightval = cast(objmod.Integer, right).value
     if op == "+":
-        return objmod.Integer(leftval + rightval)
+        return integer(leftval + rightval)
     elif op == "-":
-        return objmod.Integer(leftval - rightval)
+        return integer(leftval - rightval)
     elif op == "*":
-        return objmod.Integer(leftval * rightval)
+        return integer(leftval * rightval)
     elif op == "/":
-        return objmod.Integer(leftval // rightval)
+        return integer(leftval // rightval)
     elif op == "==":
         return _native_to_boolean_object(leftval == rightval)
     elif op == "!=":
@@ -169,58 +396,268 @@ def _eval_integer_infix_expression(
     elif op == ">":
         return _native_to_boolean_object(leftval > rightval)
     else:
-        return objmod.Error(f"unknown operator: {left.type()} {op} {right.type()}")
+        raise MonkeyError(f"unknown operator: {left.type()} {op} {right.type()}")
 
 
-def _eval_if_expression(
-    ifexp: ast.IfExpression, env: objmod.Environment
-) -> objmod.Object:
-    condition = eval(ifexp.condition, env)
-    if _is_error(condition):
-        return condition
+def _eval_index_expression(left: objmod.Object, index: objmod.Object) -> objmod.Object:
+    result = builtins.index(left, index)
+    if result.tag == ERROR_TAG:
+        raise MonkeyError(cast(objmod.Error, result).message)
+    return result
+
+
+def _eval_if_expression(ifexp: ast.IfExpression, env: objmod.Scope) -> objmod.Object:
+    condition = _eval(ifexp.condition, env)
     if _is_truthy(condition):
-        return eval(ifexp.consequence, env)
+        return _eval(ifexp.consequence, env)
     elif ifexp.alternative:
-        return eval(ifexp.alternative, env)
+        return _eval(ifexp.alternative, env)
     else:
         return NULL
 
 
+# The Integers that integer literals evaluate to, keyed by value, so that
+# evaluating a literal allocates nothing. Literals of a value share one,
+# and no node is kept alive. Dropped when full.
+_literals: Dict[int, objmod.Integer] = {}
+_LITERALS_SIZE = 4096
+
+
+def literal(node: ast.IntegerLiteral) -> objmod.Integer:
+    """The Integer ``node`` evaluates to, boxed once for its value."""
+    boxed = _literals.get(node.value)
+    if boxed is None:
+        if len(_literals) >= _LITERALS_SIZE:
+            _literals.clear()
+        boxed = _literals[node.value] = integer(node.value)
+    return boxed
+
+
+# Tag of _TailCall, which only the evaluator ever sees.
+_TAIL_CALL_TAG = -1
+
+
 def _eval_expression(
-    exps: List[ast.Expression], env: objmod.Environment
-) -> Tuple[List[objmod.Object], Optional[objmod.Object]]:
-    result: List[objmod.Object] = []
+    exps: List[ast.Expression], env: objmod.Scope
+) -> List[objmod.Object]:
+    return [_eval(exp, env) for exp in exps]
+
+
+class _TailCall(objmod.Object):
+    """A call in tail position, handed back to ``_apply_function`` to run."""
+
+    __slots__ = ("fn", "args")
+
+    tag = _TAIL_CALL_TAG
+
+    def __init__(self, fn: objmod.Object, args: List[objmod.Object]) -> None:
+        self.fn = fn
+        self.args = args
 
-    for exp in exps:
-        evaluated = eval(exp, env)
-        if _is_error(evaluated):
-            return ([], evaluated)
-        result.append(evaluated)
-    return (result, NULL)
+    def type(self) -> str:
+        return "TAIL_CALL"
 
 
 def _apply_function(fn: objmod.Object, args: List[objmod.Object]):
-    if not isinstance(fn, objmod.Function):
-        return objmod.Error(f"not a function: {fn.type()}")
-    extended_env = _extend_function_env(fn, args)
-    evaluated = eval(fn.body, extended_env)
-    return _unwrap_return_value(evaluated)
+    # A profiler sees every call, so the memo is bypassed while one runs.
+    if _memo is not None and _profiler is None and fn.tag == FUNCTION_TAG:
+        key = _memo.key(cast(objmod.Function, fn), args)
+        if key is not None:
+            result = _memo.get(key)
+            if result is None:
+                result = _call_function(fn, args)
+                _memo.put(key, cast(objmod.Function, fn), result)
+            return result
+    return _call_function(fn, args)
+
+
+def _call_function(fn: objmod.Object, args: List[objmod.Object]) -> objmod.Object:
+    # Calls in tail position come back as _TailCall and are run by this
+    # loop, so tail recursion does not grow the Python stack.
+    if _profiler is not None:
+        return _apply_function_profiled(fn, args, _profiler)
+    finished: Optional[List[objmod.Environment]] = None
+    escapes = _escapes
+    while True:
+        if fn.tag != FUNCTION_TAG:
+            result = _call_builtin(fn, args)
+            if finished is not None:
+                _end_calls(finished, result, escapes)
+            return result
+        function = cast(objmod.Function, fn)
+        extended_env = _extend_function_env(function, args)
+        evaluated = _eval_function_body(function.body, extended_env, True)
+        if function.pooled:
+            objmod.release_environment(cast(objmod.Environment, extended_env))
+        elif type(extended_env) is objmod.Environment:
+            if finished is None:
+                finished = [extended_env]
+            else:
+                finished.append(extended_env)
+        if evaluated.tag == _TAIL_CALL_TAG:
+            fn = cast(_TailCall, evaluated).fn
+            args = cast(_TailCall, evaluated).args
+            continue
+        result = _unwrap_return_value(evaluated)
+        if finished is not None:
+            _end_calls(finished, result, escapes)
+        return result
+
+
+def _apply_function_profiled(
+    fn: objmod.Object, args: List[objmod.Object], profiler: "Hook"
+) -> objmod.Object:
+    # As _apply_function, telling the profiler about each call the loop runs.
+    finished: List[objmod.Environment] = []
+    escapes = _escapes
+    while True:
+        if fn.tag != FUNCTION_TAG:
+            result = _call_builtin(fn, args)
+            _end_calls(finished, result, escapes)
+            return result
+        function = cast(objmod.Function, fn)
+        extended_env = _extend_function_env(function, args)
+        profiler.enter(function)
+        try:
+            evaluated = _eval_function_body(function.body, extended_env, True)
+        finally:
+            profiler.leave()
+        if function.pooled:
+            objmod.release_environment(cast(objmod.Environment, extended_env))
+        elif type(extended_env) is objmod.Environment:
+            finished.append(extended_env)
+        if evaluated.tag == _TAIL_CALL_TAG:
+            fn = cast(_TailCall, evaluated).fn
+            args = cast(_TailCall, evaluated).args
+            continue
+        result = _unwrap_return_value(evaluated)
+        _end_calls(finished, result, escapes)
+        return result
+
+
+def _call_builtin(fn: objmod.Object, args: List[objmod.Object]) -> objmod.Object:
+    if fn.tag != BUILTIN_TAG:
+        raise MonkeyError(f"not a function: {fn.type()}")
+    result = cast(objmod.Builtin, fn).fn(args, _apply_function)
+    if result.tag == ERROR_TAG:
+        raise MonkeyError(cast(objmod.Error, result).message)
+    return result
+
+
+def _end_calls(
+    finished: List[objmod.Environment], result: objmod.Object, escapes: int
+) -> None:
+    """Closes the environments of calls that made closures, run by one loop
+    of _call_function that returns ``result``.
+
+    Recursive local functions make reference cycles through the environment
+    of the call that defines them, which reference counting alone never
+    frees. Functions made in a call can leave it only through its result,
+    by themselves or in an array, or by assignment to an outer binding,
+    which bumps _escapes from the ``escapes`` it was at when the loop
+    started. If neither happened, nothing can read these environments again.
+    """
+    if not objmod.holds_function(result) and _escapes == escapes:
+        for env in finished:
+            env.close()
+
+
+def _eval_function_body(
+    block: ast.BlockStatement, env: objmod.Scope, tail: bool
+) -> objmod.Object:
+    """Evaluates a function body, or an if branch at statement level in one.
+
+    ``tail`` is true when the value of ``block`` is the value of the function.
+    A call in that position, or in any ``return``, is not made here but
+    returned as a _TailCall. The result is a plain value only when the block
+    ran to its end; ReturnValue and _TailCall stop the caller too.
+    """
+    result: objmod.Object = NULL
+    statements = block.statements
+    last = len(statements) - 1
+    counting = _metrics is not None
+    if counting:
+        _count(block)
+
+    for i, stmt in enumerate(statements):
+        if isinstance(stmt, ast.ReturnStatement):
+            if counting:
+                _count(stmt)
+            value = cast(ast.Expression, stmt.return_value)
+            if isinstance(value, ast.CallExpression):
+                return _eval_tail_call(value, env)
+            return objmod.ReturnValue(_eval(value, env))
+        elif isinstance(stmt, ast.ExpressionStatement):
+            expr = stmt.expression
+            if isinstance(expr, ast.IfExpression):
+                if counting:
+                    _count(stmt)
+                    _count(expr)
+                condition = _eval(expr.condition, env)
+                if _is_truthy(condition):
+                    branch: Optional[ast.BlockStatement] = expr.consequence
+                else:
+                    branch = expr.alternative
+                if branch is None:
+                    result = NULL
+                    continue
+                result = _eval_function_body(branch, env, tail and i == last)
+                if result.tag == RETURN_VALUE_TAG or result.tag == _TAIL_CALL_TAG:
+                    return result
+                continue
+            elif tail and i == last and isinstance(expr, ast.CallExpression):
+                if counting:
+                    _count(stmt)
+                return _eval_tail_call(expr, env)
+        result = _eval(stmt, env)
+        if result.tag == RETURN_VALUE_TAG:
+            return result
+    return result
+
+
+def _eval_tail_call(callexp: ast.CallExpression, env: objmod.Scope) -> objmod.Object:
+    if _metrics is not None:
+        _count(callexp)
+        if type(callexp.function) is ast.Identifier:
+            _count(callexp.function)
+    site = _call_sites.get(id(callexp))
+    if (
+        site is not None
+        and site[1] == _versions.get(site[0], 0)
+        and cast(objmod.Environment, env).up(site[2]) is site[3]
+    ):
+        func: objmod.Object = site[4]
+    else:
+        func = _resolve_callee(callexp, env)
+    args = _eval_expression(callexp.arguments, env)
+    return _TailCall(func, args)
 
 
 def _extend_function_env(
     fn: objmod.Function, args: List[objmod.Object]
-) -> objmod.Environment:
-    env = fn.env.new_enclosed_environment()
+) -> objmod.Scope:
+    if isinstance(fn, objmod.SlotFunction):
+        frame = objmod.Frame(fn.frame_size, cast(objmod.Frame, fn.env))
+        nargs = min(len(args), len(fn.parameters))
+        frame.slots[:nargs] = args[:nargs]
+        return frame
+    # Environments taken for functions that are not pooled are never given
+    # back, which only costs the pool an entry.
+    env = objmod.acquire_environment(cast(objmod.Environment, fn.env))
 
     for param, arg in zip(fn.parameters, args):
         env.set(param.value, arg)
+    if len(args) < len(fn.parameters):
+        # Parameters left unbound differ between calls, as lets do.
+        for param in fn.parameters[len(args) :]:
+            if param.value not in _local_names:
+                _add_local_name(param.value)
     return env
 
 
 def _unwrap_return_value(obj: objmod.Object) -> objmod.Object:
-    if isinstance(obj, objmod.ReturnValue):
-        retval = cast(objmod.ReturnValue, obj)
-        return retval.value
+    if obj.tag == RETURN_VALUE_TAG:
+        return cast(objmod.ReturnValue, obj).value
     return obj
 
 
@@ -233,3 +670,82 @@ def _is_truthy(obj: objmod.Object) -> bool:
         return False
     else:
         return True
+
+
+# Counting is switched on by rebinding ``_eval`` and ``_extend_function_env``
+# to the wrappers below, so that uncounted evaluation runs unchanged code.
+_metrics: Optional["Metrics"] = None
+_plain_eval = _eval
+_plain_extend_function_env = _extend_function_env
+
+# Nodes whose evaluation creates a new Integer when it yields one that is
+# not interned; literals are boxed once for each value.
+_INTEGER_NODES = (ast.PrefixExpression, ast.InfixExpression)
+
+
+def get_metrics() -> Optional["Metrics"]:
+    return _metrics
+
+
+def set_metrics(metrics: Optional["Metrics"]) -> None:
+    """Counts into ``metrics`` from now on, or stops counting for None."""
+    global _eval, _extend_function_env, _metrics
+    _metrics = metrics
+    if metrics is None:
+        _eval = _plain_eval
+        _extend_function_env = _plain_extend_function_env
+    else:
+        _eval = _counted_eval
+        _extend_function_env = _counted_extend_function_env
+
+
+def _counted_eval(node: ast.Node, env: objmod.Scope) -> objmod.Object:
+    metrics = cast("Metrics", _metrics)
+    metrics.nodes_evaluated[type(node).__name__] += 1
+    result = _plain_eval(node, env)
+    if type(result) is objmod.Integer and isinstance(node, _INTEGER_NODES):
+        if result is not objmod.integer(cast(objmod.Integer, result).value):
+            metrics.integers += 1
+    elif type(node) is ast.LetStatement and _makes_cycle(
+        cast(ast.LetStatement, node).name, env
+    ):
+        metrics.cycles += 1
+    return result
+
+
+def _count(node: ast.Node) -> None:
+    """Counts ``node``, evaluated without going through ``_eval``."""
+    cast("Metrics", _metrics).nodes_evaluated[type(node).__name__] += 1
+
+
+def _makes_cycle(name: ast.Identifier, env: objmod.Scope) -> bool:
+    """Whether ``name``, just bound in ``env``, holds a function that keeps
+    ``env``, so that the two refer to each other.
+    """
+    if isinstance(name, ast.ResolvedIdentifier):
+        val = cast(objmod.Frame, env).slots[name.slot]
+    else:
+        val = cast(objmod.Environment, env).get_at(0, name.value)
+    if val is None or val.tag != FUNCTION_TAG:
+        return False
+    scope: Optional[objmod.Scope] = cast(objmod.Function, val).env
+    while scope is not None:
+        if scope is env:
+            return True
+        if type(scope) is objmod.Frame:
+            scope = cast(objmod.Frame, scope).outer
+        else:
+            scope = cast(objmod.Environment, scope).up(1)
+    return False
+
+
+def _counted_extend_function_env(
+    fn: objmod.Function, args: List[objmod.Object]
+) -> objmod.Scope:
+    metrics = cast("Metrics", _metrics)
+    metrics.function_calls += 1
+    free = objmod.pooled_environments()
+    env = _plain_extend_function_env(fn, args)
+    if objmod.pooled_environments() == free:
+        metrics.environments += 1
+    return env
@@ -1,105 +1,273 @@
+import array
+import bisect
 import re
 import typing
 from . import token
 
+# One alternative per token class; leading whitespace is consumed by the same
+# match. Every character that is not whitespace matches some alternative (the
+# last one catches illegal characters), so consecutive matches tile the input.
+_token_pattern = re.compile(
+    r"""
+    [ \t\r\n]*
+    (?:
+        (?P<ident>[a-zA-Z_]+)
+      | (?P<int>[0-9]+)
+      | (?P<op>==|!=|[-=;(),+!/*<>{}\[\]])
+      | (?P<illegal>[^ \t\r\n])
+    )
+    """,
+    re.VERBOSE,
+)
+
+_IDENT_GROUP = _token_pattern.groupindex["ident"]
+_INT_GROUP = _token_pattern.groupindex["int"]
+
+# Tokens are immutable, so one instance per distinct literal is enough.
+_fixed_tokens: typing.Dict[str, token.Token] = {
+    **{
+        literal: token.Token(token.lookup_ident(literal), literal)
+        for literal in token.keywords()
+    },
+    **{
+        op: token.Token(op, op)
+        for op in (
+            token.ASSIGN,
+            token.PLUS,
+            token.MINUS,
+            token.BANG,
+            token.ASTERISK,
+            token.SLASH,
+            token.LT,
+            token.GT,
+            token.EQ,
+            token.NOT_EQ,
+            token.COMMA,
+            token.SEMICOLON,
+            token.LPAREN,
+            token.RPAREN,
+            token.LBRACE,
+            token.RBRACE,
+            token.LBRACKET,
+            token.RBRACKET,
+        )
+    },
+}
+
+_EOF_TOKEN = token.Token(token.EOF, None)
+_FUNCTION_TOKEN = _fixed_tokens["fn"]
+
+
+def tokenize(input: str) -> typing.Iterator[token.Token]:
+    """Yields the tokens of ``input``, ending with a single EOF token.
+
+    Each ``fn`` token is a new Token carrying its line; lines are counted
+    only up to ``fn`` tokens, so other tokens cost nothing extra.
+    """
+    cache = dict(_fixed_tokens)
+    function_token = _FUNCTION_TOKEN
+    line, counted = 1, 0
+    for m in _token_pattern.finditer(input):
+        group = typing.cast(int, m.lastindex)
+        literal = m.group(group)
+        tok = cache.get(literal)
+        if tok is None:
+            if group == _IDENT_GROUP:
+                tok = token.Token(token.IDENT, literal)
+            elif group == _INT_GROUP:
+                tok = token.Token(token.INT, literal)
+            else:
+                tok = token.Token(token.ILLEGAL, literal)
+            cache[literal] = tok
+        elif tok is function_token:
+            start = m.start(group)
+            line += input.count("\n", counted, start)
+            counted = start
+            tok = token.Token(token.FUNCTION, literal, line)
+        yield tok
+    yield _EOF_TOKEN
+
+
+# The same pattern over bytes, for lexing memory-mapped files in place.
+_byte_token_pattern = re.compile(
+    _token_pattern.pattern.encode("ascii"), _token_pattern.flags & ~re.UNICODE
+)
+
+_fixed_byte_tokens: typing.Dict[bytes, token.Token] = {
+    literal.encode("ascii"): tok for literal, tok in _fixed_tokens.items()
+}
+
+
+def tokenize_bytes(data: typing.Any) -> typing.Generator[token.Token, None, None]:
+    """Like ``tokenize`` for UTF-8 ``bytes`` or any buffer such as an ``mmap``.
+
+    Matching runs directly on the buffer and only the literal of each
+    identifier, integer or illegal token is copied out, so lexing a mapped
+    file does not read it into memory as a whole. Unlike ``tokenize`` no
+    per-call literal cache is kept, which would grow with the input.
+    """
+    fixed = _fixed_byte_tokens
+    function_token = _FUNCTION_TOKEN
+    line, counted = 1, 0
+    for m in _byte_token_pattern.finditer(data):
+        group = typing.cast(int, m.lastindex)
+        literal = m.group(group)
+        tok = fixed.get(literal)
+        if tok is None:
+            text = literal.decode("utf-8", "replace")
+            if group == _IDENT_GROUP:
+                tok = token.Token(token.IDENT, text)
+            elif group == _INT_GROUP:
+                tok = token.Token(token.INT, text)
+            else:
+                tok = token.Token(token.ILLEGAL, text)
+        elif tok is function_token:
+            start = m.start(group)
+            line += data[counted:start].count(b"\n")
+            counted = start
+            tok = token.Token(token.FUNCTION, "fn", line)
+        yield tok
+    yield _EOF_TOKEN
+
 
 class Lexer:
+    """Pull-style wrapper around ``tokenize``.
+
+    After the input is exhausted ``next_token`` keeps returning EOF.
+    """
+
     _input: str
-    _position: int
-    _read_position: int
-    _ch: typing.Optional[str]
+    _tokens: typing.Iterator[token.Token]
 
     def __init__(self, input: str) -> None:
         self._input = input
-        self._position = 0
-        self._read_position = 0
-        self._ch = None
-        self._read_char()
+        self._tokens = tokenize(input)
 
     def next_token(self) -> token.Token:
-        self._skip_whitespace()
+        return next(self._tokens, _EOF_TOKEN)
 
-        if self._ch == "=":
-            if self._peek_char() == "=":
-                ch = self._ch
-                self._read_char()
-                tok = token.Token(token.EQ, ch + self._ch)
-            else:
-                tok = token.Token(token.ASSIGN, self._ch)
-        elif self._ch == ";":
-            tok = token.Token(token.SEMICOLON, self._ch)
-        elif self._ch == "(":
-            tok = token.Token(token.LPAREN, self._ch)
-        elif self._ch == ")":
-            tok = token.Token(token.RPAREN, self._ch)
-        elif self._ch == "{":
-            tok = token.Token(token.LBRACE, self._ch)
-        elif self._ch == "}":
-            tok = token.Token(token.RBRACE, self._ch)
-        elif self._ch == ",":
-            tok = token.Token(token.COMMA, self._ch)
-        elif self._ch == "+":
-            tok = token.Token(token.PLUS, self._ch)
-        elif self._ch == "-":
-            tok = token.Token(token.MINUS, self._ch)
-        elif self._ch == "!":
-            if self._peek_char() == "=":
-                ch = self._ch
-                self._read_char()
-                tok = token.Token(token.NOT_EQ, ch + self._ch)
-            else:
-                tok = token.Token(token.BANG, self._ch)
-        elif self._ch == "/":
-            tok = token.Token(token.SLASH, self._ch)
-        elif self._ch == "*":
-            tok = token.Token(token.ASTERISK, self._ch)
-        elif self._ch == "<":
-            tok = token.Token(token.LT, self._ch)
-        elif self._ch == ">":
-            tok = token.Token(token.GT, self._ch)
-        elif self._ch is None:
-            tok = token.Token(token.EOF, None)
-        else:
-            if is_letter(self._ch):
-                literal = self._read_identifier()
-                return token.Token(token.lookup_ident(literal), literal)
-            elif is_digit(self._ch):
-                literal = self._read_identifier()
-                return token.Token(token.INT, self._read_number())
-            else:
-                tok = token.Token(token.ILLEGAL, self._ch)
-        self._read_char()
-        return tok
-    
-    def _read_char(self) -> None:
-        if self._read_position >= len(self._input):
-            self._ch = None
-        else:
-            self._ch = self._input[self._read_position]
-        self._position = self._read_position
-        self._read_position += 1
-    
-    def _peek_char(self) -> typing.Optional[str]:
-        if self._read_position >= len(self._input):
+    def __iter__(self) -> typing.Iterator[token.Token]:
+        return self._tokens
+
+
+# Token objects for kinds whose literal never varies; None where it does.
+_kind_tokens: typing.List[typing.Optional[token.Token]] = [None] * len(token.TYPES)
+for _tok in _fixed_tokens.values():
+    _kind_tokens[token.KINDS[_tok.type]] = _tok
+_kind_tokens[token.KINDS[token.EOF]] = _EOF_TOKEN
+_KIND_FUNCTION = token.KINDS[token.FUNCTION]
+
+_literal_kinds: typing.Dict[str, int] = {
+    literal: token.KINDS[tok.type] for literal, tok in _fixed_tokens.items()
+}
+
+_KIND_EOF = token.KINDS[token.EOF]
+
+# Kinds by regex group for literals that are not in _literal_kinds.
+_group_kinds: typing.Dict[int, int] = {
+    _IDENT_GROUP: token.KINDS[token.IDENT],
+    _INT_GROUP: token.KINDS[token.INT],
+    _token_pattern.groupindex["illegal"]: token.KINDS[token.ILLEGAL],
+}
+
+
+class TokenBuffer:
+    """All tokens of a source as parallel ``array.array`` columns.
+
+    ``kinds`` holds ``token.KINDS`` codes and ``starts``/``ends`` offsets into
+    ``source``; no per-token objects are kept. Iterating yields
+    ``token.Token`` objects, slicing literals out of the source only for
+    identifiers, integers and illegal characters, so a ``parser.Parser`` can
+    consume the buffer directly.
+    """
+
+    source: str
+    kinds: "array.array[int]"
+    starts: "array.array[int]"
+    ends: "array.array[int]"
+    _line_starts: typing.Optional[typing.List[int]]
+
+    def __init__(self, source: str) -> None:
+        offset_code = "I" if len(source) < 2**32 else "Q"
+        self.source = source
+        self.kinds = array.array("B")
+        self.starts = array.array(offset_code)
+        self.ends = array.array(offset_code)
+        self._line_starts = None
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def type(self, i: int) -> str:
+        return token.TYPES[self.kinds[i]]
+
+    def literal(self, i: int) -> typing.Optional[str]:
+        if self.kinds[i] == _KIND_EOF:
             return None
-        else:
-            return self._input[self._read_position]
-    
-    def _read_identifier(self) -> str:
-        pos = self._position
-        while is_letter(self._ch):
-            self._read_char()
-        return self._input[pos:self._position]
-    
-    def _read_number(self) -> str:
-        pos = self._position
-        while is_digit(self._ch):
-            self._read_char()
-        return self._input[pos:self._position]
-
-    def _skip_whitespace(self) -> None:
-        while self._ch is not None and self._ch in " \r\n\t":
-            self._read_char()
+        return self.source[self.starts[i] : self.ends[i]]
+
+    def __getitem__(self, i: int) -> token.Token:
+        kind = self.kinds[i]
+        if kind == _KIND_FUNCTION:
+            return token.Token(token.FUNCTION, "fn", self._line(self.starts[i]))
+        tok = _kind_tokens[kind]
+        if tok is None:
+            tok = token.Token(
+                token.TYPES[kind], self.source[self.starts[i] : self.ends[i]]
+            )
+        return tok
+
+    def position(self, i: int) -> typing.Tuple[int, int]:
+        """1-based line and column where token ``i`` starts."""
+        offset = self.starts[i]
+        line = self._line(offset)
+        return (line, offset - self._line_starts_list()[line - 1] + 1)
+
+    def _line_starts_list(self) -> typing.List[int]:
+        if self._line_starts is None:
+            self._line_starts = [0] + [m.end() for m in re.finditer("\n", self.source)]
+        return self._line_starts
+
+    def _line(self, offset: int) -> int:
+        return bisect.bisect_right(self._line_starts_list(), offset)
+
+    def __iter__(self) -> typing.Iterator[token.Token]:
+        source = self.source
+        kind_tokens = _kind_tokens
+        cache: typing.Dict[str, token.Token] = {}
+        for kind, start, end in zip(self.kinds, self.starts, self.ends):
+            tok = kind_tokens[kind]
+            if kind == _KIND_FUNCTION:
+                tok = token.Token(token.FUNCTION, "fn", self._line(start))
+            elif tok is None:
+                literal = source[start:end]
+                tok = cache.get(literal)
+                if tok is None:
+                    tok = cache[literal] = token.Token(token.TYPES[kind], literal)
+            yield tok
+
+
+def scan(input: str) -> TokenBuffer:
+    """Lexes all of ``input`` into a TokenBuffer ending with an EOF token."""
+    buffer = TokenBuffer(input)
+    add_kind = buffer.kinds.append
+    add_start = buffer.starts.append
+    add_end = buffer.ends.append
+    literal_kinds = _literal_kinds
+    group_kinds = _group_kinds
+
+    for m in _token_pattern.finditer(input):
+        group = typing.cast(int, m.lastindex)
+        literal = m[group]
+        kind = literal_kinds.get(literal)
+        add_kind(group_kinds[group] if kind is None else kind)
+        start = m.start(group)
+        add_start(start)
+        add_end(start + len(literal))
+    add_kind(_KIND_EOF)
+    add_start(len(input))
+    add_end(len(input))
+    return buffer
 
 
 letter_pattern = re.compile(r"[a-zA-Z_]")
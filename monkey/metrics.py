@@ -0,0 +1,159 @@
+import collections
+import contextlib
+import json
+import time
+from typing import Any, Counter, Dict, Iterator, List
+from . import ast
+from . import evaluator
+
+PHASES = ("lex", "parse", "optimize", "eval")
+_COUNTERS = (
+    "tokens",
+    "nodes_built",
+    "function_calls",
+    "environments",
+    "integers",
+    "cycles",
+)
+
+
+class Metrics:
+    """Phase times and counters accumulated over any number of runs.
+
+    ``engine.run_measured`` fills in the phase times, ``tokens`` (EOF not
+    included) and ``nodes_built``, on every engine. The evaluation counters
+    come from ``evaluator`` and so stay zero on engines that do not use it:
+
+    - ``nodes_evaluated``: nodes evaluated, per ``ast`` class name, whether
+      dispatched through ``evaluator._eval`` or run inline by a fast path
+      such as a function body, a tail call or a loop
+    - ``function_calls``: function bodies entered, tail calls included
+    - ``environments``: environments or frames created for those calls,
+      environments reused from the pool (see ``obj.acquire_environment``)
+      not included
+    - ``integers``: ``obj.Integer`` objects created by operators, interned
+      small integers not included
+    - ``cycles``: ``let`` statements binding a function that keeps the
+      environment or frame it is bound in, a reference cycle that only the
+      garbage collector frees unless the call that made it closes it (see
+      ``evaluator._end_calls``)
+    """
+
+    runs: int
+    seconds: Dict[str, float]
+    tokens: int
+    nodes_built: int
+    nodes_evaluated: Counter[str]
+    function_calls: int
+    environments: int
+    integers: int
+    cycles: int
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.tokens = 0
+        self.nodes_built = 0
+        self.nodes_evaluated = collections.Counter()
+        self.function_calls = 0
+        self.environments = 0
+        self.integers = 0
+        self.cycles = 0
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+
+    @contextlib.contextmanager
+    def counting(self) -> Iterator[None]:
+        """Counts evaluation in ``evaluator`` while the block runs."""
+        if evaluator.get_metrics() is not None:
+            raise RuntimeError("evaluator is already counting")
+        evaluator.set_metrics(self)
+        try:
+            yield
+        finally:
+            evaluator.set_metrics(None)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "seconds": dict(self.seconds),
+            "tokens": self.tokens,
+            "nodes_built": self.nodes_built,
+            "nodes_evaluated": dict(sorted(self.nodes_evaluated.items())),
+            "function_calls": self.function_calls,
+            "environments": self.environments,
+            "integers": self.integers,
+            "cycles": self.cycles,
+        }
+
+    def format(self) -> str:
+        lines = [f"{'runs':<24} {self.runs:>12}"]
+        for phase in PHASES:
+            lines.append(f"{phase + ' ms':<24} {self.seconds[phase] * 1e3:>12.3f}")
+        for name in _COUNTERS:
+            lines.append(f"{name:<24} {getattr(self, name):>12}")
+        lines.append(
+            f"{'nodes_evaluated':<24} {sum(self.nodes_evaluated.values()):>12}"
+        )
+        for cls, count in self.nodes_evaluated.most_common():
+            lines.append(f"  {cls:<22} {count:>12}")
+        return "\n".join(lines)
+
+    def json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+    def prometheus(self, prefix: str = "monkey") -> str:
+        """The metrics in the Prometheus text exposition format."""
+        out: List[str] = []
+
+        def counter(name: str, help: str, samples: Dict[str, Any]) -> None:
+            out.append(f"# HELP {prefix}_{name} {help}")
+            out.append(f"# TYPE {prefix}_{name} counter")
+            for labels, value in samples.items():
+                out.append(f"{prefix}_{name}{labels} {value}")
+
+        counter("runs_total", "Programs run.", {"": self.runs})
+        counter(
+            "phase_seconds_total",
+            "Time spent per pipeline phase.",
+            {f'{{phase="{p}"}}': repr(self.seconds[p]) for p in PHASES},
+        )
+        counter("tokens_total", "Tokens produced by the lexer.", {"": self.tokens})
+        counter("nodes_built_total", "AST nodes built.", {"": self.nodes_built})
+        counter(
+            "nodes_evaluated_total",
+            "AST nodes evaluated, per node class.",
+            {
+                f'{{node="{cls}"}}': count
+                for cls, count in sorted(self.nodes_evaluated.items())
+            },
+        )
+        counter("function_calls_total", "Function calls.", {"": self.function_calls})
+        counter("environments_total", "Environments created.", {"": self.environments})
+        counter("integers_total", "Integer objects allocated.", {"": self.integers})
+        counter(
+            "cycles_total",
+            "Functions bound where they keep their own environment.",
+            {"": self.cycles},
+        )
+        return "\n".join(out) + "\n"
+
+
+def count_nodes(node: ast.Node) -> int:
+    """Number of AST nodes in the tree under ``node``, ``node`` included."""
+    count = 0
+    pending: List[Any] = [node]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, ast.Node):
+            count += 1
+            pending.extend(vars(value).values())
+        elif isinstance(value, list):
+            pending.extend(value)
+    return count
@@ -1,5 +1,15 @@
-from typing import Dict, Tuple, List, Optional, cast
-import dataclasses
+from typing import (
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Tuple,
+    List,
+    Optional,
+    Union,
+    cast,
+)
+import array
 import io
 from . import ast
 
@@ -9,9 +19,31 @@ NULL_OBJ = "NULL"
 RETURN_VALUE_OBJ = "RETURN_VALUE"
 ERROR_OBJ = "ERROR"
 FUNCTION_OBJ = "FUNCTION"
+COMPILED_FUNCTION_OBJ = "COMPILED_FUNCTION"
+ARRAY_OBJ = "ARRAY"
+BUILTIN_OBJ = "BUILTIN"
+
+
+# Every class of object has a class-level integer tag, which hot paths
+# compare instead of the strings returned by type(). Subclasses of a class
+# share its tag.
+INTEGER_TAG = 0
+BOOLEAN_TAG = 1
+NULL_TAG = 2
+RETURN_VALUE_TAG = 3
+ERROR_TAG = 4
+FUNCTION_TAG = 5
+COMPILED_FUNCTION_TAG = 6
+CLOSURE_TAG = 7
+ARRAY_TAG = 8
+BUILTIN_TAG = 9
 
 
 class Object:
+    __slots__ = ()
+
+    tag: ClassVar[int]
+
     def type(self) -> str:
         raise NotImplementedError()
 
@@ -19,10 +51,24 @@ class Object:
         raise NotImplementedError()
 
 
-@dataclasses.dataclass(frozen=True)
 class Integer(Object):
+    __slots__ = ("value",)
+
+    tag = INTEGER_TAG
     value: int
 
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is Integer and cast(Integer, other).value == self.value
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+    def __repr__(self) -> str:
+        return f"Integer(value={self.value!r})"
+
     def type(self) -> str:
         return INTEGER_OBJ
 
@@ -30,10 +76,24 @@ class Integer(Object):
         return str(self.value)
 
 
-@dataclasses.dataclass(frozen=True)
 class Boolean(Object):
+    __slots__ = ("value",)
+
+    tag = BOOLEAN_TAG
     value: bool
 
+    def __init__(self, value: bool) -> None:
+        self.value = value
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is Boolean and cast(Boolean, other).value == self.value
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+    def __repr__(self) -> str:
+        return f"Boolean(value={self.value!r})"
+
     def type(self) -> str:
         return BOOLEAN_OBJ
 
@@ -42,6 +102,10 @@ class Boolean(Object):
 
 
 class Null(Object):
+    __slots__ = ()
+
+    tag = NULL_TAG
+
     def type(self) -> str:
         return NULL_OBJ
 
@@ -49,10 +113,26 @@ class Null(Object):
         return "null"
 
 
-@dataclasses.dataclass(frozen=True)
 class ReturnValue(Object):
+    __slots__ = ("value",)
+
+    tag = RETURN_VALUE_TAG
     value: Object
 
+    def __init__(self, value: Object) -> None:
+        self.value = value
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            type(other) is ReturnValue and cast(ReturnValue, other).value == self.value
+        )
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+    def __repr__(self) -> str:
+        return f"ReturnValue(value={self.value!r})"
+
     def type(self) -> str:
         return RETURN_VALUE_OBJ
 
@@ -60,10 +140,24 @@ class ReturnValue(Object):
         return str(self.value)
 
 
-@dataclasses.dataclass(frozen=True)
 class Error(Object):
+    __slots__ = ("message",)
+
+    tag = ERROR_TAG
     message: str
 
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is Error and cast(Error, other).message == self.message
+
+    def __hash__(self) -> int:
+        return hash(self.message)
+
+    def __repr__(self) -> str:
+        return f"Error(message={self.message!r})"
+
     def type(self) -> str:
         return ERROR_OBJ
 
@@ -75,6 +169,142 @@ TRUE = Boolean(True)
 FALSE = Boolean(False)
 NULL = Null()
 
+# Integers in [_small_low, _small_high] are interned: ``integer`` returns
+# the same object for each, so counters and small constants do not allocate.
+DEFAULT_SMALL_INTEGERS = (-128, 1023)
+_small_low = 0
+_small_high = -1
+_small_integers: List[Integer] = []
+
+
+def set_small_integers(low: int, high: int) -> None:
+    """Interns the integers from ``low`` to ``high``; none if ``high < low``."""
+    global _small_low, _small_high, _small_integers
+    _small_integers = [Integer(value) for value in range(low, high + 1)]
+    _small_low, _small_high = low, high
+
+
+def get_small_integers() -> Tuple[int, int]:
+    """The lowest and highest interned integer."""
+    return _small_low, _small_high
+
+
+def integer(value: int) -> Integer:
+    """The Integer for ``value``, interned if it is in the small range."""
+    if _small_low <= value <= _small_high:
+        return _small_integers[value - _small_low]
+    return Integer(value)
+
+
+set_small_integers(*DEFAULT_SMALL_INTEGERS)
+
+
+class Array(Object):
+    """An immutable sequence of objects.
+
+    ``elements`` is an ``array.array("q")`` of plain values when every
+    element is an Integer that fits in 64 bits, and a list of objects
+    otherwise; see ``array_of``. Elements of a packed array are boxed again
+    by ``integer`` when they are read.
+    """
+
+    __slots__ = ("elements",)
+
+    tag = ARRAY_TAG
+    elements: Union["array.array[int]", List[Object]]
+
+    def __init__(self, elements: Union["array.array[int]", List[Object]]) -> None:
+        self.elements = elements
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    @property
+    def packed(self) -> bool:
+        return type(self.elements) is array.array
+
+    def at(self, index: int) -> Object:
+        """The element at ``index``, or NULL if there is none."""
+        elements = self.elements
+        if index < 0 or index >= len(elements):
+            return NULL
+        if type(elements) is array.array:
+            return integer(cast("array.array[int]", elements)[index])
+        return cast(List[Object], elements)[index]
+
+    def objects(self) -> List[Object]:
+        """The elements as a new list of objects."""
+        elements = self.elements
+        if type(elements) is array.array:
+            return [integer(value) for value in elements]
+        return list(cast(List[Object], elements))
+
+    def type(self) -> str:
+        return ARRAY_OBJ
+
+    def __str__(self) -> str:
+        return "[" + ", ".join(str(element) for element in self.elements) + "]"
+
+
+def array_of(elements: List[Object]) -> Array:
+    """An Array of ``elements``, packed if they allow it."""
+    for element in elements:
+        if type(element) is not Integer:
+            return Array(elements)
+    try:
+        return Array(
+            array.array("q", [cast(Integer, element).value for element in elements])
+        )
+    except OverflowError:
+        return Array(elements)
+
+
+def holds_function(value: Object) -> bool:
+    """Whether ``value`` is a function or an array with one in it, through
+    which the environment the function keeps can be reached.
+    """
+    if value.tag == FUNCTION_TAG:
+        return True
+    if value.tag != ARRAY_TAG:
+        return False
+    elements = cast(Array, value).elements
+    if type(elements) is array.array:
+        return False
+    for element in cast(List[Object], elements):
+        if holds_function(element):
+            return True
+    return False
+
+
+# Applies a Monkey function to arguments the way the running engine does,
+# returning its result or an Error.
+Apply = Callable[[Object, List[Object]], Object]
+
+
+class Builtin(Object):
+    """A function implemented in Python, see ``builtins``.
+
+    ``fn`` takes the arguments and the Apply of the engine making the call,
+    through which it calls functions it was given, and returns the result
+    or an Error.
+    """
+
+    __slots__ = ("name", "fn")
+
+    tag = BUILTIN_TAG
+    name: str
+    fn: Callable[[List[Object], Apply], Object]
+
+    def __init__(self, name: str, fn: Callable[[List[Object], Apply], Object]) -> None:
+        self.name = name
+        self.fn = fn
+
+    def type(self) -> str:
+        return BUILTIN_OBJ
+
+    def __str__(self) -> str:
+        return f"builtin function {self.name}"
+
 
 class Environment:
     _store: Dict[str, Object]
@@ -92,33 +322,303 @@ class Environment:
         obj = self._store.get(name, NULL)
         return (obj, ok)
 
+    def find(self, name: str) -> Tuple[int, Optional[Object]]:
+        """The binding of ``name`` and how many levels out it was found.
+
+        Returns (-1, None) when ``name`` is not bound.
+        """
+        env: Optional[Environment] = self
+        depth = 0
+        while env is not None:
+            val = env._store.get(name)
+            if val is not None:
+                return (depth, val)
+            env = env._outer
+            depth += 1
+        return (-1, None)
+
+    def get_at(self, depth: int, name: str) -> Optional[Object]:
+        """The binding of ``name`` ``depth`` levels out, or None if it has none."""
+        env: Optional[Environment] = self
+        while depth and env is not None:
+            env = env._outer
+            depth -= 1
+        return None if env is None else env._store.get(name)
+
+    def up(self, depth: int) -> Optional["Environment"]:
+        """The environment ``depth`` levels out, or None past the outermost."""
+        env: Optional[Environment] = self
+        while depth and env is not None:
+            env = env._outer
+            depth -= 1
+        return env
+
+    def capture(self, names: Iterable[str]) -> "Environment":
+        """A new environment holding the bindings of ``names`` found outside
+        the outermost environment, enclosed by the outermost.
+        """
+        store: Dict[str, Object] = {}
+        env = self
+        while env._outer is not None:
+            for name in names:
+                if name not in store:
+                    val = env._store.get(name)
+                    if val is not None:
+                        store[name] = val
+            env = env._outer
+        captured = Environment()
+        captured._store = store
+        captured._outer = env
+        return captured
+
     def set(self, name: str, val: Object) -> Object:
         self._store[name] = val
         return val
 
+    def assign(self, name: str, val: Object) -> Optional["Environment"]:
+        """Rebinds ``name`` in the nearest environment that binds it and
+        returns that environment, or None if ``name`` is not bound.
+        """
+        env: Optional[Environment] = self
+        while env is not None:
+            store = env._store
+            if name in store:
+                store[name] = val
+                return env
+            env = env._outer
+        return None
+
+    def close(self) -> None:
+        """Drops every binding, and with them any reference cycle through a
+        function bound here. Only for environments nothing reads again.
+        """
+        self._store.clear()
+
     def new_enclosed_environment(self) -> "Environment":
         env = Environment()
         env._outer = self
         return env
 
 
-@dataclasses.dataclass(frozen=True)
+# Environments of returned calls, ready for reuse, at most _pool_size.
+DEFAULT_ENVIRONMENT_POOL = 256
+_free_environments: List[Environment] = []
+_pool_size = DEFAULT_ENVIRONMENT_POOL
+
+
+def set_environment_pool(size: int) -> None:
+    """Empties the pool and keeps at most ``size`` environments in it from
+    now on; 0 disables pooling.
+    """
+    global _pool_size
+    _free_environments.clear()
+    _pool_size = size
+
+
+def get_environment_pool() -> int:
+    """How many environments the pool may hold."""
+    return _pool_size
+
+
+def acquire_environment(outer: Environment) -> Environment:
+    """An empty environment enclosed by ``outer``, from the pool if it has one.
+
+    Give it back with ``release_environment`` once nothing refers to it.
+    """
+    if _free_environments:
+        env = _free_environments.pop()
+        env._outer = outer
+        return env
+    return outer.new_enclosed_environment()
+
+
+def release_environment(env: Environment) -> None:
+    if len(_free_environments) < _pool_size:
+        env._store.clear()
+        env._outer = None
+        _free_environments.append(env)
+
+
+def pooled_environments() -> int:
+    """How many environments the pool holds."""
+    return len(_free_environments)
+
+
+class Frame:
+    """Array-backed counterpart of Environment for resolved programs.
+
+    Each binding lives at a fixed slot computed by ``resolver.Resolver``;
+    unset slots hold None.
+    """
+
+    __slots__ = ("slots", "outer")
+
+    slots: List[Optional[Object]]
+    outer: Optional["Frame"]
+
+    def __init__(self, size: int, outer: Optional["Frame"] = None) -> None:
+        self.slots = [None] * size
+        self.outer = outer
+
+    def grow(self, size: int) -> None:
+        missing = size - len(self.slots)
+        if missing > 0:
+            self.slots.extend([None] * missing)
+
+
+Scope = Union[Environment, Frame]
+
+
 class Function(Object):
+    """A closure over ``env``.
+
+    Calls of a ``pooled`` function make no closures, so nothing can keep
+    their environment once they return, and it goes back to the pool of
+    ``acquire_environment``.
+    """
+
+    # Weak references let purity.Memo know a function without keeping it.
+    __slots__ = ("parameters", "body", "env", "pooled", "__weakref__")
+
+    tag = FUNCTION_TAG
     parameters: List[ast.Identifier]
     body: ast.BlockStatement
-    env: Environment
+    env: Scope
+    pooled: bool
+
+    def __init__(
+        self,
+        parameters: List[ast.Identifier],
+        body: ast.BlockStatement,
+        env: Scope,
+        pooled: bool = False,
+    ) -> None:
+        self.parameters = parameters
+        self.body = body
+        self.env = env
+        self.pooled = pooled
+
+    def type(self) -> str:
+        return FUNCTION_OBJ
+
+    def __str__(self) -> str:
+        return function_source(self.parameters, self.body)
+
+
+def function_source(
+    parameters: List[ast.Identifier], body: ast.BlockStatement
+) -> str:
+    """How a function value made from ``parameters`` and ``body`` prints."""
+    buffer = io.StringIO()
+    print(
+        f"fn(",
+        file=buffer, end='')
+    for i, parameter in enumerate(parameters):
+        if i != 0:
+            print(", ", file=buffer, end="")
+        print(str(parameter), file=buffer, end='')
+    print(") {\n%s\n}" % str(body), file=buffer, end='')
+    return buffer.getvalue()
+
+
+class SlotFunction(Function):
+    """A Function created from a ``ast.ResolvedFunctionLiteral``."""
+
+    __slots__ = ("frame_size",)
+
+    frame_size: int
+
+    def __init__(
+        self,
+        parameters: List[ast.Identifier],
+        body: ast.BlockStatement,
+        env: Scope,
+        frame_size: int,
+    ) -> None:
+        super().__init__(parameters, body, env)
+        self.frame_size = frame_size
+
+
+class CompiledFunction(Object):
+    """A function lowered to instructions for ``vm.VM``.
+
+    ``names`` holds the names of its locals followed by those of its free
+    variables, for error messages about reading one that is not bound, and
+    ``source`` how its closures print. ``fallbacks`` tells, in the same
+    order, where the name is looked up while that variable is unbound: a
+    ``(scope, index)`` pair naming a global, a free variable or the current
+    closure as in ``compiler.Symbol``, or None if it is always bound.
+    """
+
+    __slots__ = (
+        "instructions",
+        "num_locals",
+        "num_parameters",
+        "names",
+        "source",
+        "fallbacks",
+    )
+
+    tag = COMPILED_FUNCTION_TAG
+    instructions: List[int]
+    num_locals: int
+    num_parameters: int
+    names: List[str]
+    source: str
+    fallbacks: List[Optional[Tuple[str, int]]]
+
+    def __init__(
+        self,
+        instructions: List[int],
+        num_locals: int = 0,
+        num_parameters: int = 0,
+        names: Optional[List[str]] = None,
+        source: str = "",
+        fallbacks: Optional[List[Optional[Tuple[str, int]]]] = None,
+    ) -> None:
+        self.instructions = instructions
+        self.num_locals = num_locals
+        self.num_parameters = num_parameters
+        self.names = names if names is not None else []
+        self.source = source
+        self.fallbacks = fallbacks if fallbacks is not None else []
+
+    def type(self) -> str:
+        return COMPILED_FUNCTION_OBJ
+
+    def __str__(self) -> str:
+        return f"CompiledFunction[{id(self):#x}]"
+
+
+class Cell:
+    """A local of a ``vm.VM`` call that closures may assign, or that may
+    change after a closure captured it; the call and its closures share the
+    cell instead of holding copies. ``value`` is None until it is bound.
+    """
+
+    __slots__ = ("value",)
+
+    value: Optional[Object]
+
+    def __init__(self, value: Optional[Object]) -> None:
+        self.value = value
+
+
+class Closure(Object):
+    __slots__ = ("fn", "free")
+
+    tag = CLOSURE_TAG
+    fn: CompiledFunction
+    free: List[Object]
+
+    def __init__(self, fn: CompiledFunction, free: List[Object]) -> None:
+        self.fn = fn
+        self.free = free
 
     def type(self) -> str:
+        # Closures are what the VM has instead of Function; report the same
+        # type so error messages match the tree-walking evaluator.
         return FUNCTION_OBJ
 
     def __str__(self) -> str:
-        buffer = io.StringIO()
-        print(
-            f"fn(",
-            file=buffer, end='')
-        for i, parameter in enumerate(self.parameters):
-            if i != 0:
-                print(", ", file=buffer, end="")
-            print(str(parameter), file=buffer, end='')
-        print(") {\n%s\n}" % str(self.body), file=buffer, end='')
-        return buffer.getvalue()
+        return self.fn.source or f"Closure[{id(self):#x}]"
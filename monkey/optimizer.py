@@ -0,0 +1,248 @@
+from typing import List, Optional
+from . import ast
+from . import token
+
+
+def optimize(program: ast.Program) -> ast.Program:
+    """Returns an equivalent program with compile-time work done up front.
+
+    * infix and prefix expressions on literals are folded,
+    * ``x + 0``, ``x * 1`` and friends are simplified when ``x`` is known
+      to produce an integer,
+    * if expressions with a literal condition are replaced by the branch
+      that would run,
+    * statements after a ``return`` in the same block are dropped.
+
+    Expressions that would fail at runtime (``1 / 0``, ``true + 1``) are
+    left alone so the error is still reported when they run.
+    """
+    return ast.Program(_optimize_statements(program.statements))
+
+
+def _optimize_statements(statements: List[ast.Statement]) -> List[ast.Statement]:
+    result: List[ast.Statement] = []
+    last = len(statements) - 1
+    for i, stmt in enumerate(statements):
+        optimized = _optimize_statement(stmt)
+        expr = (
+            optimized.expression
+            if isinstance(optimized, ast.ExpressionStatement)
+            else None
+        )
+        branch = _taken_branch(expr) if isinstance(expr, ast.IfExpression) else None
+        if branch is not None:
+            # Branches share the scope of the enclosing block, so the taken
+            # one can be spliced in place of the if statement.
+            inner = branch.statements
+            if inner:
+                result.extend(inner)
+            elif i == last:
+                result.append(_null_statement(optimized))
+            if inner and isinstance(inner[-1], ast.ReturnStatement):
+                break
+            continue
+        if i != last and isinstance(
+            expr, (ast.NullExpression, ast.IntegerLiteral, ast.Boolean)
+        ):
+            # A literal whose value is discarded has no effect.
+            continue
+        result.append(optimized)
+        if isinstance(optimized, ast.ReturnStatement):
+            break
+    return result
+
+
+def _taken_branch(ifexp: ast.IfExpression) -> Optional[ast.BlockStatement]:
+    """The branch a literal condition selects, with no else as an empty block."""
+    condition = ifexp.condition
+    if isinstance(condition, ast.Boolean):
+        truthy = condition.value
+    elif isinstance(condition, ast.IntegerLiteral):
+        truthy = True
+    else:
+        return None
+    if truthy:
+        return ifexp.consequence
+    if ifexp.alternative is not None:
+        return ifexp.alternative
+    return ast.BlockStatement(ifexp.token, [])
+
+
+def _null_statement(stmt: ast.Statement) -> ast.Statement:
+    return ast.ExpressionStatement(stmt.token, ast.NullExpression())
+
+
+def _optimize_statement(stmt: ast.Statement) -> ast.Statement:
+    if isinstance(stmt, ast.ExpressionStatement):
+        if stmt.expression is None:
+            return stmt
+        return ast.ExpressionStatement(
+            stmt.token, _optimize_expression(stmt.expression)
+        )
+    elif isinstance(stmt, ast.LetStatement):
+        if stmt.value is None:
+            return stmt
+        return ast.LetStatement(stmt.token, stmt.name, _optimize_expression(stmt.value))
+    elif isinstance(stmt, ast.ReturnStatement):
+        if stmt.return_value is None:
+            return stmt
+        return ast.ReturnStatement(stmt.token, _optimize_expression(stmt.return_value))
+    elif isinstance(stmt, ast.AssignStatement):
+        return ast.AssignStatement(
+            stmt.token, stmt.name, _optimize_expression(stmt.value)
+        )
+    elif isinstance(stmt, ast.WhileStatement):
+        return ast.WhileStatement(
+            stmt.token,
+            _optimize_expression(stmt.condition),
+            _optimize_block(stmt.body),
+        )
+    return stmt
+
+
+def _optimize_block(block: ast.BlockStatement) -> ast.BlockStatement:
+    return ast.BlockStatement(block.token, _optimize_statements(block.statements))
+
+
+def _optimize_expression(node: ast.Expression) -> ast.Expression:
+    if isinstance(node, ast.PrefixExpression):
+        right = _optimize_expression(node.right)
+        folded = _fold_prefix(node, right)
+        if folded is not None:
+            return folded
+        return ast.PrefixExpression(node.token, node.operator, right)
+    elif isinstance(node, ast.InfixExpression):
+        left = _optimize_expression(node.left)
+        right = _optimize_expression(node.right)
+        folded = _fold_infix(node, left, right)
+        if folded is not None:
+            return folded
+        return ast.InfixExpression(node.token, left, node.operator, right)
+    elif isinstance(node, ast.IfExpression):
+        return _optimize_if_expression(node)
+    elif isinstance(node, ast.FunctionLiteral):
+        return ast.FunctionLiteral(
+            node.token, node.parameters, _optimize_block(node.body)
+        )
+    elif isinstance(node, ast.CallExpression):
+        return ast.CallExpression(
+            node.token,
+            _optimize_expression(node.function),
+            [_optimize_expression(arg) for arg in node.arguments],
+        )
+    elif isinstance(node, ast.ArrayLiteral):
+        return ast.ArrayLiteral(
+            node.token, [_optimize_expression(element) for element in node.elements]
+        )
+    elif isinstance(node, ast.IndexExpression):
+        return ast.IndexExpression(
+            node.token,
+            _optimize_expression(node.left),
+            _optimize_expression(node.index),
+        )
+    return node
+
+
+def _optimize_if_expression(node: ast.IfExpression) -> ast.Expression:
+    condition = _optimize_expression(node.condition)
+    consequence = _optimize_block(node.consequence)
+    alternative = node.alternative
+    if alternative is not None:
+        alternative = _optimize_block(alternative)
+    ifexp = ast.IfExpression(node.token, condition, consequence, alternative)
+
+    # In expression position only a branch that is a single expression can
+    # replace the whole if; statement-level ifs are spliced by the caller.
+    branch = _taken_branch(ifexp)
+    if branch is not None:
+        if not branch.statements:
+            return ast.NullExpression()
+        if len(branch.statements) == 1:
+            stmt = branch.statements[0]
+            if isinstance(stmt, ast.ExpressionStatement) and stmt.expression:
+                return stmt.expression
+    return ifexp
+
+
+def _fold_prefix(
+    node: ast.PrefixExpression, right: ast.Expression
+) -> Optional[ast.Expression]:
+    if node.operator == "-" and isinstance(right, ast.IntegerLiteral):
+        return _integer(-right.value)
+    if node.operator == "!" and isinstance(right, (ast.Boolean, ast.IntegerLiteral)):
+        if isinstance(right, ast.Boolean):
+            return _boolean(not right.value)
+        return _boolean(False)
+    return None
+
+
+def _fold_infix(
+    node: ast.InfixExpression, left: ast.Expression, right: ast.Expression
+) -> Optional[ast.Expression]:
+    op = node.operator
+    if isinstance(left, ast.IntegerLiteral) and isinstance(right, ast.IntegerLiteral):
+        lval = left.value
+        rval = right.value
+        if op == "+":
+            return _integer(lval + rval)
+        elif op == "-":
+            return _integer(lval - rval)
+        elif op == "*":
+            return _integer(lval * rval)
+        elif op == "/" and rval != 0:
+            return _integer(lval // rval)
+        elif op == "<":
+            return _boolean(lval < rval)
+        elif op == ">":
+            return _boolean(lval > rval)
+        elif op == "==":
+            return _boolean(lval == rval)
+        elif op == "!=":
+            return _boolean(lval != rval)
+        return None
+    if isinstance(left, ast.Boolean) and isinstance(right, ast.Boolean):
+        if op == "==":
+            return _boolean(left.value == right.value)
+        elif op == "!=":
+            return _boolean(left.value != right.value)
+        return None
+    return _simplify_identity(op, left, right)
+
+
+def _simplify_identity(
+    op: str, left: ast.Expression, right: ast.Expression
+) -> Optional[ast.Expression]:
+    if _is_integer_literal(right, 0) and op in ("+", "-") and _yields_integer(left):
+        return left
+    if _is_integer_literal(right, 1) and op in ("*", "/") and _yields_integer(left):
+        return left
+    if _is_integer_literal(left, 0) and op == "+" and _yields_integer(right):
+        return right
+    if _is_integer_literal(left, 1) and op == "*" and _yields_integer(right):
+        return right
+    return None
+
+
+def _yields_integer(node: ast.Expression) -> bool:
+    """True when ``node`` evaluates to an Integer unless it fails."""
+    if isinstance(node, ast.IntegerLiteral):
+        return True
+    if isinstance(node, ast.InfixExpression):
+        return node.operator in ("+", "-", "*", "/")
+    if isinstance(node, ast.PrefixExpression):
+        return node.operator == "-"
+    return False
+
+
+def _is_integer_literal(node: ast.Expression, value: int) -> bool:
+    return isinstance(node, ast.IntegerLiteral) and node.value == value
+
+
+def _integer(value: int) -> ast.IntegerLiteral:
+    return ast.IntegerLiteral(token.Token(token.INT, str(value)), value)
+
+
+def _boolean(value: bool) -> ast.Boolean:
+    if value:
+        return ast.Boolean(token.Token(token.TRUE, "true"), True)
+    return ast.Boolean(token.Token(token.FALSE, "false"), False)
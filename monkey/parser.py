@@ -1,6 +1,5 @@
-from typing import List, Dict, Optional, Callable, cast
+from typing import Iterable, Iterator, List, Dict, Optional, Callable, cast
 from . import token
-from . import lexer
 from . import ast
 
 PrefixParseFn = Callable[[], ast.Expression]
@@ -14,6 +13,7 @@ SUM = 40
 PRODUCT = 50
 PREFIX = 60
 CALL = 70
+INDEX = 80
 
 _precedances: Dict[str, int] = {
     token.EQ: EQUALS,
@@ -25,11 +25,18 @@ _precedances: Dict[str, int] = {
     token.SLASH: PRODUCT,
     token.ASTERISK: PRODUCT,
     token.LPAREN: CALL,
+    token.LBRACKET: INDEX,
 }
 
+_EOF_TOKEN = token.Token(token.EOF, None)
+
 
 class Parser:
-    _lexer: lexer.Lexer
+    """Parses any iterable of tokens, such as a ``lexer.Lexer`` or a
+    ``lexer.TokenBuffer``.
+    """
+
+    _tokens: Iterator[token.Token]
     _errors: List[str]
 
     _cur_token: token.Token
@@ -38,8 +45,8 @@ class Parser:
     _prefix_parse_fns: Dict[str, PrefixParseFn]
     _infix_parse_fns: Dict[str, InfixParseFn]
 
-    def __init__(self, lexer: lexer.Lexer) -> None:
-        self._lexer = lexer
+    def __init__(self, source: Iterable[token.Token]) -> None:
+        self._tokens = iter(source)
         self._cur_token = token.null()
         self._peek_token = token.null()
         self._errors = []
@@ -53,6 +60,7 @@ class Parser:
             token.LPAREN: self._parse_grouped_expression,
             token.IF: self._parse_if_expression,
             token.FUNCTION: self._parse_function_literal,
+            token.LBRACKET: self._parse_array_literal,
         }
         self._infix_parse_fns = {
             token.PLUS: self._parse_infix_expression,
@@ -64,19 +72,26 @@ class Parser:
             token.LT: self._parse_infix_expression,
             token.GT: self._parse_infix_expression,
             token.LPAREN: self._parse_call_expression,
+            token.LBRACKET: self._parse_index_expression,
         }
         self._next_token()
         self._next_token()
 
     def parse(self) -> ast.Program:
-        statements: List[ast.Statement] = []
+        return ast.Program(list(self.parse_statements()))
+
+    def parse_statements(self) -> Iterator[ast.Statement]:
+        """Yields top-level statements as soon as each one is parsed.
 
+        Tokens are pulled from the source only as far as the statement being
+        parsed needs, so a streaming lexer is never run ahead. Errors are
+        collected in ``errors`` as with ``parse``.
+        """
         while self._cur_token.type != token.EOF:
             stmt = self._parse_statement()
             if stmt is not None:
-                statements.append(stmt)
+                yield stmt
             self._next_token()
-        return ast.Program(statements)
 
     @property
     def errors(self) -> List[str]:
@@ -88,13 +103,19 @@ class Parser:
 
     def _next_token(self) -> None:
         self._cur_token = self._peek_token
-        self._peek_token = self._lexer.next_token()
+        self._peek_token = next(self._tokens, _EOF_TOKEN)
 
     def _parse_statement(self) -> Optional[ast.Statement]:
         if self._cur_token.type == token.LET:
             return self._parse_let_statement()
         elif self._cur_token.type == token.RETURN:
             return self._parse_return_statement()
+        elif self._cur_token.type == token.WHILE:
+            return self._parse_while_statement()
+        elif self._cur_token.type == token.IDENT and self._peek_token_is(
+            token.ASSIGN
+        ):
+            return self._parse_assign_statement()
         else:
             return self._parse_expression_statement()
         return None
@@ -120,6 +141,36 @@ class Parser:
             self._next_token()
         return ast.ReturnStatement(cur_token, value)
 
+    def _parse_assign_statement(self) -> ast.AssignStatement:
+        name = ast.Identifier(self._cur_token, cast(str, self._cur_token.literal))
+        self._next_token()
+        cur_token = self._cur_token
+        self._next_token()
+        value = self._parse_expression(LOWEST)
+        if self._peek_token_is(token.SEMICOLON):
+            self._next_token()
+        return ast.AssignStatement(cur_token, name, value)
+
+    def _parse_while_statement(self) -> Optional[ast.WhileStatement]:
+        cur_token = self._cur_token
+
+        if not self._expect_peek(token.LPAREN):
+            return None
+
+        self._next_token()
+        cond = self._parse_expression(LOWEST)
+
+        if not self._expect_peek(token.RPAREN):
+            return None
+
+        if not self._expect_peek(token.LBRACE):
+            return None
+
+        body = self._parse_block_statement()
+        if self._peek_token_is(token.SEMICOLON):
+            self._next_token()
+        return ast.WhileStatement(cur_token, cond, body)
+
     def _cur_token_is(self, t: str) -> bool:
         return self._cur_token.type == t
 
@@ -296,25 +347,39 @@ class Parser:
 
     def _parse_call_expression(self, func: ast.Expression) -> ast.Expression:
         cur_token = self._cur_token
-        args = self._parse_call_arguments()
+        args = self._parse_expression_list(token.RPAREN)
         return ast.CallExpression(cur_token, func, args)
 
-    def _parse_call_arguments(self) -> List[ast.Expression]:
-        args: List[ast.Expression] = []
-        if self._peek_token_is(token.RPAREN):
+    def _parse_array_literal(self) -> ast.Expression:
+        cur_token = self._cur_token
+        elements = self._parse_expression_list(token.RBRACKET)
+        return ast.ArrayLiteral(cur_token, elements)
+
+    def _parse_index_expression(self, left: ast.Expression) -> ast.Expression:
+        cur_token = self._cur_token
+        self._next_token()
+        index = self._parse_expression(LOWEST)
+        if not self._expect_peek(token.RBRACKET):
+            return ast.NullExpression()
+        return ast.IndexExpression(cur_token, left, index)
+
+    def _parse_expression_list(self, end: str) -> List[ast.Expression]:
+        """Comma-separated expressions up to the ``end`` token."""
+        items: List[ast.Expression] = []
+        if self._peek_token_is(end):
             self._next_token()
-            return args
+            return items
 
         self._next_token()
 
-        args.append(self._parse_expression(LOWEST))
+        items.append(self._parse_expression(LOWEST))
 
         while self._peek_token_is(token.COMMA):
             self._next_token()
             self._next_token()
-            args.append(self._parse_expression(LOWEST))
+            items.append(self._parse_expression(LOWEST))
 
-        if not self._expect_peek(token.RPAREN):
+        if not self._expect_peek(end):
             return []
 
-        return args
+        return items
@@ -0,0 +1,319 @@
+import collections
+import dataclasses
+import signal
+import time
+from typing import Any, Callable, Counter, Dict, Iterable, List, Optional, Tuple
+from typing import TypeVar, cast
+from . import ast
+from . import evaluator
+from . import obj as objmod
+
+
+@dataclasses.dataclass
+class FunctionProfile:
+    """What a profiler recorded for one function literal.
+
+    ``Profiler`` fills in ``calls`` and the times. ``inclusive`` covers a
+    call and everything it calls, counted once per outermost activation so
+    that recursion is not double counted; ``exclusive`` leaves out the time
+    spent in calls it made. Calls made in tail position replace their
+    caller, as the evaluator runs them, so their time is not part of the
+    caller's.
+
+    ``Sampler`` fills in ``samples``, the samples taken while the function
+    was anywhere on the stack, and ``self_samples``, those taken while it
+    was running itself.
+    """
+
+    name: str
+    line: int
+    parameters: List[str]
+    calls: int = 0
+    inclusive: float = 0.0
+    exclusive: float = 0.0
+    samples: int = 0
+    self_samples: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.line}" if self.line else self.name
+
+    @property
+    def signature(self) -> str:
+        where = f" line {self.line}" if self.line else ""
+        return f"{self.name}({', '.join(self.parameters)}){where}"
+
+
+_H = TypeVar("_H", bound="Hook")
+
+
+class Hook:
+    """Receives function events from ``evaluator`` while enabled.
+
+    ``define`` and ``bind`` name function literals as they are evaluated;
+    ``enter`` and ``leave`` bracket every function call. Only the tree
+    walking engines, ``eval`` and ``slots``, go through ``evaluator``.
+    """
+
+    _functions: Dict[int, FunctionProfile]
+    _bodies: List[ast.BlockStatement]
+
+    def __init__(self) -> None:
+        self._functions = {}
+        self._bodies = []
+
+    def enable(self) -> None:
+        current = evaluator.get_profiler()
+        if current is not None and current is not self:
+            raise RuntimeError("another profiler is already enabled")
+        evaluator.set_profiler(self)
+
+    def disable(self) -> None:
+        if evaluator.get_profiler() is self:
+            evaluator.set_profiler(None)
+
+    def __enter__(self: _H) -> _H:
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.disable()
+
+    def define(self, literal: ast.FunctionLiteral) -> None:
+        """Notes ``literal`` when it is evaluated into a function."""
+        key = id(literal.body)
+        if key not in self._functions:
+            # Keeping the body alive keeps its id from being reused.
+            self._bodies.append(literal.body)
+            self._functions[key] = FunctionProfile(
+                "<fn>", literal.token.line, [p.value for p in literal.parameters]
+            )
+
+    def bind(self, literal: ast.FunctionLiteral, name: str) -> None:
+        """Names ``literal`` after the ``let`` that binds it, if still unnamed."""
+        self.define(literal)
+        profile = self._functions[id(literal.body)]
+        if profile.name == "<fn>":
+            profile.name = name
+
+    def enter(self, fn: objmod.Function) -> None:
+        raise NotImplementedError()
+
+    def leave(self) -> None:
+        raise NotImplementedError()
+
+    def table(self) -> str:
+        raise NotImplementedError()
+
+    def collapsed(self) -> str:
+        raise NotImplementedError()
+
+    def _profile(self, fn: objmod.Function) -> FunctionProfile:
+        profile = self._functions.get(id(fn.body))
+        if profile is None:
+            # Created before the profiler was enabled.
+            self._bodies.append(fn.body)
+            profile = self._functions[id(fn.body)] = FunctionProfile(
+                "<fn>", 0, [p.value for p in fn.parameters]
+            )
+        return profile
+
+
+class Profiler(Hook):
+    """Deterministic profiler for Monkey functions run by ``evaluator``.
+
+    While enabled, every function application is timed. Functions are told
+    apart by the ``ast.FunctionLiteral`` that defined them and named after
+    the ``let`` that first bound them.
+
+    Use it as a context manager or call ``enable`` and ``disable``; results
+    accumulate over any number of runs.
+    """
+
+    _clock: Callable[[], float]
+    # Open calls as (profile, call tree node, start time), and per open call
+    # the time spent in the calls it made.
+    _stack: List[Tuple[FunctionProfile, int, float]]
+    _children: List[float]
+    _active: Dict[int, int]
+    # The call tree: node 0 is the root, node i has a parent, a function and
+    # exclusive time, and children by id of their FunctionProfile.
+    _parents: List[int]
+    _tree_functions: List[Optional[FunctionProfile]]
+    _tree_times: List[float]
+    _tree_children: List[Dict[int, int]]
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        super().__init__()
+        self._clock = clock
+        self._stack = []
+        self._children = []
+        self._active = {}
+        self._parents = [0]
+        self._tree_functions = [None]
+        self._tree_times = [0.0]
+        self._tree_children = [{}]
+
+    def enter(self, fn: objmod.Function) -> None:
+        profile = self._profile(fn)
+        profile.calls += 1
+        self._active[id(profile)] = self._active.get(id(profile), 0) + 1
+
+        parent = self._stack[-1][1] if self._stack else 0
+        children = self._tree_children[parent]
+        node = children.get(id(profile))
+        if node is None:
+            node = children[id(profile)] = len(self._parents)
+            self._parents.append(parent)
+            self._tree_functions.append(profile)
+            self._tree_times.append(0.0)
+            self._tree_children.append({})
+        self._stack.append((profile, node, self._clock()))
+        self._children.append(0.0)
+
+    def leave(self) -> None:
+        now = self._clock()
+        profile, node, start = self._stack.pop()
+        elapsed = now - start
+        own = elapsed - self._children.pop()
+        profile.exclusive += own
+        self._tree_times[node] += own
+        active = self._active[id(profile)] - 1
+        self._active[id(profile)] = active
+        if not active:
+            profile.inclusive += elapsed
+        if self._children:
+            self._children[-1] += elapsed
+
+    def functions(self, sort: str = "inclusive") -> List[FunctionProfile]:
+        """Profiles of every function called, largest ``sort`` field first."""
+        profiles = [p for p in self._functions.values() if p.calls]
+        profiles.sort(key=lambda p: getattr(p, sort), reverse=True)
+        return profiles
+
+    def table(self, sort: str = "inclusive") -> str:
+        lines = [
+            f"{'calls':>9} {'inclusive ms':>13} {'exclusive ms':>13}"
+            f" {'per call us':>12}  function"
+        ]
+        for p in self.functions(sort):
+            lines.append(
+                f"{p.calls:>9} {p.inclusive * 1e3:>13.3f} {p.exclusive * 1e3:>13.3f}"
+                f" {p.inclusive / p.calls * 1e6:>12.1f}  {p.signature}"
+            )
+        return "\n".join(lines)
+
+    def collapsed(self) -> str:
+        """Exclusive time per call stack in the collapsed-stack format.
+
+        Each line is ``outer;inner microseconds``, as read by flame graph
+        tools such as ``flamegraph.pl`` or speedscope.
+        """
+        lines = []
+        for node in range(1, len(self._parents)):
+            micros = round(self._tree_times[node] * 1e6)
+            if micros <= 0:
+                continue
+            frames = []
+            while node:
+                frames.append(cast(FunctionProfile, self._tree_functions[node]))
+                node = self._parents[node]
+            lines.append(f"{_stack_label(reversed(frames))} {micros}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class Sampler(Hook):
+    """Statistical profiler for Monkey functions run by ``evaluator``.
+
+    While enabled, ``evaluator`` keeps a shadow stack of the Monkey
+    functions being called, and a ``SIGPROF`` timer samples it every
+    ``interval`` seconds of CPU time. A call costs one list append and one
+    pop, so long runs can be profiled at a few percent overhead, at the
+    price of statistical rather than exact results. Samples are aggregated
+    by function literal, that is by function and source line.
+
+    Needs ``signal.setitimer`` and must be enabled from the main thread.
+    """
+
+    interval: float
+    _stack: List[objmod.Function]
+    _samples: Counter[Tuple[int, ...]]
+    _idle: int
+    _previous_handler: Any
+
+    def __init__(self, interval: float = 0.001) -> None:
+        super().__init__()
+        self.interval = interval
+        self._stack = []
+        self._samples = collections.Counter()
+        self._idle = 0
+        self._previous_handler = None
+
+    def enable(self) -> None:
+        if not hasattr(signal, "setitimer"):
+            raise RuntimeError("sampling needs signal.setitimer")
+        super().enable()
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def disable(self) -> None:
+        if evaluator.get_profiler() is not self:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        super().disable()
+
+    def enter(self, fn: objmod.Function) -> None:
+        self._stack.append(fn)
+
+    def leave(self) -> None:
+        self._stack.pop()
+
+    def _sample(self, signum: int, frame: Any) -> None:
+        stack = self._stack
+        if not stack:
+            self._idle += 1
+            return
+        self._samples[tuple([id(self._profile(fn)) for fn in stack])] += 1
+
+    @property
+    def total(self) -> int:
+        """All samples taken, including those outside any Monkey function."""
+        return sum(self._samples.values()) + self._idle
+
+    def functions(self, sort: str = "samples") -> List[FunctionProfile]:
+        """Profiles of every function sampled, largest ``sort`` field first."""
+        by_id = {id(p): p for p in self._functions.values()}
+        for p in by_id.values():
+            p.samples = p.self_samples = 0
+        for stack, count in self._samples.items():
+            by_id[stack[-1]].self_samples += count
+            for key in set(stack):
+                by_id[key].samples += count
+        profiles = [p for p in by_id.values() if p.samples]
+        profiles.sort(key=lambda p: getattr(p, sort), reverse=True)
+        return profiles
+
+    def table(self, sort: str = "samples") -> str:
+        total = self.total or 1
+        lines = [f"{'samples':>9} {'%':>6} {'self':>9} {'self %':>6}  function"]
+        for p in self.functions(sort):
+            lines.append(
+                f"{p.samples:>9} {p.samples / total:>6.1%} {p.self_samples:>9}"
+                f" {p.self_samples / total:>6.1%}  {p.signature}"
+            )
+        return "\n".join(lines)
+
+    def collapsed(self) -> str:
+        """Sample counts per call stack in the collapsed-stack format."""
+        by_id = {id(p): p for p in self._functions.values()}
+        lines = [
+            f"{_stack_label(by_id[key] for key in stack)} {count}"
+            for stack, count in self._samples.items()
+        ]
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _stack_label(frames: Iterable[FunctionProfile]) -> str:
+    # Semicolons separate frames and the last space the count.
+    return ";".join(f.label.replace(" ", "_") for f in frames)
@@ -0,0 +1,309 @@
+import collections
+import dataclasses
+import weakref
+from typing import (
+    Counter,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    OrderedDict,
+    Set,
+    Tuple,
+    cast,
+)
+from . import ast
+from . import obj as objmod
+from .obj import NULL, TRUE, FALSE
+
+
+@dataclasses.dataclass(frozen=True)
+class Summary:
+    """What a function body depends on besides its arguments.
+
+    ``free`` holds every name the body may read from an enclosing scope
+    and ``callees`` the identifiers it calls, all of them free. A body is
+    ``pure`` when it creates no functions, assigns no free names and calls
+    only free names, so that its result is a value computed from its
+    arguments, the bindings of ``free`` and the results of ``callees``.
+    """
+
+    pure: bool
+    free: FrozenSet[str]
+    callees: Tuple[ast.Identifier, ...]
+
+
+def summarize(parameters: List[ast.Identifier], body: ast.BlockStatement) -> Summary:
+    analysis = _Analysis()
+    analysis.block(body, {p.value for p in parameters})
+    return Summary(analysis.pure, frozenset(analysis.free), tuple(analysis.callees))
+
+
+class _Analysis:
+    pure: bool
+    free: Set[str]
+    callees: List[ast.Identifier]
+
+    def __init__(self) -> None:
+        self.pure = True
+        self.free = set()
+        self.callees = []
+
+    def block(self, block: ast.BlockStatement, bound: Set[str]) -> None:
+        # Blocks share the function's environment, but a let in a branch
+        # may not run, so names it binds are bound only inside the branch.
+        for stmt in block.statements:
+            if isinstance(stmt, ast.LetStatement):
+                self.expression(stmt.value, bound)
+                bound.add(stmt.name.value)
+            elif isinstance(stmt, ast.ReturnStatement):
+                self.expression(stmt.return_value, bound)
+            elif isinstance(stmt, ast.ExpressionStatement):
+                self.expression(stmt.expression, bound)
+            elif isinstance(stmt, ast.AssignStatement):
+                self.expression(stmt.value, bound)
+                if stmt.name.value not in bound:
+                    # Changes a binding some other code may read.
+                    self.pure = False
+                    self.free.add(stmt.name.value)
+            elif isinstance(stmt, ast.WhileStatement):
+                self.expression(stmt.condition, bound)
+                self.block(stmt.body, set(bound))
+
+    def expression(self, node: Optional[ast.Node], bound: Set[str]) -> None:
+        if isinstance(node, ast.Identifier):
+            if node.value not in bound:
+                self.free.add(node.value)
+        elif isinstance(node, ast.PrefixExpression):
+            self.expression(node.right, bound)
+        elif isinstance(node, ast.InfixExpression):
+            self.expression(node.left, bound)
+            self.expression(node.right, bound)
+        elif isinstance(node, ast.IfExpression):
+            self.expression(node.condition, bound)
+            self.block(node.consequence, set(bound))
+            if node.alternative is not None:
+                self.block(node.alternative, set(bound))
+        elif isinstance(node, ast.CallExpression):
+            callee = node.function
+            if isinstance(callee, ast.Identifier) and callee.value not in bound:
+                self.free.add(callee.value)
+                self.callees.append(callee)
+            else:
+                # Calls of parameters, locals or computed functions.
+                self.pure = False
+                self.expression(callee, bound)
+            for arg in node.arguments:
+                self.expression(arg, bound)
+        elif isinstance(node, ast.ArrayLiteral):
+            for element in node.elements:
+                self.expression(element, bound)
+        elif isinstance(node, ast.IndexExpression):
+            self.expression(node.left, bound)
+            self.expression(node.index, bound)
+        elif isinstance(node, ast.FunctionLiteral):
+            # The result could be a new function, whose identity a cached
+            # result would not preserve.
+            self.pure = False
+
+
+# Results a Memo keeps unless told otherwise.
+DEFAULT_MAXSIZE = 4096
+
+# Keys stand for TRUE, FALSE and NULL arguments; Integers are their value.
+_MARKERS = {id(TRUE): "true", id(FALSE): "false", id(NULL): "null"}
+
+Key = Tuple[object, ...]
+
+
+class Memo:
+    """Bounded LRU cache of results of calls to pure functions.
+
+    A function is memoized when its body is pure (see ``Summary``) and every
+    function it calls is pure too, checked against the bindings when it is
+    first called. Only calls whose arguments are all integers,
+    booleans or null are cached, and only results of those types, which
+    compare by value; a function that returns functions is never cached.
+
+    Nothing in Monkey changes a binding except ``let`` and assignment, so
+    the whole cache is dropped when either binds a name that some analyzed
+    function reads from an enclosing scope; ``watched`` holds those names.
+
+    Functions and bodies are held weakly, so the memo keeps no environment
+    or AST alive, and a summary goes with its body. Past ``4 * maxsize``
+    summaries or verdicts, everything is dropped.
+    """
+
+    maxsize: int
+    hits: int
+    misses: int
+    # Results by key, whose first element is the id of the function called.
+    _entries: OrderedDict[Key, Tuple["weakref.ref[objmod.Function]", objmod.Object]]
+    # Summaries by id of function body, and purity by id of function, each
+    # with a reference to the object so that a reused id is told apart.
+    _summaries: Dict[int, Tuple["weakref.ref[ast.BlockStatement]", Summary]]
+    _verdicts: Dict[int, Tuple["weakref.ref[objmod.Function]", bool]]
+    # How many summaries read each of the watched names.
+    _readers: Counter[str]
+    watched: Set[str]
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._summaries = {}
+        self._verdicts = {}
+        self._readers = collections.Counter()
+        self.watched = set()
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+        self._verdicts.clear()
+
+    def clear(self) -> None:
+        """Drops every result, verdict and summary."""
+        self.invalidate()
+        self._summaries.clear()
+        self._readers.clear()
+        self.watched.clear()
+
+    def key(self, fn: objmod.Function, args: List[objmod.Object]) -> Optional[Key]:
+        """The cache key for calling ``fn``, or None if it is not cached.
+
+        Bodies that call nothing are not cached: evaluating them costs
+        about as much as a lookup, and closures made by the thousand would
+        only churn the cache.
+        """
+        if len(args) != len(fn.parameters):
+            # A parameter left without an argument reads an outer binding.
+            return None
+        summary = self.summary(fn)
+        if not summary.pure or not summary.callees:
+            return None
+        verdict = self._verdicts.get(id(fn))
+        if verdict is None or verdict[0]() is not fn:
+            if len(self._verdicts) >= 4 * self.maxsize:
+                self._verdicts.clear()
+            pure = self._check(fn)
+        else:
+            pure = verdict[1]
+        if not pure:
+            return None
+        key: List[object] = [id(fn)]
+        for arg in args:
+            if type(arg) is objmod.Integer:
+                key.append(cast(objmod.Integer, arg).value)
+            else:
+                marker = _MARKERS.get(id(arg))
+                if marker is None:
+                    return None
+                key.append(marker)
+        return tuple(key)
+
+    def get(self, key: Key) -> Optional[objmod.Object]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0]() is None:
+            # A dead function's entry may carry the id of a new one.
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Key, fn: objmod.Function, result: objmod.Object) -> None:
+        if type(result) is not objmod.Integer and id(result) not in _MARKERS:
+            return
+        self._entries[key] = (weakref.ref(fn), result)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def summary(self, fn: objmod.Function) -> Summary:
+        entry = self._summaries.get(id(fn.body))
+        if entry is None or entry[0]() is not fn.body:
+            return self._summarize(fn)
+        return entry[1]
+
+    def _summarize(self, fn: objmod.Function) -> Summary:
+        if len(self._summaries) >= 4 * self.maxsize:
+            self.clear()
+        summary = summarize(fn.parameters, fn.body)
+        key = id(fn.body)
+        self._forget(key)
+        ref = weakref.ref(fn.body, lambda ref: self._forget(key, ref))
+        self._summaries[key] = (ref, summary)
+        for name in summary.free:
+            self._readers[name] += 1
+        self.watched |= summary.free
+        return summary
+
+    def _forget(
+        self, key: int, ref: Optional["weakref.ref[ast.BlockStatement]"] = None
+    ) -> None:
+        """Drops the summary at ``key``, only if it was made with ``ref``
+        when that is given.
+        """
+        entry = self._summaries.get(key)
+        if entry is None or (ref is not None and entry[0] is not ref):
+            return
+        del self._summaries[key]
+        for name in entry[1].free:
+            self._readers[name] -= 1
+            if not self._readers[name]:
+                del self._readers[name]
+                self.watched.discard(name)
+
+    def _check(self, fn: objmod.Function) -> bool:
+        # Functions on a call cycle are assumed pure while the cycle is
+        # checked; if the first one turns out not to be, verdicts that
+        # relied on the assumption are dropped again.
+        checked: List[objmod.Function] = []
+        pure = self._pure(fn, set(), checked)
+        if not pure:
+            for other in checked:
+                if self._verdicts[id(other)][1]:
+                    del self._verdicts[id(other)]
+        self._verdicts[id(fn)] = (weakref.ref(fn), pure)
+        return pure
+
+    def _pure(
+        self, fn: objmod.Function, pending: Set[int], checked: List[objmod.Function]
+    ) -> bool:
+        verdict = self._verdicts.get(id(fn))
+        if verdict is not None and verdict[0]() is fn:
+            return verdict[1]
+        if id(fn) in pending:
+            return True
+        summary = self.summary(fn)
+        pure = summary.pure
+        if pure:
+            pending.add(id(fn))
+            for callee in summary.callees:
+                value = _lookup(fn, callee)
+                if not isinstance(value, objmod.Function) or not self._pure(
+                    value, pending, checked
+                ):
+                    pure = False
+                    break
+            pending.discard(id(fn))
+        self._verdicts[id(fn)] = (weakref.ref(fn), pure)
+        checked.append(fn)
+        return pure
+
+
+def _lookup(fn: objmod.Function, ident: ast.Identifier) -> Optional[objmod.Object]:
+    """The current value of free identifier ``ident`` in the body of ``fn``."""
+    if isinstance(ident, ast.ResolvedIdentifier):
+        # Depths count from the frame of a call, whose outer is fn.env.
+        resolved: Optional[ast.ResolvedIdentifier] = ident
+        while resolved is not None:
+            frame = cast(objmod.Frame, fn.env)
+            for _ in range(resolved.depth - 1):
+                frame = cast(objmod.Frame, frame.outer)
+            value = frame.slots[resolved.slot]
+            if value is not None:
+                return value
+            resolved = resolved.outer
+        return None
+    value, ok = cast(objmod.Environment, fn.env).get(ident.value)
+    return value if ok else None
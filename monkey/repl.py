@@ -1,14 +1,21 @@
-from typing import IO, List
+from typing import IO, List, Optional
 from . import lexer
+from . import metrics as metricsmod
+from . import optimizer
 from . import parser
-from . import evaluator
-from . import obj
+from . import engine as enginemod
 
 PROMPT = ">>> "
 
 
-def start(input: IO, output: IO):
-    env = obj.Environment()
+def start(
+    input: IO,
+    output: IO,
+    engine: str = enginemod.DEFAULT_ENGINE,
+    optimize: bool = False,
+    metrics: Optional[metricsmod.Metrics] = None,
+):
+    eng = enginemod.new_engine(engine)
 
     while True:
         print(PROMPT, end="")
@@ -17,6 +24,16 @@ def start(input: IO, output: IO):
         if not scanned:
             return
 
+        if metrics is not None:
+            try:
+                evaluated = enginemod.run_measured(eng, scanned, optimize, metrics)
+            except enginemod.ParseError as e:
+                print_parser_errors(output, e.errors)
+                continue
+            if evaluated is not None:
+                print(str(evaluated), file=output)
+            continue
+
         lex = lexer.Lexer(scanned)
         psr = parser.Parser(lex)
 
@@ -25,9 +42,12 @@ def start(input: IO, output: IO):
             print_parser_errors(output, psr.errors)
             continue
 
-        evaluated = evaluator.eval(program, env)
+        if optimize:
+            program = optimizer.optimize(program)
+
+        evaluated = eng.run(program)
 
-        if evaluated:
+        if evaluated is not None:
             print(str(evaluated), file=output)
 
 
@@ -0,0 +1,267 @@
+from typing import Dict, List, Optional, Set, Tuple, cast
+from . import ast
+
+
+class _Scope:
+    """Names bound in one function body (or at the top level)."""
+
+    slots: Dict[str, int]
+    visible: Set[str]
+    size: int
+    outer: Optional["_Scope"]
+
+    def __init__(self, outer: Optional["_Scope"] = None) -> None:
+        self.slots = {}
+        self.visible = set()
+        self.size = 0
+        self.outer = outer
+
+    def declare(self, name: str) -> int:
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self._allocate(name)
+        return slot
+
+    def declare_parameter(self, name: str) -> int:
+        # Parameters are bound positionally, so every one gets its own slot
+        # even when a name is repeated.
+        self.visible.add(name)
+        return self._allocate(name)
+
+    def _allocate(self, name: str) -> int:
+        slot = self.size
+        self.slots[name] = slot
+        self.size += 1
+        return slot
+
+
+class Resolver:
+    """Assigns every identifier a (depth, slot) pair.
+
+    The result is a copy of the program in which identifiers are
+    ``ast.ResolvedIdentifier`` and function literals are
+    ``ast.ResolvedFunctionLiteral``, ready to be evaluated against an
+    ``obj.Frame``. The global scope is kept between calls so that a REPL
+    session can resolve one line at a time.
+
+    Every ``let`` in a function body gets a slot up front, but a name only
+    becomes visible to the body itself after its ``let``; code before that
+    still sees the outer binding, as it does in the dynamic evaluator.
+    Nested functions see all slots of their enclosing scopes, which keeps
+    mutually recursive local helpers working. Names that are not bound
+    anywhere get a global slot and fail at runtime if it is still unset.
+
+    A slot can still be unbound when it is read, for a parameter without an
+    argument or a ``let`` in a branch that was not taken; the identifier
+    then falls back on the next enclosing binding of the name, as a lookup
+    in the dynamic evaluator would.
+    """
+
+    _globals: _Scope
+
+    def __init__(self) -> None:
+        self._globals = _Scope()
+
+    @property
+    def global_count(self) -> int:
+        return self._globals.size
+
+    def resolve(self, program: ast.Program) -> ast.Program:
+        self._hoist(self._globals, program.statements)
+        return ast.Program(self._resolve_statements(program.statements, self._globals))
+
+    def _hoist(self, scope: _Scope, statements: List[ast.Statement]) -> None:
+        for name in collect_lets(statements):
+            scope.declare(name)
+
+    def _resolve_statements(
+        self, statements: List[ast.Statement], scope: _Scope
+    ) -> List[ast.Statement]:
+        return [self._resolve_statement(stmt, scope) for stmt in statements]
+
+    def _resolve_statement(self, stmt: ast.Statement, scope: _Scope) -> ast.Statement:
+        if isinstance(stmt, ast.ExpressionStatement):
+            expr = stmt.expression
+            if expr is None:
+                return stmt
+            return ast.ExpressionStatement(
+                stmt.token, self._resolve_expression(expr, scope)
+            )
+        elif isinstance(stmt, ast.LetStatement):
+            value = stmt.value
+            if value is not None:
+                value = self._resolve_expression(value, scope)
+            name = stmt.name
+            slot = scope.declare(name.value)
+            scope.visible.add(name.value)
+            return ast.LetStatement(
+                stmt.token,
+                ast.ResolvedIdentifier(name.token, name.value, 0, slot),
+                value,
+            )
+        elif isinstance(stmt, ast.ReturnStatement):
+            value = stmt.return_value
+            if value is not None:
+                value = self._resolve_expression(value, scope)
+            return ast.ReturnStatement(stmt.token, value)
+        elif isinstance(stmt, ast.WhileStatement):
+            return ast.WhileStatement(
+                stmt.token,
+                self._resolve_expression(stmt.condition, scope),
+                self._resolve_block(stmt.body, scope),
+            )
+        elif isinstance(stmt, ast.AssignStatement):
+            value = self._resolve_expression(stmt.value, scope)
+            return ast.AssignStatement(
+                stmt.token, self._identifier(stmt.name, scope), value
+            )
+        return stmt
+
+    def _resolve_block(
+        self, block: ast.BlockStatement, scope: _Scope
+    ) -> ast.BlockStatement:
+        return ast.BlockStatement(
+            block.token, self._resolve_statements(block.statements, scope)
+        )
+
+    def _resolve_expression(
+        self, node: ast.Expression, scope: _Scope
+    ) -> ast.Expression:
+        if isinstance(node, ast.Identifier):
+            return self._identifier(node, scope)
+        elif isinstance(node, ast.PrefixExpression):
+            return ast.PrefixExpression(
+                node.token, node.operator, self._resolve_expression(node.right, scope)
+            )
+        elif isinstance(node, ast.InfixExpression):
+            return ast.InfixExpression(
+                node.token,
+                self._resolve_expression(node.left, scope),
+                node.operator,
+                self._resolve_expression(node.right, scope),
+            )
+        elif isinstance(node, ast.IfExpression):
+            alternative = node.alternative
+            if alternative is not None:
+                alternative = self._resolve_block(alternative, scope)
+            return ast.IfExpression(
+                node.token,
+                self._resolve_expression(node.condition, scope),
+                self._resolve_block(node.consequence, scope),
+                alternative,
+            )
+        elif isinstance(node, ast.FunctionLiteral):
+            return self._resolve_function_literal(node, scope)
+        elif isinstance(node, ast.CallExpression):
+            return ast.CallExpression(
+                node.token,
+                self._resolve_expression(node.function, scope),
+                [self._resolve_expression(arg, scope) for arg in node.arguments],
+            )
+        elif isinstance(node, ast.ArrayLiteral):
+            return ast.ArrayLiteral(
+                node.token,
+                [self._resolve_expression(element, scope) for element in node.elements],
+            )
+        elif isinstance(node, ast.IndexExpression):
+            return ast.IndexExpression(
+                node.token,
+                self._resolve_expression(node.left, scope),
+                self._resolve_expression(node.index, scope),
+            )
+        return node
+
+    def _resolve_function_literal(
+        self, node: ast.FunctionLiteral, outer: _Scope
+    ) -> ast.ResolvedFunctionLiteral:
+        scope = _Scope(outer)
+        parameters: List[ast.Identifier] = []
+        for param in node.parameters:
+            slot = scope.declare_parameter(param.value)
+            parameters.append(ast.ResolvedIdentifier(param.token, param.value, 0, slot))
+        self._hoist(scope, node.body.statements)
+        body = self._resolve_block(node.body, scope)
+        return ast.ResolvedFunctionLiteral(node.token, parameters, body, scope.size)
+
+    def _identifier(
+        self, ident: ast.Identifier, scope: _Scope
+    ) -> ast.ResolvedIdentifier:
+        resolved: Optional[ast.ResolvedIdentifier] = None
+        for depth, slot in reversed(self._lookup(ident.value, scope)):
+            resolved = ast.ResolvedIdentifier(
+                ident.token, ident.value, depth, slot, resolved
+            )
+        return cast(ast.ResolvedIdentifier, resolved)
+
+    def _lookup(self, name: str, scope: _Scope) -> List[Tuple[int, int]]:
+        """Every binding of ``name`` seen from ``scope``, innermost first,
+        ending with the global one.
+        """
+        if scope is self._globals:
+            return [(0, self._globals.declare(name))]
+        bindings: List[Tuple[int, int]] = []
+        if name in scope.visible:
+            bindings.append((0, scope.slots[name]))
+        depth = 1
+        outer = scope.outer
+        while outer is not None:
+            slot = outer.slots.get(name)
+            if slot is not None:
+                bindings.append((depth, slot))
+            depth += 1
+            outer = outer.outer
+        if name not in self._globals.slots:
+            bindings.append((depth - 1, self._globals.declare(name)))
+        return bindings
+
+
+def collect_lets(statements: List[ast.Statement]) -> List[str]:
+    """Names bound by ``let`` in a body, not counting nested functions."""
+    names: List[str] = []
+    for stmt in statements:
+        _collect_statement(stmt, names)
+    return names
+
+
+def _collect_statement(stmt: ast.Statement, names: List[str]) -> None:
+    if isinstance(stmt, ast.LetStatement):
+        names.append(stmt.name.value)
+        if stmt.value is not None:
+            _collect_expression(stmt.value, names)
+    elif isinstance(stmt, ast.ReturnStatement):
+        if stmt.return_value is not None:
+            _collect_expression(stmt.return_value, names)
+    elif isinstance(stmt, ast.ExpressionStatement):
+        if stmt.expression is not None:
+            _collect_expression(stmt.expression, names)
+    elif isinstance(stmt, ast.WhileStatement):
+        _collect_expression(stmt.condition, names)
+        for inner in stmt.body.statements:
+            _collect_statement(inner, names)
+    elif isinstance(stmt, ast.AssignStatement):
+        _collect_expression(stmt.value, names)
+
+
+def _collect_expression(node: ast.Expression, names: List[str]) -> None:
+    if isinstance(node, ast.IfExpression):
+        _collect_expression(node.condition, names)
+        for stmt in node.consequence.statements:
+            _collect_statement(stmt, names)
+        if node.alternative is not None:
+            for stmt in node.alternative.statements:
+                _collect_statement(stmt, names)
+    elif isinstance(node, ast.PrefixExpression):
+        _collect_expression(node.right, names)
+    elif isinstance(node, ast.InfixExpression):
+        _collect_expression(node.left, names)
+        _collect_expression(node.right, names)
+    elif isinstance(node, ast.CallExpression):
+        _collect_expression(node.function, names)
+        for arg in node.arguments:
+            _collect_expression(arg, names)
+    elif isinstance(node, ast.ArrayLiteral):
+        for element in node.elements:
+            _collect_expression(element, names)
+    elif isinstance(node, ast.IndexExpression):
+        _collect_expression(node.left, names)
+        _collect_expression(node.index, names)
@@ -0,0 +1,351 @@
+from typing import Any, Dict, List, Tuple, Type, cast
+from . import ast
+from . import builtins
+from . import capture
+from . import evaluator
+from . import obj as objmod
+from .obj import NULL, TRUE, FALSE
+
+# Work items on the continuation stack. _EVAL evaluates a node and pushes its
+# value; the others consume values produced by the work items pushed above
+# them.
+_EVAL = 0
+_BLOCK = 1
+_PREFIX = 2
+_INFIX = 3
+_IF = 4
+_LET = 5
+_RETURN = 6
+_CALL = 7
+_UNWRAP = 8
+_WHILE = 9
+_LOOP = 10
+_ASSIGN = 11
+_ARRAY = 12
+_INDEX = 13
+
+_PROGRAM = 0
+_BLOCK_STATEMENT = 1
+_EXPRESSION_STATEMENT = 2
+_INTEGER = 3
+_BOOLEAN = 4
+_PREFIX_EXPRESSION = 5
+_INFIX_EXPRESSION = 6
+_IF_EXPRESSION = 7
+_RETURN_STATEMENT = 8
+_LET_STATEMENT = 9
+_IDENTIFIER = 10
+_FUNCTION_LITERAL = 11
+_CALL_EXPRESSION = 12
+_WHILE_STATEMENT = 13
+_ASSIGN_STATEMENT = 14
+_ARRAY_LITERAL = 15
+_INDEX_EXPRESSION = 16
+
+_node_kinds: Dict[Type[ast.Node], int] = {
+    ast.Program: _PROGRAM,
+    ast.BlockStatement: _BLOCK_STATEMENT,
+    ast.ExpressionStatement: _EXPRESSION_STATEMENT,
+    ast.IntegerLiteral: _INTEGER,
+    ast.Boolean: _BOOLEAN,
+    ast.PrefixExpression: _PREFIX_EXPRESSION,
+    ast.InfixExpression: _INFIX_EXPRESSION,
+    ast.IfExpression: _IF_EXPRESSION,
+    ast.ReturnStatement: _RETURN_STATEMENT,
+    ast.LetStatement: _LET_STATEMENT,
+    ast.Identifier: _IDENTIFIER,
+    ast.FunctionLiteral: _FUNCTION_LITERAL,
+    ast.CallExpression: _CALL_EXPRESSION,
+    ast.WhileStatement: _WHILE_STATEMENT,
+    ast.AssignStatement: _ASSIGN_STATEMENT,
+    ast.ArrayLiteral: _ARRAY_LITERAL,
+    ast.IndexExpression: _INDEX_EXPRESSION,
+}
+
+Integer = objmod.Integer
+integer = objmod.integer
+ReturnValue = objmod.ReturnValue
+Error = objmod.Error
+Function = objmod.Function
+Builtin = objmod.Builtin
+
+
+def eval(node: ast.Node, env: objmod.Environment) -> objmod.Object:
+    """Evaluates ``node`` like ``evaluator.eval`` without Python recursion.
+
+    Pending work lives in an explicit continuation stack and intermediate
+    results in a value stack, both on the heap, so the depth of Monkey
+    recursion is bounded by memory instead of ``sys.getrecursionlimit()``.
+    Calls in tail position do not grow either stack. Only functions called
+    by builtins such as ``map`` run in a loop of their own.
+    """
+    capture.analyze(node)
+    return _run(node, env)
+
+
+def _apply(fn: objmod.Object, args: List[objmod.Object]) -> objmod.Object:
+    """Calls ``fn`` for a builtin, in a new loop."""
+    if not isinstance(fn, Function):
+        return _call_builtin(fn, args)
+    call_env = cast(objmod.Environment, fn.env).new_enclosed_environment()
+    for param, arg in zip(fn.parameters, args):
+        call_env.set(param.value, arg)
+    result = _run(fn.body, call_env)
+    if type(result) is ReturnValue:
+        return result.value
+    return result
+
+
+def _call_builtin(fn: objmod.Object, args: List[objmod.Object]) -> objmod.Object:
+    if type(fn) is not Builtin:
+        return Error(f"not a function: {fn.type()}")
+    return cast(objmod.Builtin, fn).fn(args, _apply)
+
+
+def _run(node: ast.Node, env: objmod.Environment) -> objmod.Object:
+    values: List[Any] = []
+    push_value = values.append
+    pop_value = values.pop
+    todo: List[Tuple[Any, ...]] = [(_EVAL, node, env)]
+    push = todo.append
+    pop = todo.pop
+
+    while todo:
+        task = pop()
+        op = task[0]
+
+        if op == _EVAL:
+            current: Any = task[1]
+            scope: Any = task[2]
+            kind = _node_kinds.get(type(current))
+            if kind == _IDENTIFIER:
+                val, ok = scope.get(current.value)
+                if not ok:
+                    val = builtins.lookup(current.value)
+                    if val is None:
+                        return Error(f"identifier not found: {current.value}")
+                push_value(val)
+            elif kind == _INTEGER:
+                push_value(evaluator.literal(current))
+            elif kind == _INFIX_EXPRESSION:
+                push((_INFIX, current.operator))
+                push((_EVAL, current.right, scope))
+                push((_EVAL, current.left, scope))
+            elif kind == _CALL_EXPRESSION:
+                args = current.arguments
+                push((_CALL, len(args)))
+                for arg in reversed(args):
+                    push((_EVAL, arg, scope))
+                push((_EVAL, current.function, scope))
+            elif kind == _EXPRESSION_STATEMENT:
+                if current.expression is None:
+                    push_value(NULL)
+                else:
+                    push((_EVAL, current.expression, scope))
+            elif kind == _IF_EXPRESSION:
+                push((_IF, current, scope))
+                push((_EVAL, current.condition, scope))
+            elif kind == _BLOCK_STATEMENT or kind == _PROGRAM:
+                statements = current.statements
+                if not statements:
+                    push_value(NULL)
+                else:
+                    is_program = kind == _PROGRAM
+                    if len(statements) > 1 or is_program:
+                        push((_BLOCK, statements, 1, scope, is_program))
+                    push((_EVAL, statements[0], scope))
+            elif kind == _RETURN_STATEMENT:
+                push((_RETURN,))
+                push((_EVAL, current.return_value, scope))
+            elif kind == _LET_STATEMENT:
+                push((_LET, current.name.value, scope))
+                push((_EVAL, current.value, scope))
+            elif kind == _BOOLEAN:
+                push_value(TRUE if current.value else FALSE)
+            elif kind == _PREFIX_EXPRESSION:
+                push((_PREFIX, current.operator))
+                push((_EVAL, current.right, scope))
+            elif kind == _FUNCTION_LITERAL:
+                closure_env = capture.closure_env(current, scope)
+                push_value(Function(current.parameters, current.body, closure_env))
+            elif kind == _WHILE_STATEMENT:
+                push((_WHILE, current, scope))
+                push((_EVAL, current.condition, scope))
+            elif kind == _ASSIGN_STATEMENT:
+                push((_ASSIGN, current.name.value, scope))
+                push((_EVAL, current.value, scope))
+            elif kind == _ARRAY_LITERAL:
+                elements = current.elements
+                push((_ARRAY, len(elements)))
+                for element in reversed(elements):
+                    push((_EVAL, element, scope))
+            elif kind == _INDEX_EXPRESSION:
+                push((_INDEX,))
+                push((_EVAL, current.index, scope))
+                push((_EVAL, current.left, scope))
+            else:
+                push_value(NULL)
+
+        elif op == _INFIX:
+            right = pop_value()
+            left = pop_value()
+            if type(left) is Error:
+                return left
+            if type(right) is Error:
+                return right
+            if type(left) is Integer and type(right) is Integer:
+                infix_op = task[1]
+                if infix_op == "+":
+                    push_value(integer(left.value + right.value))
+                    continue
+                elif infix_op == "-":
+                    push_value(integer(left.value - right.value))
+                    continue
+                elif infix_op == "<":
+                    push_value(TRUE if left.value < right.value else FALSE)
+                    continue
+            try:
+                result = evaluator._eval_infix_expression(left, task[1], right)
+            except evaluator.MonkeyError as e:
+                return e.error
+            push_value(result)
+
+        elif op == _BLOCK:
+            result = values[-1]
+            if type(result) is Error:
+                return result
+            if type(result) is ReturnValue:
+                if task[4]:
+                    values[-1] = result.value
+                continue
+            statements = task[1]
+            i = task[2]
+            if i < len(statements):
+                pop_value()
+                # The last statement of a block needs no continuation: its
+                # value, ReturnValue or Error is the value of the block.
+                if i + 1 < len(statements) or task[4]:
+                    push((_BLOCK, statements, i + 1, task[3], task[4]))
+                push((_EVAL, statements[i], task[3]))
+
+        elif op == _CALL:
+            nargs = task[1]
+            if nargs:
+                args = values[-nargs:]
+                del values[-nargs:]
+            else:
+                args = []
+            fn = pop_value()
+            if type(fn) is Error:
+                return fn
+            for arg in args:
+                if type(arg) is Error:
+                    return arg
+            if not isinstance(fn, Function):
+                result = _call_builtin(fn, args)
+                if type(result) is Error:
+                    return result
+                push_value(result)
+                continue
+            call_env = cast(objmod.Environment, fn.env).new_enclosed_environment()
+            for param, arg in zip(fn.parameters, args):
+                call_env.set(param.value, arg)
+            # In tail position the caller's pending unwrap does the job, so
+            # tail calls leave the continuation stack as it is.
+            if not todo or todo[-1][0] != _UNWRAP:
+                push((_UNWRAP,))
+            push((_EVAL, fn.body, call_env))
+
+        elif op == _UNWRAP:
+            result = values[-1]
+            if type(result) is ReturnValue:
+                values[-1] = result.value
+
+        elif op == _IF:
+            condition = pop_value()
+            if type(condition) is Error:
+                return condition
+            ifexp = task[1]
+            if condition is not NULL and condition is not FALSE:
+                push((_EVAL, ifexp.consequence, task[2]))
+            elif ifexp.alternative is not None:
+                push((_EVAL, ifexp.alternative, task[2]))
+            else:
+                push_value(NULL)
+
+        elif op == _LET:
+            val = values[-1]
+            if type(val) is Error:
+                return val
+            task[2].set(task[1], val)
+            values[-1] = NULL
+
+        elif op == _WHILE:
+            condition = pop_value()
+            if type(condition) is Error:
+                return condition
+            if condition is not NULL and condition is not FALSE:
+                push((_LOOP, task[1], task[2]))
+                push((_EVAL, task[1].body, task[2]))
+            else:
+                push_value(NULL)
+
+        elif op == _LOOP:
+            # The body has run; a ReturnValue or Error ends the loop with it.
+            result = values[-1]
+            if type(result) is Error:
+                return result
+            if type(result) is not ReturnValue:
+                pop_value()
+                push((_WHILE, task[1], task[2]))
+                push((_EVAL, task[1].condition, task[2]))
+
+        elif op == _ASSIGN:
+            val = values[-1]
+            if type(val) is Error:
+                return val
+            if task[2].assign(task[1], val) is None:
+                return Error(f"identifier not found: {task[1]}")
+            values[-1] = NULL
+
+        elif op == _ARRAY:
+            nelements = task[1]
+            if nelements:
+                elements = values[-nelements:]
+                del values[-nelements:]
+            else:
+                elements = []
+            for element in elements:
+                if type(element) is Error:
+                    return element
+            push_value(objmod.array_of(elements))
+
+        elif op == _INDEX:
+            index = pop_value()
+            left = pop_value()
+            if type(left) is Error:
+                return left
+            if type(index) is Error:
+                return index
+            result = builtins.index(left, index)
+            if type(result) is Error:
+                return result
+            push_value(result)
+
+        elif op == _RETURN:
+            val = values[-1]
+            if type(val) is Error:
+                return val
+            values[-1] = ReturnValue(val)
+
+        elif op == _PREFIX:
+            right = pop_value()
+            if type(right) is Error:
+                return right
+            try:
+                result = evaluator._eval_prefix_expression(task[1], right)
+            except evaluator.MonkeyError as e:
+                return e.error
+            push_value(result)
+
+    return pop_value()
@@ -6,6 +6,10 @@ import dataclasses
 class Token:
     type: str
     literal: typing.Union[str, None]
+    # 1-based source line, 0 when unknown. The lexer shares one Token per
+    # literal and only gives ``fn`` tokens their own line, so that function
+    # literals can be located; it takes no part in comparisons.
+    line: int = dataclasses.field(default=0, compare=False, repr=False)
 
 
 ILLEGAL = "ILLEGAL"
@@ -37,6 +41,8 @@ LPAREN = "("
 RPAREN = ")"
 LBRACE = "{"
 RBRACE = "}"
+LBRACKET = "["
+RBRACKET = "]"
 
 # keywords
 FUNCTION = "FUNCTION"
@@ -46,6 +52,7 @@ FALSE = "FALSE"
 IF = "IF"
 ELSE = "ELSE"
 RETURN = "RETURN"
+WHILE = "WHILE"
 
 _keywords = {
     "fn": FUNCTION,
@@ -54,13 +61,55 @@ _keywords = {
     "false": FALSE,
     "if": IF,
     "else": ELSE,
-    "return": RETURN
+    "return": RETURN,
+    "while": WHILE,
 }
 
 
+# Small integer codes for token types, used by compact token storage.
+TYPES: typing.List[str] = [
+    ILLEGAL,
+    EOF,
+    IDENT,
+    INT,
+    ASSIGN,
+    PLUS,
+    MINUS,
+    BANG,
+    ASTERISK,
+    SLASH,
+    LT,
+    GT,
+    EQ,
+    NOT_EQ,
+    COMMA,
+    SEMICOLON,
+    LPAREN,
+    RPAREN,
+    LBRACE,
+    RBRACE,
+    FUNCTION,
+    LET,
+    TRUE,
+    FALSE,
+    IF,
+    ELSE,
+    RETURN,
+    WHILE,
+    LBRACKET,
+    RBRACKET,
+]
+
+KINDS: typing.Dict[str, int] = {t: i for i, t in enumerate(TYPES)}
+
+
 def lookup_ident(ident):
     return _keywords.get(ident, IDENT)
 
 
+def keywords() -> typing.List[str]:
+    return list(_keywords)
+
+
 def null() -> Token:
     return Token(ILLEGAL, "")
\ No newline at end of file
@@ -0,0 +1,390 @@
+from typing import List, Optional, Tuple, cast
+from . import builtins
+from . import code
+from . import compiler
+from . import obj as objmod
+from .compiler import Bytecode
+from .obj import NULL, TRUE, FALSE
+
+Integer = objmod.Integer
+integer = objmod.integer
+Closure = objmod.Closure
+Builtin = objmod.Builtin
+Cell = objmod.Cell
+Error = objmod.Error
+
+# What a local or free variable holds until it is bound.
+_UNBOUND = cast(objmod.Object, None)
+
+
+class VM:
+    """Stack machine that runs ``compiler.Bytecode``.
+
+    ``globals`` may be shared between runs so that a REPL session keeps its
+    bindings; it is grown to fit every global the bytecode knows about.
+    After ``run``, ``returned`` tells whether a top-level ``return`` ended
+    the program.
+    """
+
+    _constants: List[objmod.Object]
+    _globals: List[Optional[objmod.Object]]
+    _global_names: List[str]
+    _main: objmod.Closure
+    returned: bool
+
+    def __init__(
+        self,
+        bytecode: Bytecode,
+        globals: Optional[List[Optional[objmod.Object]]] = None,
+    ) -> None:
+        self._constants = bytecode.constants
+        self._globals = globals if globals is not None else []
+        self._global_names = bytecode.global_names
+        missing = len(self._global_names) - len(self._globals)
+        if missing > 0:
+            self._globals.extend([None] * missing)
+        main_fn = objmod.CompiledFunction(bytecode.instructions)
+        self._main = objmod.Closure(main_fn, [])
+        self.returned = False
+
+    def run(self) -> objmod.Object:
+        return self._execute(self._main, [])
+
+    def _apply(self, callee: objmod.Object, args: List[objmod.Object]) -> objmod.Object:
+        """Calls ``callee`` for a builtin, in a loop of its own."""
+        if type(callee) is not Closure:
+            return self._call_builtin(callee, args)
+        return self._execute(cast(objmod.Closure, callee), args)
+
+    def _call_builtin(
+        self, callee: objmod.Object, args: List[objmod.Object]
+    ) -> objmod.Object:
+        if type(callee) is not Builtin:
+            return Error(f"not a function: {callee.type()}")
+        return cast(objmod.Builtin, callee).fn(args, self._apply)
+
+    def _fallback(self, cl: objmod.Closure, index: int) -> objmod.Object:
+        """The value of the next bound binding of the name of local or free
+        variable ``index`` of ``cl``, which is unbound (see
+        ``obj.CompiledFunction.fallbacks``).
+        """
+        fn = cl.fn
+        entry = fn.fallbacks[index]
+        while entry is not None:
+            scope, i = entry
+            if scope == compiler.GLOBAL_SCOPE:
+                val = self._globals[i]
+                if val is None:
+                    val = builtins.lookup(self._global_names[i])
+                if val is not None:
+                    return val
+                break
+            if scope == compiler.FUNCTION_SCOPE:
+                return cl
+            val = cl.free[i]
+            if type(val) is Cell:
+                val = cast(objmod.Cell, val).value
+            if val is not None:
+                return val
+            entry = fn.fallbacks[fn.num_locals + i]
+        return Error(f"identifier not found: {fn.names[index]}")
+
+    def _assign_fallback(
+        self, cl: objmod.Closure, index: int, val: objmod.Object
+    ) -> Optional[objmod.Error]:
+        """Assigns ``val`` to the binding ``_fallback`` would read."""
+        fn = cl.fn
+        entry = fn.fallbacks[index]
+        while entry is not None:
+            scope, i = entry
+            if scope == compiler.GLOBAL_SCOPE:
+                if self._globals[i] is None:
+                    break
+                self._globals[i] = val
+                return None
+            # An assigned name is never the current closure, and its outer
+            # bindings live in cells.
+            cell = cast(objmod.Cell, cl.free[i])
+            if cell.value is not None:
+                cell.value = val
+                return None
+            entry = fn.fallbacks[fn.num_locals + i]
+        return Error(f"identifier not found: {fn.names[index]}")
+
+    def _execute(self, cl: objmod.Closure, args: List[objmod.Object]) -> objmod.Object:
+        """Runs ``cl`` with ``args`` until it returns from its first frame.
+
+        Locals and free variables that are not bound yet hold None, as do
+        parameters a call passes no argument for, and are read and assigned
+        through their fallbacks until then; extra arguments are ignored, the
+        way the evaluator ignores them.
+        """
+        constants = self._constants
+        globals_ = self._globals
+        stack: List[objmod.Object] = list(args)
+        push = stack.append
+        pop = stack.pop
+        frames: List[Tuple[objmod.Closure, int, int]] = []
+
+        ins = cl.fn.instructions
+        free = cl.free
+        ip = 0
+        bp = 0
+        result: objmod.Object = NULL
+        nparams = cl.fn.num_parameters
+        if len(stack) > nparams:
+            del stack[nparams:]
+        if cl.fn.num_locals > len(stack):
+            stack.extend([_UNBOUND] * (cl.fn.num_locals - len(stack)))
+
+        while True:
+            op = ins[ip]
+            if op == code.OP_GET_LOCAL:
+                val = stack[bp + ins[ip + 1]]
+                if val is None:
+                    val = self._fallback(cl, ins[ip + 1])
+                    if type(val) is Error:
+                        return val
+                push(val)
+                ip += 2
+            elif op == code.OP_CONSTANT:
+                push(constants[ins[ip + 1]])
+                ip += 2
+            elif op == code.OP_GET_GLOBAL:
+                val = globals_[ins[ip + 1]]
+                if val is None:
+                    name = self._global_names[ins[ip + 1]]
+                    val = builtins.lookup(name)
+                    if val is None:
+                        return objmod.Error(f"identifier not found: {name}")
+                push(val)
+                ip += 2
+            elif op == code.OP_GET_FREE:
+                val = free[ins[ip + 1]]
+                if val is None:
+                    val = self._fallback(cl, cl.fn.num_locals + ins[ip + 1])
+                    if type(val) is Error:
+                        return val
+                push(val)
+                ip += 2
+            elif code.OP_ADD <= op <= code.OP_DIV:
+                right = pop()
+                left = pop()
+                if type(left) is not Integer or type(right) is not Integer:
+                    return _infix_error(left, _operators[op], right)
+                if op == code.OP_ADD:
+                    push(integer(left.value + right.value))
+                elif op == code.OP_SUB:
+                    push(integer(left.value - right.value))
+                elif op == code.OP_MUL:
+                    push(integer(left.value * right.value))
+                else:
+                    push(integer(left.value // right.value))
+                ip += 1
+            elif code.OP_EQUAL <= op <= code.OP_LESS_THAN:
+                right = pop()
+                left = pop()
+                if type(left) is Integer and type(right) is Integer:
+                    lv = left.value
+                    rv = right.value
+                    if op == code.OP_EQUAL:
+                        cond = lv == rv
+                    elif op == code.OP_NOT_EQUAL:
+                        cond = lv != rv
+                    elif op == code.OP_GREATER_THAN:
+                        cond = lv > rv
+                    else:
+                        cond = lv < rv
+                elif op == code.OP_EQUAL:
+                    cond = left is right
+                elif op == code.OP_NOT_EQUAL:
+                    cond = left is not right
+                else:
+                    return _infix_error(left, _operators[op], right)
+                push(TRUE if cond else FALSE)
+                ip += 1
+            elif op == code.OP_JUMP_NOT_TRUTHY:
+                val = pop()
+                if val is FALSE or val is NULL:
+                    ip = ins[ip + 1]
+                else:
+                    ip += 2
+            elif op == code.OP_JUMP:
+                ip = ins[ip + 1]
+            elif op == code.OP_CALL:
+                nargs = ins[ip + 1]
+                callee = stack[-1 - nargs]
+                if type(callee) is not Closure:
+                    val = self._call_builtin(callee, stack[len(stack) - nargs :])
+                    if type(val) is Error:
+                        return val
+                    del stack[-1 - nargs :]
+                    push(val)
+                    ip += 2
+                    continue
+                fn = callee.fn
+                frames.append((cl, ip + 2, bp))
+                cl = callee
+                ins = fn.instructions
+                free = callee.free
+                ip = 0
+                bp = len(stack) - nargs
+                if nargs > fn.num_parameters:
+                    del stack[bp + fn.num_parameters :]
+                    nargs = fn.num_parameters
+                if fn.num_locals > nargs:
+                    stack.extend([_UNBOUND] * (fn.num_locals - nargs))
+            elif op == code.OP_RETURN_VALUE:
+                val = pop()
+                if not frames:
+                    self.returned = cl is self._main
+                    return val
+                del stack[bp - 1 :]
+                push(val)
+                cl, ip, bp = frames.pop()
+                ins = cl.fn.instructions
+                free = cl.free
+            elif op == code.OP_POP:
+                result = pop()
+                ip += 1
+            elif op == code.OP_TRUE:
+                push(TRUE)
+                ip += 1
+            elif op == code.OP_FALSE:
+                push(FALSE)
+                ip += 1
+            elif op == code.OP_NULL:
+                push(NULL)
+                ip += 1
+            elif op == code.OP_SET_LOCAL:
+                stack[bp + ins[ip + 1]] = pop()
+                ip += 2
+            elif op == code.OP_ASSIGN_LOCAL:
+                if stack[bp + ins[ip + 1]] is None:
+                    err = self._assign_fallback(cl, ins[ip + 1], pop())
+                    if err is not None:
+                        return err
+                else:
+                    stack[bp + ins[ip + 1]] = pop()
+                ip += 2
+            elif op == code.OP_SET_GLOBAL:
+                globals_[ins[ip + 1]] = pop()
+                ip += 2
+            elif op == code.OP_ASSIGN_GLOBAL:
+                if globals_[ins[ip + 1]] is None:
+                    name = self._global_names[ins[ip + 1]]
+                    return objmod.Error(f"identifier not found: {name}")
+                globals_[ins[ip + 1]] = pop()
+                ip += 2
+            elif op == code.OP_GET_LOCAL_CELL:
+                val = cast(objmod.Cell, stack[bp + ins[ip + 1]]).value
+                if val is None:
+                    val = self._fallback(cl, ins[ip + 1])
+                    if type(val) is Error:
+                        return val
+                push(val)
+                ip += 2
+            elif op == code.OP_SET_LOCAL_CELL:
+                cast(objmod.Cell, stack[bp + ins[ip + 1]]).value = pop()
+                ip += 2
+            elif op == code.OP_GET_FREE_CELL:
+                val = cast(objmod.Cell, free[ins[ip + 1]]).value
+                if val is None:
+                    val = self._fallback(cl, cl.fn.num_locals + ins[ip + 1])
+                    if type(val) is Error:
+                        return val
+                push(val)
+                ip += 2
+            elif op == code.OP_SET_FREE:
+                cell = cast(objmod.Cell, free[ins[ip + 1]])
+                if cell.value is None:
+                    err = self._assign_fallback(
+                        cl, cl.fn.num_locals + ins[ip + 1], pop()
+                    )
+                    if err is not None:
+                        return err
+                else:
+                    cell.value = pop()
+                ip += 2
+            elif op == code.OP_ASSIGN_LOCAL_CELL:
+                cell = cast(objmod.Cell, stack[bp + ins[ip + 1]])
+                if cell.value is None:
+                    err = self._assign_fallback(cl, ins[ip + 1], pop())
+                    if err is not None:
+                        return err
+                else:
+                    cell.value = pop()
+                ip += 2
+            elif op == code.OP_CAPTURE_LOCAL:
+                push(stack[bp + ins[ip + 1]])
+                ip += 2
+            elif op == code.OP_CAPTURE_FREE:
+                push(free[ins[ip + 1]])
+                ip += 2
+            elif op == code.OP_MAKE_CELL:
+                slot = bp + ins[ip + 1]
+                stack[slot] = cast(objmod.Object, Cell(stack[slot]))
+                ip += 2
+            elif op == code.OP_MINUS:
+                right = pop()
+                if type(right) is not Integer:
+                    return objmod.Error(f"unknown operator: -{right.type()}")
+                push(integer(-right.value))
+                ip += 1
+            elif op == code.OP_BANG:
+                right = pop()
+                push(TRUE if right is FALSE or right is NULL else FALSE)
+                ip += 1
+            elif op == code.OP_CLOSURE:
+                fn_const = cast(objmod.CompiledFunction, constants[ins[ip + 1]])
+                nfree = ins[ip + 2]
+                if nfree:
+                    captured = stack[-nfree:]
+                    del stack[-nfree:]
+                else:
+                    captured = []
+                push(Closure(fn_const, captured))
+                ip += 3
+            elif op == code.OP_ARRAY:
+                nelements = ins[ip + 1]
+                elements = stack[len(stack) - nelements :]
+                del stack[len(stack) - nelements :]
+                push(objmod.array_of(elements))
+                ip += 2
+            elif op == code.OP_INDEX:
+                index = pop()
+                left = pop()
+                val = builtins.index(left, index)
+                if type(val) is Error:
+                    return val
+                push(val)
+                ip += 1
+            elif op == code.OP_CURRENT_CLOSURE:
+                push(cl)
+                ip += 1
+            elif op == code.OP_RETURN:
+                if not frames:
+                    return result
+                del stack[bp - 1 :]
+                push(NULL)
+                cl, ip, bp = frames.pop()
+                ins = cl.fn.instructions
+                free = cl.free
+            else:
+                raise RuntimeError(f"opcode {op} undefined")
+
+
+_operators = {
+    code.OP_ADD: "+",
+    code.OP_SUB: "-",
+    code.OP_MUL: "*",
+    code.OP_DIV: "/",
+    code.OP_GREATER_THAN: ">",
+    code.OP_LESS_THAN: "<",
+}
+
+
+def _infix_error(left: objmod.Object, op: str, right: objmod.Object) -> objmod.Error:
+    if left.type() != right.type():
+        return objmod.Error(f"type mismatch: {left.type()} {op} {right.type()}")
+    return objmod.Error(f"unknown operator: {left.type()} {op} {right.type()}")
@@ -0,0 +1,93 @@
+import unittest
+from bench import generator
+from bench import runner
+from bench import scaling
+from bench import workloads
+from monkey import engine
+from monkey import evaluator
+from monkey import obj as objmod
+from monkey import purity
+
+
+class TestBench(unittest.TestCase):
+    def test_mann_whitney_u(self):
+        same = [1.0, 1.1, 0.9, 1.05, 0.95, 1.0, 1.02, 0.98]
+        self.assertGreater(runner.mann_whitney_u(same, list(reversed(same))), 0.5)
+        slower = [x + 0.5 for x in same]
+        self.assertLess(runner.mann_whitney_u(same, slower), 0.01)
+        self.assertEqual(runner.mann_whitney_u([1.0] * 5, [1.0] * 5), 1.0)
+
+    def test_compare(self):
+        times = [1.0, 1.1, 0.9, 1.05, 0.95, 1.0, 1.02, 0.98]
+        base = {"benchmarks": {"a": {"times": times}, "b": {"times": times}}}
+        new = {
+            "benchmarks": {
+                "a": {"times": [t * 1.5 for t in times]},
+                "b": {"times": [t * 1.01 for t in times]},
+                "c": {"times": times},
+            }
+        }
+        comparisons = {c.name: c for c in runner.compare(base, new)}
+        self.assertEqual(sorted(comparisons), ["a", "b"])
+        self.assertTrue(comparisons["a"].regression)
+        self.assertAlmostEqual(comparisons["a"].change, 0.5)
+        self.assertFalse(comparisons["b"].significant)
+
+    def test_workloads_run(self):
+        benchmarks = workloads.micro() + workloads.macro(list(engine.ENGINES))
+        for bench in benchmarks:
+            with self.subTest(bench.name):
+                bench.setup()()
+
+    def test_workloads_skip_memo(self):
+        memo = purity.Memo()
+        self.addCleanup(evaluator.set_memo, evaluator.get_memo())
+        evaluator.set_memo(memo)
+        for bench in workloads.micro() + workloads.macro(["eval"]):
+            with self.subTest(bench.name):
+                bench.setup()()
+        self.assertEqual((memo.hits, memo.misses), (0, 0))
+        self.assertIs(evaluator.get_memo(), memo)
+
+    def test_run(self):
+        bench = workloads.micro()[0]
+        results = runner.run([bench], repeat=2, warmup=0)
+        self.assertEqual(len(results["benchmarks"][bench.name]["times"]), 2)
+
+
+class TestGenerator(unittest.TestCase):
+    def test_deterministic(self):
+        shape = generator.Shape(statements=50, seed=7)
+        self.assertEqual(generator.generate(shape), generator.generate(shape))
+        other = generator.Shape(statements=50, seed=8)
+        self.assertNotEqual(generator.generate(shape), generator.generate(other))
+
+    def test_programs_are_valid(self):
+        shapes = [
+            generator.Shape(statements=60, seed=seed, expression_depth=depth)
+            for seed in range(4)
+            for depth in (1, 4)
+        ] + [
+            generator.Shape(statements=40, function_nesting=4, call_fanout=4),
+            generator.Shape(statements=40, identifiers=1, function_nesting=0),
+        ]
+        for shape in shapes:
+            source = generator.generate(shape)
+            program = engine.parse(source)
+            self.assertEqual(len(program.statements), shape.statements)
+            results = set()
+            for name in engine.ENGINES:
+                with self.subTest(shape=shape, engine=name):
+                    result = engine.run(source, name)
+                    self.assertIsInstance(result, objmod.Integer)
+                    results.add(str(result))
+            self.assertEqual(len(results), 1)
+
+    def test_scale(self):
+        rows = scaling.scale([20, 40], generator.Shape())
+        self.assertEqual([row.statements for row in rows], [20, 40])
+        self.assertLess(rows[0].tokens, rows[1].tokens)
+        for phase in scaling.PHASES:
+            self.assertGreater(rows[1].seconds[phase], 0)
+            self.assertGreater(rows[1].peak_bytes[phase], 0)
+        self.assertIn("parse ms", scaling.format_table(rows))
@@ -0,0 +1,162 @@
+import gc
+import unittest
+from typing import List, cast
+from monkey import ast
+from monkey import capture
+from monkey import engine
+from monkey import obj as objmod
+
+ENGINES = ("eval", "stack", "closure")
+
+
+def _literal(source: str) -> ast.FunctionLiteral:
+    stmt = cast(ast.ExpressionStatement, engine.parse(source).statements[0])
+    return cast(ast.FunctionLiteral, stmt.expression)
+
+
+def _nested(literal: ast.FunctionLiteral) -> List[ast.FunctionLiteral]:
+    """The function literals in ``literal``, innermost last."""
+    found = []
+    pending: List[object] = [literal]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, ast.FunctionLiteral):
+            found.append(value)
+        if isinstance(value, ast.Node):
+            pending.extend(reversed(list(vars(value).values())))
+        elif isinstance(value, list):
+            pending.extend(reversed(value))
+    return found[1:]
+
+
+class TestFreeNames(unittest.TestCase):
+    def test_free_names(self):
+        tests = [
+            ("fn(n) { n + k }", {"n", "k"}),
+            ("fn() { let a = 1; a + b }", {"b"}),
+            ("fn() { let y = x; let x = 1; x + y }", {"x"}),
+            ("fn(c) { if (c) { let a = 1; a } else { a } }", {"a", "c"}),
+            ("fn() { let a = 1; fn(b) { a + b + c } }", {"b", "c"}),
+            ("fn() { let f = fn() { a }; let a = 1; f }", {"a"}),
+            ("fn(i) { [a, b][i] }", {"a", "b", "i"}),
+        ]
+        for source, free in tests:
+            with self.subTest(source):
+                self.assertEqual(capture.free_names(_literal(source)), free)
+
+
+class TestCapture(unittest.TestCase):
+    def test_modes(self):
+        share = capture.Capture(capture.SHARE)
+        outer = capture.Capture(capture.OUTER)
+        copy = capture.Capture(capture.COPY, ("small",))
+        tests = [
+            ("fn(n) { let big = n * 9; let small = n + 1; fn() { small } }", [copy]),
+            ("fn(x) { fn(y) { x + y } }", [share]),
+            ("fn(a) { fn() { fn() { 1 } } }", [outer, outer]),
+            # Bound again, or for the first time, after the closure is made.
+            ("fn() { let x = 1; let g = fn() { x }; let x = 2; g }", [share]),
+            ("fn() { let f = fn(k) { f(k) }; f }", [share]),
+            # Assigned anywhere, or bound again by a loop.
+            ("fn(n) { let x = 1; let g = fn() { x }; x = 2; g }", [share]),
+            ("fn(n) { let x = 1; let s = fn() { x = 2 }; fn() { x } }", [share, share]),
+            (
+                "fn(n) { let x = 1; while (n) { let g = fn() { x }; let x = 2; } }",
+                [share],
+            ),
+            (
+                "fn(n) { let x = n; while (n) { let g = fn() { x }; } }",
+                [capture.Capture(capture.COPY, ("x",))],
+            ),
+            # Literals and reads inside arrays and indexes count too.
+            ("fn(n) { let big = n; let small = n; [fn() { [small][0] }] }", [copy]),
+            ("fn(n) { let big = n; let small = n; map([1], fn(k) { small }) }", [copy]),
+        ]
+        for source, captures in tests:
+            with self.subTest(source):
+                literal = _literal(source)
+                capture.analyze(ast.ExpressionStatement(literal.token, literal))
+                found = [capture.capture(inner) for inner in _nested(literal)]
+                self.assertEqual(found, captures)
+                self.assertIsNone(capture.capture(literal))
+
+    def test_holds_nodes_weakly(self):
+        literal = _literal("fn(n) { let big = n; let small = n; fn() { small } }")
+        stmt = ast.ExpressionStatement(literal.token, literal)
+        capture.analyze(stmt)
+        (inner,) = _nested(literal)
+        keys = (id(inner), id(stmt))
+        self.assertIn(keys[0], capture._captures)
+        self.assertIn(keys[1], capture._analyzed)
+        del literal, stmt, inner
+        gc.collect()
+        self.assertNotIn(keys[0], capture._captures)
+        self.assertNotIn(keys[1], capture._analyzed)
+
+    def test_keeps_only_what_is_read(self):
+        source = """
+let make = fn(n) { let big = n * 1000; let small = n + 1; fn() { small } };
+make(2)
+"""
+        for name in ENGINES:
+            with self.subTest(name):
+                eng = engine.new_engine(name)
+                fn = eng.run(engine.parse(source))
+                self.assertIsInstance(fn, objmod.Function)
+                env = cast(objmod.Environment, cast(objmod.Function, fn).env)
+                self.assertEqual(env._store, {"small": objmod.Integer(3)})
+                self.assertIs(env.up(1), getattr(eng, "env"))
+
+    def test_results(self):
+        tests = [
+            (
+                "let f = fn(a) { let big = a * 1000;"
+                " fn(b) { let c = a + b; fn(d) { c + d + a } } }; f(1)(2)(3)",
+                "7",
+            ),
+            (
+                "let f = fn(n) { let g = fn(k) {"
+                " if (k == 0) { 0 } else { g(k - 1) + 1 } }; g(n) }; f(5)",
+                "5",
+            ),
+            (
+                "let a = 10; let g = fn(c) { if (c) { let a = 1; a }; fn() { a } };"
+                " g(true)() + g(false)()",
+                "11",
+            ),
+            (
+                "let f = fn() { let x = 1; let g = fn() { x }; let x = 2; g() }; f()",
+                "2",
+            ),
+            (
+                "let f = fn(a) { let h = fn() { fn() { b } }; let k = h();"
+                " let b = a * 2; k() }; f(4)",
+                "8",
+            ),
+            ("let f = fn(a) { fn() { a + g() } }; let g = fn() { 100 }; f(1)()", "101"),
+            (
+                "let y = 3; let f = fn(a) { fn() { y } }; let k = f(1); let y = 4; k()",
+                "4",
+            ),
+            ("let x = 7; let g = fn(x) { fn() { x } }; g()()", "7"),
+            (
+                "let f = fn() { let c = 0; let get = fn() { c };"
+                " let inc = fn() { c = c + 1 }; inc(); inc(); get() }; f()",
+                "2",
+            ),
+            (
+                "let f = fn(n) { let i = 0; let g = 0; while (i < n) {"
+                " let k = i; let h = fn() { k }; if (i == 1) { g = h; } i = i + 1; }"
+                " g() }; f(3)",
+                "2",
+            ),
+            ("let f = fn(a) { let b = a * 2; fn() { [a, b][1] } }; f(3)()", "6"),
+            (
+                "let f = fn(a) { let b = a + 1; map([1, 2], fn(k) { k * b }) }; f(2)",
+                "[3, 6]",
+            ),
+        ]
+        for source, expected in tests:
+            for name in ENGINES:
+                with self.subTest(source=source, engine=name):
+                    self.assertEqual(str(engine.run(source, name)), expected)
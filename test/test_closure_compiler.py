@@ -0,0 +1,107 @@
+import unittest
+from typing import cast
+from monkey import closure_compiler
+from monkey import lexer
+from monkey import obj as objmod
+from monkey import parser
+
+
+class TestClosureCompiler(unittest.TestCase):
+    def _run(self, input: str) -> objmod.Object:
+        psr = parser.Parser(lexer.Lexer(input))
+        program = psr.parse()
+        self.assertEqual(psr.errors, [])
+        return closure_compiler.compile_program(program)(objmod.Environment())
+
+    def assert_integer_object(self, obj: objmod.Object, expected: int):
+        self.assertIsInstance(obj, objmod.Integer)
+        self.assertEqual(cast(objmod.Integer, obj).value, expected)
+
+    def test_expressions(self):
+        tests = [
+            ("(5 + 10 * 2 + 15 / 3) * 2 + -10", 50),
+            ("let a = 5; let b = a; let c = a + b + 5; c;", 15),
+            ("if (1 > 2) { 10 } else { 20 }", 20),
+            ("9; return 10; 9", 10),
+            ("if (10 > 1) { if (10 > 1) { return 10; } return 1; }", 10),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assert_integer_object(self._run(input), expected)
+
+    def test_booleans_and_null(self):
+        tests = [
+            ("1 < 2", objmod.TRUE),
+            ("(1 > 2) == false", objmod.TRUE),
+            ("true != true", objmod.FALSE),
+            ("!!5", objmod.TRUE),
+            ("if (false) { 10 }", objmod.NULL),
+            ("let a = 1;", objmod.NULL),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assertIs(self._run(input), expected)
+
+    def test_functions(self):
+        tests = [
+            ("let add = fn(x, y) { return x + y; }; add(5 + 5, add(5, 5));", 20),
+            ("fn(x) { x; }(5);", 5),
+            ("let newAdder = fn(x) { fn(y) { x + y } }; newAdder(2)(3);", 5),
+            ("let f = fn(x) { if (x > 1) { return 1; } 2 }; f(5) + f(0)", 3),
+            (
+                "let fib = fn(n) { if (n < 2) { return n; } "
+                "fib(n - 1) + fib(n - 2) }; fib(15);",
+                610,
+            ),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assert_integer_object(self._run(input), expected)
+
+    def test_tail_calls(self):
+        # Deeper than the Python stack would allow without the loop in _call.
+        tests = [
+            (
+                "let loop = fn(n) { if (n == 0) { 0 } else { loop(n - 1) } };"
+                "loop(3000)",
+                0,
+            ),
+            (
+                "let sum = fn(n, acc) { if (n == 0) { return acc; }"
+                " return sum(n - 1, acc + n) }; sum(3000, 0)",
+                4501500,
+            ),
+            (
+                "let f = fn(n) { let g = fn() { n }; if (n == 0) { g }"
+                " else { f(n - 1) } }; f(3000)()",
+                0,
+            ),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assert_integer_object(self._run(input), expected)
+
+    def test_function_object(self):
+        evaluated = self._run("fn(x) { x + 2; };")
+        self.assertIsInstance(evaluated, objmod.Function)
+        self.assertEqual(str(cast(objmod.Function, evaluated).body), "(x + 2)")
+
+    def test_errors(self):
+        tests = [
+            ("5 + true; 5;", "type mismatch: INTEGER + BOOLEAN"),
+            ("-true", "unknown operator: -BOOLEAN"),
+            (
+                "if (10 > 1) { return true + false; }",
+                "unknown operator: BOOLEAN + BOOLEAN",
+            ),
+            ("true - 1", "type mismatch: BOOLEAN - INTEGER"),
+            ("foobar", "identifier not found: foobar"),
+            ("let f = fn(x) { x }; f(1)(2)", "not a function: INTEGER"),
+        ]
+        for input, expected_message in tests:
+            with self.subTest(input):
+                evaluated = self._run(input)
+                self.assertIsInstance(evaluated, objmod.Error)
+                self.assertEqual(
+                    cast(objmod.Error, evaluated).message, expected_message
+                )
@@ -0,0 +1,240 @@
+import unittest
+from typing import List
+from monkey import code
+from monkey import compiler
+from monkey import lexer
+from monkey import obj as objmod
+from monkey import parser
+
+
+def concat(*instructions: code.Instructions) -> code.Instructions:
+    result: code.Instructions = []
+    for ins in instructions:
+        result.extend(ins)
+    return result
+
+
+class TestCode(unittest.TestCase):
+    def test_make(self):
+        self.assertEqual(code.make(code.OP_CONSTANT, 65534), [code.OP_CONSTANT, 65534])
+        self.assertEqual(code.make(code.OP_ADD), [code.OP_ADD])
+        self.assertEqual(code.make(code.OP_CLOSURE, 3, 2), [code.OP_CLOSURE, 3, 2])
+
+    def test_instructions_string(self):
+        ins = concat(
+            code.make(code.OP_ADD),
+            code.make(code.OP_GET_LOCAL, 1),
+            code.make(code.OP_CONSTANT, 2),
+            code.make(code.OP_CLOSURE, 65535, 255),
+        )
+        expected = (
+            "0000 OpAdd\n"
+            "0001 OpGetLocal 1\n"
+            "0003 OpConstant 2\n"
+            "0005 OpClosure 65535 255\n"
+        )
+        self.assertEqual(code.instructions_to_str(ins), expected)
+
+
+class TestCompiler(unittest.TestCase):
+    def _compile(self, input: str) -> compiler.Bytecode:
+        psr = parser.Parser(lexer.Lexer(input))
+        program = psr.parse()
+        self.assertEqual(psr.errors, [])
+        comp = compiler.Compiler()
+        comp.compile(program)
+        return comp.bytecode()
+
+    def assert_instructions(
+        self, actual: code.Instructions, expected: List[code.Instructions]
+    ):
+        self.assertEqual(
+            code.instructions_to_str(actual),
+            code.instructions_to_str(concat(*expected)),
+        )
+
+    def test_integer_arithmetic(self):
+        bytecode = self._compile("1 + 2; -3")
+        self.assert_instructions(
+            bytecode.instructions,
+            [
+                code.make(code.OP_CONSTANT, 0),
+                code.make(code.OP_CONSTANT, 1),
+                code.make(code.OP_ADD),
+                code.make(code.OP_POP),
+                code.make(code.OP_CONSTANT, 2),
+                code.make(code.OP_MINUS),
+                code.make(code.OP_POP),
+                code.make(code.OP_RETURN),
+            ],
+        )
+        self.assertEqual(
+            bytecode.constants,
+            [objmod.Integer(1), objmod.Integer(2), objmod.Integer(3)],
+        )
+
+    def test_conditionals(self):
+        bytecode = self._compile("if (true) { 10 }; 3333;")
+        self.assert_instructions(
+            bytecode.instructions,
+            [
+                code.make(code.OP_TRUE),
+                code.make(code.OP_JUMP_NOT_TRUTHY, 7),
+                code.make(code.OP_CONSTANT, 0),
+                code.make(code.OP_JUMP, 8),
+                code.make(code.OP_NULL),
+                code.make(code.OP_POP),
+                code.make(code.OP_CONSTANT, 1),
+                code.make(code.OP_POP),
+                code.make(code.OP_RETURN),
+            ],
+        )
+
+    def test_global_let_statements(self):
+        bytecode = self._compile("let one = 1; let two = one;")
+        self.assert_instructions(
+            bytecode.instructions,
+            [
+                code.make(code.OP_CONSTANT, 0),
+                code.make(code.OP_SET_GLOBAL, 0),
+                code.make(code.OP_GET_GLOBAL, 0),
+                code.make(code.OP_SET_GLOBAL, 1),
+                code.make(code.OP_NULL),
+                code.make(code.OP_POP),
+                code.make(code.OP_RETURN),
+            ],
+        )
+        self.assertEqual(bytecode.global_names, ["one", "two"])
+
+    def test_while_and_assignment(self):
+        bytecode = self._compile("let i = 0; while (i < 3) { i = i + 1; }")
+        self.assert_instructions(
+            bytecode.instructions,
+            [
+                code.make(code.OP_CONSTANT, 0),
+                code.make(code.OP_SET_GLOBAL, 0),
+                code.make(code.OP_GET_GLOBAL, 0),
+                code.make(code.OP_CONSTANT, 1),
+                code.make(code.OP_LESS_THAN),
+                code.make(code.OP_JUMP_NOT_TRUTHY, 20),
+                code.make(code.OP_GET_GLOBAL, 0),
+                code.make(code.OP_CONSTANT, 2),
+                code.make(code.OP_ADD),
+                code.make(code.OP_ASSIGN_GLOBAL, 0),
+                code.make(code.OP_JUMP, 4),
+                code.make(code.OP_NULL),
+                code.make(code.OP_POP),
+                code.make(code.OP_RETURN),
+            ],
+        )
+
+    def test_assign_free(self):
+        # n lives in a cell that the call and the closure share.
+        bytecode = self._compile("fn(n) { fn() { n = 2 }; n }")
+        inner = bytecode.constants[1]
+        outer = bytecode.constants[2]
+        assert isinstance(inner, objmod.CompiledFunction)
+        assert isinstance(outer, objmod.CompiledFunction)
+        self.assert_instructions(
+            inner.instructions,
+            [
+                code.make(code.OP_CONSTANT, 0),
+                code.make(code.OP_SET_FREE, 0),
+                code.make(code.OP_NULL),
+                code.make(code.OP_RETURN_VALUE),
+            ],
+        )
+        self.assert_instructions(
+            outer.instructions,
+            [
+                code.make(code.OP_MAKE_CELL, 0),
+                code.make(code.OP_CAPTURE_LOCAL, 0),
+                code.make(code.OP_CLOSURE, 1, 1),
+                code.make(code.OP_POP),
+                code.make(code.OP_GET_LOCAL_CELL, 0),
+                code.make(code.OP_RETURN_VALUE),
+            ],
+        )
+
+    def test_arrays(self):
+        bytecode = self._compile("len([1, 2][0 + 1])")
+        self.assert_instructions(
+            bytecode.instructions,
+            [
+                code.make(code.OP_GET_GLOBAL, 0),
+                code.make(code.OP_CONSTANT, 0),
+                code.make(code.OP_CONSTANT, 1),
+                code.make(code.OP_ARRAY, 2),
+                code.make(code.OP_CONSTANT, 2),
+                code.make(code.OP_CONSTANT, 3),
+                code.make(code.OP_ADD),
+                code.make(code.OP_INDEX),
+                code.make(code.OP_CALL, 1),
+                code.make(code.OP_POP),
+                code.make(code.OP_RETURN),
+            ],
+        )
+        # Builtins are globals that are never set.
+        self.assertEqual(bytecode.global_names, ["len"])
+
+    def test_forward_global_reference(self):
+        bytecode = self._compile("let f = fn() { g }; let g = 1;")
+        self.assertEqual(bytecode.global_names, ["g", "f"])
+
+    def test_closures(self):
+        bytecode = self._compile("fn(a) { fn(b) { a + b } }")
+        inner = bytecode.constants[0]
+        outer = bytecode.constants[1]
+        assert isinstance(inner, objmod.CompiledFunction)
+        assert isinstance(outer, objmod.CompiledFunction)
+        self.assert_instructions(
+            inner.instructions,
+            [
+                code.make(code.OP_GET_FREE, 0),
+                code.make(code.OP_GET_LOCAL, 0),
+                code.make(code.OP_ADD),
+                code.make(code.OP_RETURN_VALUE),
+            ],
+        )
+        self.assert_instructions(
+            outer.instructions,
+            [
+                code.make(code.OP_CAPTURE_LOCAL, 0),
+                code.make(code.OP_CLOSURE, 0, 1),
+                code.make(code.OP_RETURN_VALUE),
+            ],
+        )
+
+    def test_fallbacks(self):
+        # An unbound local falls back on the binding it shadows, which the
+        # closure captures, and that one on the global.
+        bytecode = self._compile("fn(a) { fn(a, b) { a } }")
+        inner = bytecode.constants[0]
+        outer = bytecode.constants[1]
+        assert isinstance(inner, objmod.CompiledFunction)
+        assert isinstance(outer, objmod.CompiledFunction)
+        self.assertEqual(inner.names, ["a", "b", "a"])
+        self.assertEqual(
+            inner.fallbacks,
+            [
+                (compiler.FREE_SCOPE, 0),
+                (compiler.GLOBAL_SCOPE, 0),
+                (compiler.GLOBAL_SCOPE, 1),
+            ],
+        )
+        self.assertEqual(outer.fallbacks, [(compiler.GLOBAL_SCOPE, 1)])
+        self.assertEqual(bytecode.global_names, ["b", "a"])
+
+    def test_recursive_function_name(self):
+        bytecode = self._compile("let f = fn(x) { f(x) };")
+        fn = bytecode.constants[0]
+        assert isinstance(fn, objmod.CompiledFunction)
+        self.assert_instructions(
+            fn.instructions,
+            [
+                code.make(code.OP_CURRENT_CLOSURE),
+                code.make(code.OP_GET_LOCAL, 0),
+                code.make(code.OP_CALL, 1),
+                code.make(code.OP_RETURN_VALUE),
+            ],
+        )
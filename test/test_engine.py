@@ -0,0 +1,157 @@
+import os
+import tempfile
+import unittest
+from typing import cast
+from monkey import cache
+from monkey import capture
+from monkey import compiler
+from monkey import engine
+from monkey import lexer
+from monkey import obj as objmod
+from monkey import resolver
+
+
+class TestRun(unittest.TestCase):
+    def test_unbound_locals_fall_back(self):
+        # A local that was never bound reads, and assigns, the outer binding.
+        tests = [
+            (
+                "let x = 1; let c = fn(flag) { if (flag) { let x = 5; } x }; c(false)",
+                "1",
+            ),
+            ("let b = 100; let c = fn(a, b) { b }; c(1)", "100"),
+            (
+                "let x = 1; let c = fn(flag) { if (flag) { let x = 5; } x = 7; x };"
+                " [c(false), x, c(true), x]",
+                "[7, 7, 7, 7]",
+            ),
+            (
+                "let f = fn(a) { fn(flag) { if (flag) { let a = 2; } a } };"
+                " f(3)(false)",
+                "3",
+            ),
+        ]
+        for source, expected in tests:
+            for name in engine.ENGINES:
+                with self.subTest(source=source, engine=name):
+                    self.assertEqual(str(engine.run(source, name)), expected)
+
+
+class TestRunFile(unittest.TestCase):
+    def _write(self, source: str) -> str:
+        fd, path = tempfile.mkstemp(suffix=".mk")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(source)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_run_file(self):
+        tests = [
+            ("let a = 5; let b = a * 2\nb + 1", 11),
+            ("let f = fn(x) { x + 1 }; f(1); f(41)", 42),
+            ("1; if (true) { return 7; } 9", 7),
+            ("let x = 3; if (x > 1) { return x; }; 9", 3),
+            ("return 1 + 1; undefined", 2),
+        ]
+        for source, expected in tests:
+            path = self._write(source)
+            for name in engine.ENGINES:
+                with self.subTest(source=source, engine=name):
+                    result = engine.run_file(path, name)
+                    self.assertEqual(cast(objmod.Integer, result).value, expected)
+                    result = engine.run_file(path, name, optimize=False)
+                    self.assertEqual(cast(objmod.Integer, result).value, expected)
+
+    def test_results_are_interned(self):
+        path = self._write("let f = fn(x) { x * 2 }; f(20) + 2")
+        for name in engine.ENGINES:
+            with self.subTest(name):
+                self.assertIs(engine.run_file(path, name), objmod.integer(42))
+
+    def test_run_file_error_stops(self):
+        path = self._write("let a = 1; a + true; let b = 2; b")
+        for name in engine.ENGINES:
+            with self.subTest(name):
+                result = engine.run_file(path, name)
+                self.assertEqual(
+                    cast(objmod.Error, result).message,
+                    "type mismatch: INTEGER + BOOLEAN",
+                )
+
+    def test_empty_file(self):
+        path = self._write("")
+        self.assertIs(engine.run_file(path), objmod.NULL)
+
+    def test_parse_file_is_lazy(self):
+        path = self._write("let a = 1;\nlet b = 2;\nlet = 3;\n")
+        statements = engine.parse_file(path)
+        self.assertEqual(str(next(statements)), "let a = 1;")
+        self.assertEqual(str(next(statements)), "let b = 2;")
+        with self.assertRaises(engine.ParseError):
+            next(statements)
+
+    def test_tokenize_bytes(self):
+        source = "let x1 = 5 @ 10;\f"
+        self.assertEqual(
+            list(lexer.tokenize_bytes(source.encode())), list(lexer.tokenize(source))
+        )
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "script.mk")
+        self._write("let f = fn(x) { if (x > 1) { x * f(x - 1) } else { 1 } }; f(5)")
+
+    def _write(self, source: str) -> None:
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(source)
+
+    def test_program_round_trip(self):
+        program = engine.load_file(self.path)
+        self.assertTrue(os.path.exists(cache.cache_path(self.path, "ast.opt")))
+        self.assertEqual(engine.load_file(self.path), program)
+        self.assertEqual(cache.load_program(cache.dump_program(program)), program)
+
+    def test_bytecode_round_trip(self):
+        bytecode = engine.load_bytecode(self.path)
+        loaded = engine.load_bytecode(self.path)
+        self.assertEqual(loaded.instructions, bytecode.instructions)
+        self.assertEqual(loaded.global_names, bytecode.global_names)
+        self.assertEqual(
+            [
+                str(c) if isinstance(c, objmod.Integer) else c.instructions
+                for c in loaded.constants
+            ],
+            [
+                str(c) if isinstance(c, objmod.Integer) else c.instructions
+                for c in bytecode.constants
+            ],
+        )
+
+    def test_source_change_invalidates(self):
+        engine.load_file(self.path)
+        self._write("let a = 7; a * 6")
+        self.assertEqual(str(engine.load_file(self.path)), "let a = 7;(a * 6)")
+
+    def test_tag_covers_entry_format(self):
+        # The format of entries is defined here, the bytecode by the
+        # compiler and the modules it analyzes programs with.
+        for module in (cache, compiler, capture, resolver):
+            self.assertIn(module, cache._SOURCES)
+
+    def test_corrupt_entry_is_rebuilt(self):
+        program = engine.load_file(self.path, optimize=False)
+        entry = cache.cache_path(self.path, "ast")
+        with open(entry, "r+b") as f:
+            f.seek(40)
+            f.write(b"garbage")
+        self.assertEqual(engine.load_file(self.path, optimize=False), program)
+
+    def test_run_file_with_cache(self):
+        for name in engine.ENGINES:
+            with self.subTest(name):
+                for _ in range(2):
+                    result = engine.run_file(self.path, name, use_cache=True)
+                    self.assertEqual(cast(objmod.Integer, result).value, 120)
@@ -1,3 +1,4 @@
+import gc
 import unittest
 from typing import cast
 from monkey import lexer
@@ -147,7 +148,17 @@ class TestEvaluator(unittest.TestCase):
                 """,
                 "unknown operator: BOOLEAN + BOOLEAN",
             ),
-            ("foobar", "identifier not found: foobar")
+            ("foobar", "identifier not found: foobar"),
+            # Errors stop every call on the way out, however deep.
+            (
+                "let f = fn(n) { if (n == 0) { -true } else { 1 + f(n - 1) } }; f(50)",
+                "unknown operator: -BOOLEAN",
+            ),
+            (
+                "let f = fn(x) { x }; f(1, f(missing)); 5",
+                "identifier not found: missing",
+            ),
+            ("let x = 1 + true; x", "type mismatch: INTEGER + BOOLEAN"),
         ]
         for input, expected_message in tests:
             with self.subTest(input):
@@ -193,3 +204,203 @@ class TestEvaluator(unittest.TestCase):
             with self.subTest(input):
                 evaluated = self._eval(input)
                 self.assert_integer_object(evaluated, expected)
+
+    def test_tail_calls(self):
+        tests = [
+            (
+                "let sum = fn(n, acc) {"
+                " if (n == 0) { acc } else { sum(n - 1, acc + n) } };"
+                "sum(5000, 0);",
+                12502500,
+            ),
+            (
+                "let count = fn(n) { if (n == 0) { return 0; } return count(n - 1); };"
+                "count(5000);",
+                0,
+            ),
+            (
+                "let even = fn(n) { if (n == 0) { return true; } odd(n - 1) };"
+                "let odd = fn(n) { if (n == 0) { return false; } even(n - 1) };"
+                "if (even(5001)) { 1 } else { 2 }",
+                2,
+            ),
+            (
+                "let f = fn(n) { if (n > 0) { f(0) } 7 }; f(1)",
+                7,
+            ),
+            (
+                "let g = fn(x) { x * 2 };"
+                " let f = fn(n) { if (n > 0) { return g(n); } 0 };"
+                "f(4)",
+                8,
+            ),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                evaluated = self._eval(input)
+                self.assert_integer_object(evaluated, expected)
+
+    def test_tail_call_errors(self):
+        tests = [
+            ("let f = fn() { g() }; f()", "identifier not found: g"),
+            ("let f = fn() { return 1(2); }; f()", "not a function: INTEGER"),
+            (
+                "let f = fn(x) { if (x) { x + true } }; f(1)",
+                "type mismatch: INTEGER + BOOLEAN",
+            ),
+        ]
+        for input, expected_message in tests:
+            with self.subTest(input):
+                evaluated = self._eval(input)
+                self.assertIsInstance(evaluated, objmod.Error)
+                self.assertEqual(
+                    cast(objmod.Error, evaluated).message, expected_message
+                )
+
+    def test_environment_pool(self):
+        self.addCleanup(objmod.set_environment_pool, objmod.get_environment_pool())
+        objmod.set_environment_pool(4)
+        tests = [
+            # Calls that make closures keep their environments.
+            (
+                "let mk = fn(x) { fn() { x } }; let id = fn(y) { y };"
+                "let a = mk(1); let b = mk(2); id(3); a() * 10 + b()",
+                12,
+            ),
+            # Environments come back from the pool empty.
+            (
+                "let f = fn(c) { if (c) { let x = 5; } x }; let x = 7;"
+                "f(true) * 10 + f(false)",
+                57,
+            ),
+            (
+                "let c = fn(n) { if (n == 0) { 0 } else { 1 + c(n - 1) } };"
+                "c(10) + c(10)",
+                20,
+            ),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                evaluated = self._eval(input)
+                self.assert_integer_object(evaluated, expected)
+        self.assertEqual(objmod.pooled_environments(), 4)
+
+    def test_closed_environments(self):
+        tests = [
+            # Closures that are returned keep their environment open.
+            ("let mk = fn(x) { let g = fn() { x }; g }; let a = mk(4); a() + a()", 8),
+            (
+                "let f = fn(n) { let g = fn(k) {"
+                " if (k == 0) { 0 } else { g(k - 1) + 1 } }; g(n) }; f(5) + f(6)",
+                11,
+            ),
+            (
+                "let f = fn(n) { let g = fn() { n }; h(g) };"
+                "let h = fn(k) { fn() { k() } }; f(3)() + f(4)()",
+                7,
+            ),
+            # So do closures assigned to outer bindings.
+            (
+                "let keep = 0; let f = fn(n) { let g = fn() { n }; keep = g; 0 };"
+                "f(5); keep()",
+                5,
+            ),
+            (
+                "let f = fn(n) { let keep = 0; let set = fn(m) { let g = fn() { m };"
+                " keep = g; 0 }; set(n); keep }; f(6)()",
+                6,
+            ),
+            # Or kept in arrays either way.
+            (
+                "let f = fn(n) { let g = fn(k) { if (k == 0) { n } else { g(k - 1) } };"
+                " [1, [g]] }; f(7)[1][0](3)",
+                7,
+            ),
+            (
+                "let keep = []; let f = fn(n) { let g = fn(k) {"
+                " if (k == 0) { n } else { g(k - 1) } }; keep = [g]; 0 };"
+                " f(8); keep[0](2)",
+                8,
+            ),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assert_integer_object(self._eval(input), expected)
+
+        # A local recursive function is freed with its call, collector or not.
+        program = parser.Parser(
+            lexer.Lexer(
+                "let f = fn(n) { let g = fn(k) { if (k == 0) { 0 } else { g(k - 1) } };"
+                " g(n) }; f(2)"
+            )
+        ).parse()
+        env = objmod.Environment()
+        evaluator.eval(program, env)
+        gc.collect()
+        gc.disable()
+        self.addCleanup(gc.enable)
+        before = sum(type(o) is objmod.Environment for o in gc.get_objects())
+        for _ in range(50):
+            evaluator.eval(program, env)
+        after = sum(type(o) is objmod.Environment for o in gc.get_objects())
+        self.assertLessEqual(after, before)
+
+    def test_inline_caches(self):
+        tests = [
+            # A let in only some calls shadows a name for their closures.
+            (
+                "let g = fn(c) { if (c) { let x = 2; } fn() { x } };"
+                "let a = g(true); let x = 1; let b = g(false); b() * 10 + a()",
+                12,
+            ),
+            # So does a parameter left unbound by a short call.
+            (
+                "let g = fn(x) { fn() { x } }; let x = 1;"
+                "let b = g(); let a = g(2); b() * 10 + a()",
+                12,
+            ),
+            (
+                "let x = 1; let g = fn() { let f = fn() { x }; let a = f(); let x = 10;"
+                " a + f() }; g() + g()",
+                22,
+            ),
+            (
+                "let f = fn() { 1 }; let g = fn() { f() }; let a = g();"
+                "let f = fn() { 2 }; a * 10 + g()",
+                12,
+            ),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                evaluated = self._eval(input)
+                self.assert_integer_object(evaluated, expected)
+
+    def test_literals_are_boxed_once(self):
+        # Interned or not, a literal evaluates to the same Integer each time.
+        for input in ("7", "7000"):
+            with self.subTest(input):
+                self.assertIs(self._eval(input), self._eval(input))
+        self.assertIs(self._eval("7"), objmod.integer(7))
+
+    def test_inline_caches_skip_lookups(self):
+        finds = []
+        find = objmod.Environment.find
+
+        def counting_find(env, name):
+            finds.append(name)
+            return find(env, name)
+
+        objmod.Environment.find = counting_find  # type: ignore[method-assign]
+        self.addCleanup(setattr, objmod.Environment, "find", find)
+        evaluated = self._eval(
+            "let add = fn(a, b) { a + b };"
+            "let count = fn(n, acc) {"
+            " if (n == 0) { acc } else { count(n - 1, add(acc, 1)) } };"
+            "count(100, 0);"
+        )
+        self.assert_integer_object(evaluated, 100)
+        # Each identifier and call site is looked up once.
+        self.assertEqual(len(finds), 9)
+        # The caches are dropped with the run, nodes and all.
+        self.assertEqual(evaluator._identifiers, {})
+        self.assertEqual(evaluator._call_sites, {})
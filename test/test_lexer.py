@@ -118,3 +118,88 @@ class TestTokenizer(unittest.TestCase):
                 tok = lex.next_token()
                 self.assertEqual(tok.type, expected_type)
                 self.assertEqual(tok.literal, expected_literal)
+
+    def test_tokenize(self):
+        input = "let x1 = 5 @ 10;\f"
+        expected = [
+            (token.LET, "let"),
+            (token.IDENT, "x"),
+            (token.INT, "1"),
+            (token.ASSIGN, "="),
+            (token.INT, "5"),
+            (token.ILLEGAL, "@"),
+            (token.INT, "10"),
+            (token.SEMICOLON, ";"),
+            (token.ILLEGAL, "\f"),
+            (token.EOF, None),
+        ]
+        tokens = [(tok.type, tok.literal) for tok in lexer.tokenize(input)]
+        self.assertEqual(tokens, expected)
+
+    def test_next_token_after_eof(self):
+        lex = lexer.Lexer("  x  ")
+        self.assertEqual(lex.next_token(), token.Token(token.IDENT, "x"))
+        self.assertEqual(lex.next_token().type, token.EOF)
+        self.assertEqual(lex.next_token().type, token.EOF)
+
+    def test_scan(self):
+        input = "let x1 = 5 @ 10;\f"
+        buf = lexer.scan(input)
+        expected = [tok for tok in lexer.tokenize(input)]
+        self.assertEqual(list(buf), expected)
+        self.assertEqual(len(buf), len(expected))
+        self.assertEqual(buf.type(0), token.LET)
+        self.assertEqual(buf.kinds[0], token.KINDS[token.LET])
+        self.assertEqual((buf.starts[1], buf.ends[1]), (4, 5))
+        self.assertEqual(buf.literal(2), "1")
+        self.assertEqual(buf[6], token.Token(token.INT, "10"))
+        self.assertIsNone(buf.literal(len(buf) - 1))
+        self.assertEqual(buf.starts[len(buf) - 1], len(input))
+
+    def test_scan_positions(self):
+        buf = lexer.scan("let a = 1;\n  a +\n\nb")
+        self.assertEqual(buf.position(0), (1, 1))
+        self.assertEqual(buf.position(5), (2, 3))
+        self.assertEqual(buf.position(6), (2, 5))
+        self.assertEqual(buf.position(7), (4, 1))
+        self.assertEqual(buf.position(8), (4, 2))
+
+    def test_function_lines(self):
+        source = "fn(x) {\n  fn(y) { x }\n};\n\nlet f = fn() { 1 };"
+        streams = [
+            lexer.tokenize(source),
+            lexer.tokenize_bytes(source.encode()),
+            iter(lexer.scan(source)),
+        ]
+        for tokens in streams:
+            lines = [t.line for t in tokens if t.type == token.FUNCTION]
+            self.assertEqual(lines, [1, 2, 5])
+        buf = lexer.scan(source)
+        self.assertEqual(buf[0].line, 1)
+        self.assertEqual(buf[0], token.Token(token.FUNCTION, "fn"))
+
+    def test_while(self):
+        source = "while (i < 3) { i = i + 1 }"
+        tokens = [(tok.type, tok.literal) for tok in lexer.tokenize(source)]
+        self.assertEqual(tokens[:2], [(token.WHILE, "while"), (token.LPAREN, "(")])
+        self.assertEqual(tokens[8], (token.ASSIGN, "="))
+        self.assertEqual(list(lexer.scan(source)), list(lexer.tokenize(source)))
+
+    def test_brackets(self):
+        source = "[1, 2][0]"
+        tokens = [(tok.type, tok.literal) for tok in lexer.tokenize(source)]
+        self.assertEqual(
+            tokens,
+            [
+                (token.LBRACKET, "["),
+                (token.INT, "1"),
+                (token.COMMA, ","),
+                (token.INT, "2"),
+                (token.RBRACKET, "]"),
+                (token.LBRACKET, "["),
+                (token.INT, "0"),
+                (token.RBRACKET, "]"),
+                (token.EOF, None),
+            ],
+        )
+        self.assertEqual(list(lexer.scan(source)), list(lexer.tokenize(source)))
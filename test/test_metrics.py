@@ -0,0 +1,110 @@
+import io
+import unittest
+from monkey import engine
+from monkey import evaluator
+from monkey import metrics
+from monkey import obj as objmod
+from monkey import repl
+
+SOURCE = "let f = fn(x) { x + 1 }; f(f(2)) * 3"
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counters(self):
+        self.addCleanup(objmod.set_environment_pool, objmod.get_environment_pool())
+        objmod.set_environment_pool(objmod.DEFAULT_ENVIRONMENT_POOL)
+        m = metrics.Metrics()
+        result = engine.run(SOURCE, "eval", optimize=False, metrics=m)
+        self.assertEqual(str(result), "12")
+        self.assertIs(evaluator._eval, evaluator._plain_eval)
+
+        stats = m.as_dict()
+        self.assertEqual(stats["runs"], 1)
+        self.assertEqual(stats["tokens"], 22)
+        # Program, let, name, literal, parameter, body, statement, infix
+        # and its two operands; then a statement, the product, two calls
+        # with their callees, the argument 2 and the factor 3.
+        self.assertEqual(stats["nodes_built"], 18)
+        self.assertEqual(stats["function_calls"], 2)
+        # The outer call reuses the environment of the inner one.
+        self.assertEqual(stats["environments"], 1)
+        # Literals are boxed once and every result is interned.
+        self.assertEqual(stats["integers"], 0)
+        self.assertEqual(stats["nodes_evaluated"]["CallExpression"], 2)
+        self.assertEqual(stats["nodes_evaluated"]["IntegerLiteral"], 4)
+        self.assertEqual(set(stats["seconds"]), set(metrics.PHASES))
+
+    def test_inline_paths(self):
+        # Function bodies, if statements in them, tail calls and assignments
+        # in loops are evaluated without going through _eval.
+        m = metrics.Metrics()
+        source = (
+            "let f = fn(n) { if (n == 0) { return 0; } f(n - 1) };"
+            " let i = 0; while (i < 2) { i = i + 1; } f(2)"
+        )
+        engine.run(source, "eval", optimize=False, metrics=m)
+        counted = m.nodes_evaluated
+        self.assertEqual(counted["BlockStatement"], 4)
+        self.assertEqual(counted["IfExpression"], 3)
+        self.assertEqual(counted["ReturnStatement"], 1)
+        self.assertEqual(counted["CallExpression"], 3)
+        self.assertEqual(counted["AssignStatement"], 2)
+        # Three callees, five reads of n and five of i.
+        self.assertEqual(counted["Identifier"], 13)
+
+    def test_cycles(self):
+        tests = [
+            # Every global function keeps the global environment.
+            (SOURCE, 1),
+            ("let f = fn(n) { if (n == 0) { 0 } else { f(n - 1) } }; f(3)", 1),
+            # One per call for the local function g, none for h, which keeps
+            # only the global environment.
+            (
+                "let f = fn(n) { let g = fn(k) { if (k == 0) { 0 } else { g(k - 1) } };"
+                " let h = fn() { 1 }; g(n) + h() }; f(2) + f(2)",
+                3,
+            ),
+        ]
+        for source, cycles in tests:
+            with self.subTest(source):
+                m = metrics.Metrics()
+                engine.run(source, "eval", optimize=False, metrics=m)
+                self.assertEqual(m.cycles, cycles)
+
+    def test_accumulates_over_engines(self):
+        m = metrics.Metrics()
+        for name in engine.ENGINES:
+            with self.subTest(name):
+                result = engine.run(SOURCE, name, metrics=m)
+                self.assertEqual(str(result), "12")
+        self.assertEqual(m.runs, len(engine.ENGINES))
+        # Only the eval and slots engines use the evaluator.
+        self.assertEqual(m.function_calls, 4)
+
+    def test_parse_error(self):
+        m = metrics.Metrics()
+        with self.assertRaises(engine.ParseError):
+            engine.run("let = 1;", metrics=m)
+        self.assertEqual(m.runs, 0)
+
+    def test_prometheus(self):
+        m = metrics.Metrics()
+        engine.run(SOURCE, "eval", metrics=m)
+        text = m.prometheus()
+        self.assertIn("# TYPE monkey_function_calls_total counter\n", text)
+        self.assertIn('monkey_nodes_evaluated_total{node="CallExpression"} 2\n', text)
+        self.assertIn("monkey_tokens_total 22\n", text)
+        for line in text.splitlines():
+            if not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                self.assertTrue(name.startswith("monkey_"), name)
+                float(value)
+
+    def test_repl(self):
+        m = metrics.Metrics()
+        output = io.StringIO()
+        repl.start(io.StringIO("let a = 2000;\na * 3000\nlet;\n"), output, metrics=m)
+        self.assertIn("6000000\n", output.getvalue())
+        self.assertEqual(m.runs, 2)
+        # Only the product is too large to be interned.
+        self.assertEqual(m.integers, 1)
@@ -0,0 +1,132 @@
+import unittest
+from monkey import ast
+from monkey import obj as objmod
+from monkey import token
+
+
+class TestObjects(unittest.TestCase):
+    def test_tags_and_types(self):
+        body = ast.BlockStatement(token.Token(token.LBRACE, "{"), [])
+        env = objmod.Environment()
+        compiled = objmod.CompiledFunction([])
+        tests = [
+            (objmod.Integer(1), objmod.INTEGER_TAG, objmod.INTEGER_OBJ),
+            (objmod.TRUE, objmod.BOOLEAN_TAG, objmod.BOOLEAN_OBJ),
+            (objmod.NULL, objmod.NULL_TAG, objmod.NULL_OBJ),
+            (objmod.ReturnValue(objmod.NULL), objmod.RETURN_VALUE_TAG, "RETURN_VALUE"),
+            (objmod.Error("oops"), objmod.ERROR_TAG, objmod.ERROR_OBJ),
+            (objmod.Function([], body, env), objmod.FUNCTION_TAG, objmod.FUNCTION_OBJ),
+            (
+                objmod.SlotFunction([], body, objmod.Frame(0), 0),
+                objmod.FUNCTION_TAG,
+                objmod.FUNCTION_OBJ,
+            ),
+            (compiled, objmod.COMPILED_FUNCTION_TAG, objmod.COMPILED_FUNCTION_OBJ),
+            (objmod.Closure(compiled, []), objmod.CLOSURE_TAG, objmod.FUNCTION_OBJ),
+            (objmod.array_of([]), objmod.ARRAY_TAG, objmod.ARRAY_OBJ),
+            (
+                objmod.Builtin("f", lambda args, apply: objmod.NULL),
+                objmod.BUILTIN_TAG,
+                objmod.BUILTIN_OBJ,
+            ),
+        ]
+        for obj, tag, type_name in tests:
+            with self.subTest(type(obj).__name__):
+                self.assertEqual(obj.tag, tag)
+                self.assertEqual(obj.type(), type_name)
+                self.assertFalse(hasattr(obj, "__dict__"))
+
+    def test_value_equality(self):
+        self.assertEqual(objmod.Integer(7), objmod.Integer(7))
+        self.assertNotEqual(objmod.Integer(7), objmod.Integer(8))
+        self.assertEqual(len({objmod.Integer(7), objmod.Integer(7)}), 1)
+        self.assertEqual(objmod.Error("a"), objmod.Error("a"))
+        self.assertNotEqual(objmod.Integer(1), objmod.TRUE)
+
+
+class TestArrays(unittest.TestCase):
+    def test_packed(self):
+        arr = objmod.array_of([objmod.integer(1), objmod.Integer(2**40)])
+        self.assertTrue(arr.packed)
+        self.assertEqual(list(arr.elements), [1, 2**40])
+        self.assertIs(arr.at(0), objmod.integer(1))
+        self.assertEqual(arr.at(1), objmod.Integer(2**40))
+        self.assertIs(arr.at(2), objmod.NULL)
+        self.assertIs(arr.at(-1), objmod.NULL)
+        self.assertEqual(str(arr), f"[1, {2**40}]")
+        self.assertTrue(objmod.array_of([]).packed)
+
+    def test_unpacked(self):
+        tests = [
+            [objmod.integer(1), objmod.TRUE],
+            [objmod.Integer(2**63)],
+            [objmod.array_of([objmod.integer(1)])],
+        ]
+        for elements in tests:
+            with self.subTest(str(objmod.Array(elements))):
+                arr = objmod.array_of(elements)
+                self.assertFalse(arr.packed)
+                self.assertEqual(arr.objects(), elements)
+
+    def test_holds_function(self):
+        body = ast.BlockStatement(token.Token(token.LBRACE, "{"), [])
+        fn = objmod.Function([], body, objmod.Environment())
+        one = objmod.integer(1)
+        self.assertTrue(objmod.holds_function(fn))
+        self.assertTrue(objmod.holds_function(objmod.array_of([one, fn])))
+        nested = objmod.array_of([objmod.array_of([fn])])
+        self.assertTrue(objmod.holds_function(nested))
+        self.assertFalse(objmod.holds_function(objmod.array_of([one, objmod.TRUE])))
+        self.assertFalse(objmod.holds_function(objmod.array_of([one])))
+        self.assertFalse(objmod.holds_function(one))
+
+
+class TestSmallIntegers(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(objmod.set_small_integers, *objmod.get_small_integers())
+
+    def test_interned(self):
+        objmod.set_small_integers(-5, 100)
+        self.assertEqual(objmod.get_small_integers(), (-5, 100))
+        for value in (-5, 0, 7, 100):
+            with self.subTest(value):
+                self.assertIs(objmod.integer(value), objmod.integer(value))
+                self.assertEqual(objmod.integer(value).value, value)
+        for value in (-6, 101):
+            with self.subTest(value):
+                self.assertIsNot(objmod.integer(value), objmod.integer(value))
+                self.assertEqual(objmod.integer(value), objmod.Integer(value))
+
+    def test_disabled(self):
+        objmod.set_small_integers(0, -1)
+        self.assertIsNot(objmod.integer(0), objmod.integer(0))
+
+
+class TestEnvironmentPool(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(objmod.set_environment_pool, objmod.get_environment_pool())
+        objmod.set_environment_pool(1)
+
+    def test_reuse(self):
+        outer = objmod.Environment()
+        env = objmod.acquire_environment(outer)
+        env.set("x", objmod.TRUE)
+        objmod.release_environment(env)
+        self.assertEqual(objmod.pooled_environments(), 1)
+
+        other = objmod.Environment()
+        again = objmod.acquire_environment(other)
+        self.assertIs(again, env)
+        self.assertIs(again.up(1), other)
+        self.assertEqual(again.find("x"), (-1, None))
+        self.assertIsNot(objmod.acquire_environment(outer), env)
+
+    def test_bounded(self):
+        outer = objmod.Environment()
+        for _ in range(3):
+            objmod.release_environment(outer.new_enclosed_environment())
+        self.assertEqual(objmod.pooled_environments(), 1)
+        objmod.set_environment_pool(0)
+        self.assertEqual(objmod.pooled_environments(), 0)
+        objmod.release_environment(outer.new_enclosed_environment())
+        self.assertEqual(objmod.pooled_environments(), 0)
@@ -0,0 +1,81 @@
+import unittest
+from monkey import evaluator
+from monkey import lexer
+from monkey import obj as objmod
+from monkey import optimizer
+from monkey import parser
+
+
+class TestOptimizer(unittest.TestCase):
+    def _optimize(self, input: str) -> str:
+        psr = parser.Parser(lexer.Lexer(input))
+        program = psr.parse()
+        self.assertEqual(psr.errors, [])
+        return str(optimizer.optimize(program))
+
+    def test_constant_folding(self):
+        tests = [
+            ("1 + 2 * 3", "7"),
+            ("-(5 - 10)", "5"),
+            ("(1 < 2) == true", "true"),
+            ("!true", "false"),
+            ("!5", "false"),
+            ("x + 2 * 3", "(x + 6)"),
+            ("10 / 0", "(10 / 0)"),
+            ("true + 1", "(true + 1)"),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assertEqual(self._optimize(input), expected)
+
+    def test_algebraic_simplification(self):
+        tests = [
+            ("(a * b) + 0", "(a * b)"),
+            ("1 * (a - b)", "(a - b)"),
+            ("-a / 1", "(-a)"),
+            ("a + 0", "(a + 0)"),
+            ("a * 0", "(a * 0)"),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assertEqual(self._optimize(input), expected)
+
+    def test_dead_branches(self):
+        tests = [
+            ("if (true) { a } else { b }", "a"),
+            ("if (1 > 2) { a } else { let c = 1; c }", "let c = 1;c"),
+            ("let x = if (1 < 2) { a } else { b };", "let x = a;"),
+            ("if (false) { a }", "Null"),
+            ("if (false) { a }; b", "b"),
+            ("fn() { if (true) { return 1; } 2 }", "fn () return 1;\n"),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assertEqual(self._optimize(input), expected)
+
+    def test_unreachable_statements(self):
+        tests = [
+            ("fn() { return 1; 2; 3 }", "fn () return 1;\n"),
+            ("return 1; let a = 2;", "return 1;\n"),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assertEqual(self._optimize(input), expected)
+
+    def test_semantics_preserved(self):
+        tests = [
+            "if (false) { 10 }",
+            "let f = fn(x) { if (true) { let y = x * 1; } y + 0 }; f(4)",
+            "if (10 > 1) { if (true) { return 10; } return 1; }",
+            "5 + true; 5;",
+            "let a = if (true) { 1 + 2 } else { 3 }; a * (2 + 0)",
+        ]
+        for input in tests:
+            with self.subTest(input):
+                program = parser.Parser(lexer.Lexer(input)).parse()
+                expected = evaluator.eval(program, objmod.Environment())
+                actual = evaluator.eval(
+                    optimizer.optimize(program), objmod.Environment()
+                )
+                self.assertEqual(type(actual), type(expected))
+                self.assertEqual(str(actual), str(expected))
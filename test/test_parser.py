@@ -171,7 +171,11 @@ class TestParser(unittest.TestCase):
             ("add(a, b, 1, 2 * 3, 4 + 5, add(6, 7 * 8))",
              "add(a, b, 1, (2 * 3), (4 + 5), add(6, (7 * 8)))"),
             ("add(a + b + c * d / f + g)",
-             "add((((a + b) + ((c * d) / f)) + g))")
+             "add((((a + b) + ((c * d) / f)) + g))"),
+            ("a * [1, 2, 3, 4][b * c] * d",
+             "((a * ([1, 2, 3, 4][(b * c)])) * d)"),
+            ("add(a * b[2], b[1], 2 * [1, 2][1])",
+             "add((a * (b[2])), (b[1]), (2 * ([1, 2][1])))"),
         ]
         for input, expected in tests:
             with self.subTest(input):
@@ -182,6 +186,10 @@ class TestParser(unittest.TestCase):
 
                 self.assertEqual(str(program), expected)
 
+                psr = parser.Parser(lexer.scan(input))
+                self.assertEqual(str(psr.parse()), expected)
+                self.check_parser_errors(psr)
+
     def _test_integer_lileral(self, exp: ast.Expression, value: int):
         self.assertIsInstance(exp, ast.IntegerLiteral)
         ident = cast(ast.IntegerLiteral, exp)
@@ -272,6 +280,39 @@ class TestParser(unittest.TestCase):
                         ifexp.alternative.statements[0])
                     self.assert_identifier(alt.expression, alternative)
 
+    def test_while_statement(self):
+        psr = parser.Parser(lexer.Lexer("while (x < y) { x = x + 1; y }"))
+        program = psr.parse()
+        self.check_parser_errors(psr)
+
+        self.assertEqual(len(program.statements), 1)
+        stmt = program.statements[0]
+        self.assertIsInstance(stmt, ast.WhileStatement)
+        loop = cast(ast.WhileStatement, stmt)
+        self.assert_infix_expression(loop.condition, "x", "<", "y")
+        self.assertEqual(len(loop.body.statements), 2)
+        self.assertIsInstance(loop.body.statements[0], ast.AssignStatement)
+        self.assertEqual(str(loop), "while (x < y) x = (x + 1);y")
+
+    def test_assign_statements(self):
+        tests = [
+            ("x = 5;", "x", 5),
+            ("y = true", "y", True),
+            ("foobar = y;", "foobar", "y"),
+        ]
+        for input, expected_ident, expected_value in tests:
+            with self.subTest(input):
+                psr = parser.Parser(lexer.Lexer(input))
+                program = psr.parse()
+                self.check_parser_errors(psr)
+
+                self.assertEqual(len(program.statements), 1)
+                stmt = program.statements[0]
+                self.assertIsInstance(stmt, ast.AssignStatement)
+                assign = cast(ast.AssignStatement, stmt)
+                self.assert_identifier(assign.name, expected_ident)
+                self.assert_literal_expression(assign.value, expected_value)
+
     def test_function_literal_parsing(self):
         input = "fn(x, y) { x + y; }"
 
@@ -343,3 +384,32 @@ class TestParser(unittest.TestCase):
         self.assert_literal_expression(call.arguments[0], 1)
         self.assert_infix_expression(call.arguments[1], 2, "*", 3)
         self.assert_infix_expression(call.arguments[2], 4, "+", 5)
+
+    def test_array_literal(self):
+        psr = parser.Parser(lexer.Lexer("[1, 2 * 2, 3 + 3]"))
+        program = psr.parse()
+        self.check_parser_errors(psr)
+
+        stmt = cast(ast.ExpressionStatement, program.statements[0])
+        self.assertIsInstance(stmt.expression, ast.ArrayLiteral)
+        array = cast(ast.ArrayLiteral, stmt.expression)
+        self.assertEqual(len(array.elements), 3)
+        self.assert_literal_expression(array.elements[0], 1)
+        self.assert_infix_expression(array.elements[1], 2, "*", 2)
+        self.assert_infix_expression(array.elements[2], 3, "+", 3)
+
+        psr = parser.Parser(lexer.Lexer("[]"))
+        stmt = cast(ast.ExpressionStatement, psr.parse().statements[0])
+        self.check_parser_errors(psr)
+        self.assertEqual(cast(ast.ArrayLiteral, stmt.expression).elements, [])
+
+    def test_index_expression(self):
+        psr = parser.Parser(lexer.Lexer("myArray[1 + 1]"))
+        program = psr.parse()
+        self.check_parser_errors(psr)
+
+        stmt = cast(ast.ExpressionStatement, program.statements[0])
+        self.assertIsInstance(stmt.expression, ast.IndexExpression)
+        index = cast(ast.IndexExpression, stmt.expression)
+        self.assert_identifier(index.left, "myArray")
+        self.assert_infix_expression(index.index, 1, "+", 1)
@@ -0,0 +1,134 @@
+import itertools
+import signal
+import unittest
+from typing import Dict
+from monkey import engine
+from monkey import evaluator
+from monkey import profiler
+from monkey import purity
+
+SOURCE = """let add = fn(a, b) { a + b };
+let twice = fn(x) {
+  add(x, x) + add(x, 1)
+};
+let count = fn(n) { if (n == 0) { 0 } else { count(n - 1) } };
+twice(3) + count(2) + fn(x) { x }(1)
+"""
+
+
+class TestProfiler(unittest.TestCase):
+    def _profile(self, engine_name: str) -> profiler.Profiler:
+        # Every clock reading advances one second, so times count readings.
+        clock = itertools.count()
+        prof = profiler.Profiler(lambda: float(next(clock)))
+        with prof:
+            result = engine.run(SOURCE, engine_name)
+        self.assertEqual(str(result), "11")
+        return prof
+
+    def test_calls_and_names(self):
+        for name in ("eval", "slots"):
+            with self.subTest(name):
+                prof = self._profile(name)
+                self.assertIsNone(evaluator.get_profiler())
+                calls: Dict[str, int] = {p.label: p.calls for p in prof.functions()}
+                self.assertEqual(
+                    calls, {"add:1": 2, "twice:2": 1, "count:5": 3, "<fn>:6": 1}
+                )
+
+    def test_times(self):
+        prof = self._profile("eval")
+        by_label = {p.label: p for p in prof.functions()}
+        # twice reads the clock at entry and exit and sees two calls of add,
+        # each of which takes one tick.
+        self.assertEqual(by_label["add:1"].inclusive, 2.0)
+        self.assertEqual(by_label["twice:2"].inclusive, 5.0)
+        self.assertEqual(by_label["twice:2"].exclusive, 3.0)
+        # count recurses in tail position, so each call replaces the last.
+        self.assertEqual(by_label["count:5"].inclusive, 3.0)
+        self.assertEqual(prof.functions()[0].label, "twice:2")
+
+    def test_collapsed(self):
+        prof = self._profile("eval")
+        lines = prof.collapsed().splitlines()
+        self.assertEqual(
+            lines,
+            [
+                "twice:2 3000000",
+                "twice:2;add:1 2000000",
+                "count:5 3000000",
+                "<fn>:6 1000000",
+            ],
+        )
+
+    def test_table(self):
+        table = self._profile("eval").table().splitlines()
+        self.assertIn("function", table[0])
+        self.assertTrue(table[1].endswith("twice(x) line 2"))
+        self.assertEqual(len(table), 5)
+
+    def test_recursion_counted_once(self):
+        clock = itertools.count()
+        prof = profiler.Profiler(lambda: float(next(clock)))
+        with prof:
+            engine.run(
+                "let f = fn(n) { if (n == 0) { 0 } else { 1 + f(n - 1) } }; f(2)",
+                "eval",
+            )
+        (f,) = prof.functions()
+        self.assertEqual(f.calls, 3)
+        self.assertEqual(f.inclusive, 5.0)
+        self.assertEqual(f.exclusive, 5.0)
+
+    def test_memo_bypassed(self):
+        self.addCleanup(evaluator.set_memo, evaluator.get_memo())
+        evaluator.set_memo(purity.Memo())
+        prof = profiler.Profiler()
+        with prof:
+            result = engine.run(
+                "let fib = fn(n) { if (n < 2) { n } else {"
+                " fib(n - 1) + fib(n - 2) } }; fib(10)",
+                "eval",
+            )
+        self.assertEqual(str(result), "55")
+        (fib,) = prof.functions()
+        self.assertEqual(fib.calls, 177)
+
+    def test_one_profiler_at_a_time(self):
+        with profiler.Profiler():
+            with self.assertRaises(RuntimeError):
+                profiler.Profiler().enable()
+        self.assertIsNone(evaluator.get_profiler())
+
+
+@unittest.skipUnless(hasattr(signal, "setitimer"), "needs signal.setitimer")
+class TestSampler(unittest.TestCase):
+    SOURCE = """
+let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+let run = fn() { fib(17) + 0 };
+run();
+"""
+
+    def test_samples(self):
+        # Memoization would make fib(17) all but free.
+        self.addCleanup(evaluator.set_memo, evaluator.get_memo())
+        evaluator.set_memo(None)
+        handler = signal.getsignal(signal.SIGPROF)
+        program = engine.parse(self.SOURCE)
+        with profiler.Sampler(interval=0.0005) as sampler:
+            while sampler.total < 20:
+                engine.new_engine("eval").run(program)
+        self.assertIsNone(evaluator.get_profiler())
+        self.assertIs(signal.getsignal(signal.SIGPROF), handler)
+
+        by_label = {p.label: p for p in sampler.functions()}
+        self.assertEqual(set(by_label) - {"run:3"}, {"fib:2"})
+        fib = by_label["fib:2"]
+        self.assertEqual(sampler.functions()[0], fib)
+        self.assertEqual(fib.samples, fib.self_samples)
+        self.assertLessEqual(fib.samples, sampler.total)
+        for line in sampler.collapsed().splitlines():
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(stack.startswith("run:3;fib:2"), stack)
+            self.assertGreater(int(count), 0)
+        self.assertIn("fib(n) line 2", sampler.table())
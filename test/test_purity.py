@@ -0,0 +1,161 @@
+import gc
+import unittest
+from typing import cast
+from monkey import ast
+from monkey import engine
+from monkey import evaluator
+from monkey import obj as objmod
+from monkey import purity
+
+
+def _literal(source: str) -> ast.FunctionLiteral:
+    stmt = cast(ast.ExpressionStatement, engine.parse(source).statements[0])
+    return cast(ast.FunctionLiteral, stmt.expression)
+
+
+class TestSummary(unittest.TestCase):
+    def test_summarize(self):
+        tests = [
+            ("fn(n) { n + 1 }", True, set(), []),
+            ("fn(n) { fib(n - 1) + k }", True, {"fib", "k"}, ["fib"]),
+            ("fn(n) { let m = n * 2; g(m) }", True, {"g"}, ["g"]),
+            ("fn(n) { let y = x; let x = n; x + y }", True, {"x"}, []),
+            ("fn(n) { if (n) { let a = 1; a } else { a } }", True, {"a"}, []),
+            ("fn(f, x) { f(x) }", False, set(), []),
+            ("fn(x) { fn(y) { x + y } }", False, set(), []),
+            ("fn(x) { adder(x)(1) }", False, {"adder"}, ["adder"]),
+            (
+                "fn(n) { let i = 0; while (i < n) { i = i + g(i) }; i }",
+                True,
+                {"g"},
+                ["g"],
+            ),
+            ("fn(n) { total = total + n }", False, {"total"}, []),
+            ("fn(i) { g([xs[i], i]) }", True, {"g", "xs"}, ["g"]),
+        ]
+        for source, pure, free, callees in tests:
+            with self.subTest(source):
+                literal = _literal(source)
+                summary = purity.summarize(literal.parameters, literal.body)
+                self.assertEqual(summary.pure, pure)
+                self.assertEqual(summary.free, free)
+                self.assertEqual([c.value for c in summary.callees], callees)
+
+
+class TestMemo(unittest.TestCase):
+    def setUp(self):
+        self.memo = purity.Memo(maxsize=64)
+        self.addCleanup(evaluator.set_memo, evaluator.get_memo())
+        evaluator.set_memo(self.memo)
+
+    def _run(self, source: str, name: str = "eval") -> str:
+        return str(engine.run(source, name))
+
+    def test_fib_is_linear(self):
+        source = """
+let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+fib(80)
+"""
+        for name in ("eval", "slots"):
+            with self.subTest(name):
+                self.memo.invalidate()
+                self.memo.misses = 0
+                self.assertEqual(self._run(source, name), "23416728348467685")
+                self.assertEqual(self.memo.misses, 81)
+
+    def test_rebinding_invalidates(self):
+        tests = [
+            (
+                "let k = 1; let f = fn(x) { g(x) + k }; let g = fn(x) { x };"
+                " f(1); let k = 5; f(1)",
+                "6",
+            ),
+            (
+                "let k = 1; let g = fn(x) { x + k }; let f = fn(x) { g(x) };"
+                " f(1); let k = 5; f(1)",
+                "6",
+            ),
+            (
+                "let g = fn(x) { x }; let f = fn(x) { g(x) }; f(1);"
+                " let g = fn(x) { x * 10 }; f(1)",
+                "10",
+            ),
+            (
+                "let k = 1; let f = fn(x) { g(x) + k }; let g = fn(x) { x };"
+                " f(1); k = 5; f(1)",
+                "6",
+            ),
+        ]
+        for source, expected in tests:
+            for name in ("eval", "slots"):
+                with self.subTest(source=source, engine=name):
+                    self.assertEqual(self._run(source, name), expected)
+
+    def test_shadowing_local(self):
+        source = """
+let x = 1;
+let g = fn() {
+  let f = fn(n) { id(n) + x };
+  let a = f(0);
+  let x = 10;
+  a + f(0)
+};
+let id = fn(n) { n };
+g()
+"""
+        # Only the dynamic evaluator: resolved code sees the local x as
+        # unset instead of the global one before its let has run.
+        self.assertEqual(self._run(source), "11")
+
+    def test_not_cached(self):
+        tests = [
+            # New functions keep their identity.
+            (
+                "let id = fn(x) { x }; let mk = fn(x) { id(fn() { x }) };"
+                " mk(1) == mk(1)",
+                "false",
+            ),
+            # Impure callees make the caller impure.
+            (
+                "let twice = fn(f, x) { f(f(x)) }; let inc = fn(x) { x + 1 };"
+                " let g = fn(x) { twice(inc, x) }; g(1) + g(1)",
+                "6",
+            ),
+        ]
+        for source, expected in tests:
+            with self.subTest(source):
+                self.assertEqual(self._run(source), expected)
+        self.assertEqual(self.memo.hits, 0)
+
+    def test_bounded(self):
+        self._run(
+            "let sq = fn(x) { mul(x, x) }; let mul = fn(a, b) { a * b };"
+            " let loop = fn(n) { if (n == 0) { 0 } else { sq(n) + loop(n - 1) } };"
+            " loop(60)"
+        )
+        self.assertEqual(len(self.memo._entries), 64)
+
+    def test_holds_functions_weakly(self):
+        literal = _literal("fn(x) { g(x) }")
+        env = objmod.Environment()
+        fn = objmod.Function(literal.parameters, literal.body, env)
+        env.set("g", fn)
+        key = self.memo.key(fn, [objmod.integer(1)])
+        assert key is not None
+        self.memo.put(key, fn, objmod.integer(1))
+        self.assertEqual(self.memo.watched, {"g"})
+        del literal, env, fn
+        gc.collect()
+        self.assertEqual(self.memo._summaries, {})
+        self.assertEqual(self.memo.watched, set())
+        self.assertIsNone(self.memo.get(key))
+
+    def test_summaries_bounded(self):
+        memo = purity.Memo(maxsize=2)
+        evaluator.set_memo(memo)
+        bodies = [_literal(f"fn(x) {{ g(x) + {i} }}") for i in range(20)]
+        for literal in bodies:
+            env = objmod.Environment()
+            fn = objmod.Function(literal.parameters, literal.body, env)
+            memo.summary(fn)
+            self.assertLessEqual(len(memo._summaries), 8)
@@ -0,0 +1,22 @@
+import io
+import unittest
+from typing import List
+from monkey import engine
+from monkey import metrics
+from monkey import repl
+
+
+class TestRepl(unittest.TestCase):
+    def _lines(self, source: str, name: str, **kwargs) -> List[str]:
+        output = io.StringIO()
+        repl.start(io.StringIO(source), output, engine=name, **kwargs)
+        return output.getvalue().splitlines()
+
+    def test_prints_every_value(self):
+        source = "[]\nlet b = [];\nb\nrest([1])\n"
+        expected = ["[]", "null", "[]", "[]"]
+        for name in engine.ENGINES:
+            with self.subTest(engine=name):
+                self.assertEqual(self._lines(source, name), expected)
+                lines = self._lines(source, name, metrics=metrics.Metrics())
+                self.assertEqual(lines, expected)
@@ -0,0 +1,88 @@
+import unittest
+from typing import cast
+from monkey import ast
+from monkey import evaluator
+from monkey import lexer
+from monkey import obj as objmod
+from monkey import parser
+from monkey import resolver
+
+
+class TestResolver(unittest.TestCase):
+    def _resolve(self, input: str) -> ast.Program:
+        psr = parser.Parser(lexer.Lexer(input))
+        program = psr.parse()
+        self.assertEqual(psr.errors, [])
+        return resolver.Resolver().resolve(program)
+
+    def _eval(self, input: str) -> objmod.Object:
+        res = resolver.Resolver()
+        program = res.resolve(parser.Parser(lexer.Lexer(input)).parse())
+        return evaluator.eval(program, objmod.Frame(res.global_count))
+
+    def _identifier(self, stmt: ast.Statement) -> ast.ResolvedIdentifier:
+        expr = cast(ast.ExpressionStatement, stmt).expression
+        self.assertIsInstance(expr, ast.ResolvedIdentifier)
+        return cast(ast.ResolvedIdentifier, expr)
+
+    def test_slots(self):
+        program = self._resolve(
+            "let a = 1; let f = fn(x, y) { let z = 2; fn() { a; x; z } }; a"
+        )
+        let_f = cast(ast.LetStatement, program.statements[1])
+        self.assertEqual(cast(ast.ResolvedIdentifier, let_f.name).slot, 1)
+        outer = cast(ast.ResolvedFunctionLiteral, let_f.value)
+        self.assertEqual(outer.frame_size, 3)
+        inner = cast(
+            ast.ResolvedFunctionLiteral,
+            cast(ast.ExpressionStatement, outer.body.statements[1]).expression,
+        )
+        self.assertEqual(inner.frame_size, 0)
+        refs = [self._identifier(s) for s in inner.body.statements]
+        self.assertEqual([(r.depth, r.slot) for r in refs], [(2, 0), (1, 0), (1, 2)])
+        self.assertEqual(
+            str(program), "let a = 1;let f = fn (x, y) let z = 2;fn () axz;a"
+        )
+
+    def test_unbound_names_get_global_slots(self):
+        program = self._resolve("fn() { later }")
+        fn = cast(
+            ast.ResolvedFunctionLiteral,
+            cast(ast.ExpressionStatement, program.statements[0]).expression,
+        )
+        ref = self._identifier(fn.body.statements[0])
+        self.assertEqual((ref.depth, ref.slot), (1, 0))
+
+    def test_eval(self):
+        tests = [
+            ("let a = 5; let b = a; let c = a + b + 5; c;", 15),
+            ("let add = fn(x, y) { return x + y; }; add(5 + 5, add(5, 5));", 20),
+            ("let newAdder = fn(x) { fn(y) { x + y } }; newAdder(2)(3);", 5),
+            ("let f = fn() { g() }; let g = fn() { 7 }; f();", 7),
+            ("let x = 1; let f = fn() { let x = x + 10; x }; f() + x", 12),
+            (
+                "let f = fn(n) { let even = fn(n) {"
+                " if (n == 0) { 1 } else { odd(n - 1) } };"
+                "let odd = fn(n) { if (n == 0) { 0 } else { even(n - 1) } }; even(n) };"
+                "f(10)",
+                1,
+            ),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                evaluated = self._eval(input)
+                self.assertIsInstance(evaluated, objmod.Integer)
+                self.assertEqual(cast(objmod.Integer, evaluated).value, expected)
+
+    def test_errors(self):
+        tests = [
+            ("foobar", "identifier not found: foobar"),
+            ("fn() { if (false) { let y = 1; }; y }()", "identifier not found: y"),
+        ]
+        for input, expected_message in tests:
+            with self.subTest(input):
+                evaluated = self._eval(input)
+                self.assertIsInstance(evaluated, objmod.Error)
+                self.assertEqual(
+                    cast(objmod.Error, evaluated).message, expected_message
+                )
@@ -0,0 +1,71 @@
+import unittest
+from typing import cast
+from monkey import lexer
+from monkey import obj as objmod
+from monkey import parser
+from monkey import stack_evaluator
+
+
+class TestStackEvaluator(unittest.TestCase):
+    def _eval(self, input: str) -> objmod.Object:
+        psr = parser.Parser(lexer.Lexer(input))
+        program = psr.parse()
+        self.assertEqual(psr.errors, [])
+        return stack_evaluator.eval(program, objmod.Environment())
+
+    def assert_integer_object(self, obj: objmod.Object, expected: int):
+        self.assertIsInstance(obj, objmod.Integer)
+        self.assertEqual(cast(objmod.Integer, obj).value, expected)
+
+    def test_expressions(self):
+        tests = [
+            ("(5 + 10 * 2 + 15 / 3) * 2 + -10", 50),
+            ("let a = 5; let b = a; let c = a + b + 5; c;", 15),
+            ("if (1 > 2) { 10 } else { 20 }", 20),
+            ("9; return 10; 9", 10),
+            ("if (10 > 1) { if (10 > 1) { return 10; } return 1; }", 10),
+            ("let add = fn(x, y) { return x + y; }; add(5 + 5, add(5, 5));", 20),
+            ("let newAdder = fn(x) { fn(y) { x + y } }; newAdder(2)(3);", 5),
+            ("let f = fn(x) { if (x > 1) { return 1; } 2 }; f(5) + f(0)", 3),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assert_integer_object(self._eval(input), expected)
+
+    def test_booleans_and_null(self):
+        tests = [
+            ("(1 > 2) == false", objmod.TRUE),
+            ("!!5", objmod.TRUE),
+            ("if (false) { 10 }", objmod.NULL),
+            ("let a = 1;", objmod.NULL),
+            ("fn() { }()", objmod.NULL),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assertIs(self._eval(input), expected)
+
+    def test_errors(self):
+        tests = [
+            ("5 + true; 5;", "type mismatch: INTEGER + BOOLEAN"),
+            ("-true", "unknown operator: -BOOLEAN"),
+            (
+                "if (10 > 1) { return true + false; }",
+                "unknown operator: BOOLEAN + BOOLEAN",
+            ),
+            ("let f = fn() { foobar }; f(); 5", "identifier not found: foobar"),
+            ("let f = fn(x) { x }; f(1)(2)", "not a function: INTEGER"),
+        ]
+        for input, expected_message in tests:
+            with self.subTest(input):
+                evaluated = self._eval(input)
+                self.assertIsInstance(evaluated, objmod.Error)
+                self.assertEqual(
+                    cast(objmod.Error, evaluated).message, expected_message
+                )
+
+    def test_deep_recursion(self):
+        input = """
+        let depth = fn(n) { if (n == 0) { 0 } else { 1 + depth(n - 1) } };
+        depth(20000);
+        """
+        self.assert_integer_object(self._eval(input), 20000)
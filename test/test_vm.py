@@ -0,0 +1,273 @@
+import unittest
+from typing import cast
+from monkey import compiler
+from monkey import engine
+from monkey import lexer
+from monkey import obj as objmod
+from monkey import parser
+from monkey import vm
+
+
+class TestVM(unittest.TestCase):
+    def _run(self, input: str) -> objmod.Object:
+        psr = parser.Parser(lexer.Lexer(input))
+        program = psr.parse()
+        self.assertEqual(psr.errors, [])
+        comp = compiler.Compiler()
+        comp.compile(program)
+        return vm.VM(comp.bytecode()).run()
+
+    def assert_integer_object(self, obj: objmod.Object, expected: int):
+        self.assertIsInstance(obj, objmod.Integer)
+        self.assertEqual(cast(objmod.Integer, obj).value, expected)
+
+    def test_integer_arithmetic(self):
+        tests = [
+            ("5 + 5 + 5 + 5 - 10", 10),
+            ("-50 + 100 + -50", 0),
+            ("(5 + 10 * 2 + 15 / 3) * 2 + -10", 50),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assert_integer_object(self._run(input), expected)
+
+    def test_boolean_expressions(self):
+        tests = [
+            ("1 < 2", objmod.TRUE),
+            ("1 > 2", objmod.FALSE),
+            ("1 == 1", objmod.TRUE),
+            ("1 != 1", objmod.FALSE),
+            ("true != false", objmod.TRUE),
+            ("(1 > 2) == false", objmod.TRUE),
+            ("!5", objmod.FALSE),
+            ("!!true", objmod.TRUE),
+            ("!(if (false) { 5; })", objmod.TRUE),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assertIs(self._run(input), expected)
+
+    def test_conditionals_and_statements(self):
+        tests = [
+            ("if (1 > 2) { 10 }", objmod.NULL),
+            ("if (1 > 2) { 10 } else { 20 }", 20),
+            ("let a = 5;", objmod.NULL),
+            ("let a = 5; let b = a; let c = a + b + 5; c;", 15),
+            ("9; return 10; 9", 10),
+            ("if (10 > 1) { if (10 > 1) { return 10; } return 1; }", 10),
+            ("if (true) { let a = 3; }", objmod.NULL),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                result = self._run(input)
+                if isinstance(expected, int):
+                    self.assert_integer_object(result, expected)
+                else:
+                    self.assertIs(result, expected)
+
+    def test_functions(self):
+        tests = [
+            ("let identity = fn(x) { x; }; identity(5);", 5),
+            ("let add = fn(x, y) { return x + y; }; add(5 + 5, add(5, 5));", 20),
+            ("fn(x) { x; }(5);", 5),
+            ("let f = fn() { let a = 1; let b = 2; a + b }; f() + f()", 6),
+            ("let newAdder = fn(x) { fn(y) { x + y } }; newAdder(2)(3);", 5),
+            (
+                "let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };"
+                "fib(15);",
+                610,
+            ),
+            ("let f = fn() { g() }; let g = fn() { 7 }; f();", 7),
+            (
+                "let f = fn() { let g = fn() { h() }; let h = fn() { 9 }; g() };"
+                " f()",
+                9,
+            ),
+            ("let f = fn(x) { let g = fn() { x }; let x = 5; g() }; f(1)", 5),
+            ("let x = 1; let f = fn() { let y = x; let x = 2; y * 10 + x }; f()", 12),
+            ("let f = fn(x) { x }; f(1, 2)", 1),
+            ("let f = fn(x, y) { x }; f(3)", 3),
+            (
+                "let wrap = fn() { let count = fn(n) { if (n == 0) { 0 } "
+                "else { 1 + count(n - 1) } }; count(3) }; wrap();",
+                3,
+            ),
+        ]
+        for input, expected in tests:
+            with self.subTest(input):
+                self.assert_integer_object(self._run(input), expected)
+
+    def test_errors(self):
+        tests = [
+            ("5 + true;", "type mismatch: INTEGER + BOOLEAN"),
+            ("-true", "unknown operator: -BOOLEAN"),
+            ("5; true + false; 5", "unknown operator: BOOLEAN + BOOLEAN"),
+            (
+                "if (10 > 1) { return true + false; }",
+                "unknown operator: BOOLEAN + BOOLEAN",
+            ),
+            ("foobar", "identifier not found: foobar"),
+            ("let f = fn(x) { x }; f()", "identifier not found: x"),
+            (
+                "let f = fn() { let b = a; let a = 1; b }; f()",
+                "identifier not found: a",
+            ),
+            ("5()", "not a function: INTEGER"),
+        ]
+        for input, expected_message in tests:
+            with self.subTest(input):
+                evaluated = self._run(input)
+                self.assertIsInstance(evaluated, objmod.Error)
+                self.assertEqual(
+                    cast(objmod.Error, evaluated).message, expected_message
+                )
+
+
+class TestEngine(unittest.TestCase):
+    def test_engines_agree(self):
+        source = """
+        let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+        let twice = fn(f) { fn(x) { f(f(x)) } };
+        twice(fn(x) { x * 2 })(fib(10));
+        """
+        for name in engine.ENGINES:
+            with self.subTest(name):
+                result = engine.run(source, name)
+                self.assertEqual(cast(objmod.Integer, result).value, 220)
+
+    def test_functions_print_alike(self):
+        tests = [
+            "fn(x, y) { x + y }",
+            "let f = fn(n) { let g = fn() { n * 2 }; g }; f(1)",
+            "[fn() { 1 }]",
+        ]
+        for source in tests:
+            expected = str(engine.run(source, "eval"))
+            for name in engine.ENGINES:
+                with self.subTest(source=source, engine=name):
+                    self.assertEqual(str(engine.run(source, name)), expected)
+
+    def test_loops_and_assignment(self):
+        tests = [
+            ("let i = 0; let s = 0; while (i < 10) { i = i + 1; s = s + i; } s", "55"),
+            ("let i = 0; while (i < 3) { i = i + 1; }", "null"),
+            ("let x = 1; x = x + 1; x = x * 10; x", "20"),
+            (
+                "let f = fn(n) { let i = 0; while (true) {"
+                " if (i * i > n) { return i; } i = i + 1; } }; f(50)",
+                "8",
+            ),
+            (
+                "let f = fn(n) { let i = 0; while (i < n) { let k = i * 10;"
+                " i = i + 1; } k }; f(4)",
+                "30",
+            ),
+            ("let x = 1; let f = fn() { x = x + 1; x }; f(); f() + x", "6"),
+            (
+                "let counter = fn() { let n = 0; fn() { n = n + 1; n } };"
+                " let c = counter(); c(); c(); c()",
+                "3",
+            ),
+            ("let f = fn() { 1 }; let g = fn() { f() }; g(); f = fn() { 2 }; g()", "2"),
+            ("let f = fn() { let a = 1; let g = fn() { a }; a = 2; g() }; f()", "2"),
+            (
+                "let f = fn() { let x = 1; let g = fn(n) { n + x }; let a = g(1);"
+                " x = 5; a * 100 + g(1) }; f()",
+                "206",
+            ),
+            (
+                "let mk = fn() { let n = 0; [fn() { n = n + 1; }, fn() { n }] };"
+                " let p = mk(); p[0](); p[0](); p[1]()",
+                "2",
+            ),
+            (
+                "let f = fn() { let i = 0; let fs = []; while (i < 3) {"
+                " fs = push(fs, fn() { i }); i = i + 1; } fs[0]() + fs[2]() }; f()",
+                "6",
+            ),
+            (
+                "let f = fn(n) { let g = fn() { n = n * 2; }; g(); g(); n }; f(3)",
+                "12",
+            ),
+            ("y = 1", "ERROR: identifier not found: y"),
+            ("let f = fn() { z = 1; }; f()", "ERROR: identifier not found: z"),
+            ("while (1 + true) { 1 }", "ERROR: type mismatch: INTEGER + BOOLEAN"),
+        ]
+        for source, expected in tests:
+            for name in engine.ENGINES:
+                with self.subTest(source=source, engine=name):
+                    self.assertEqual(str(engine.run(source, name)), expected)
+                    result = engine.run(source, name, optimize=False)
+                    self.assertEqual(str(result), expected)
+
+    def test_arrays_and_builtins(self):
+        tests = [
+            ("[1, 2 * 2, 3 + 3]", "[1, 4, 6]"),
+            ("let a = [1, 2, 3]; a[0] + a[1] + a[2]", "6"),
+            ("[1, 2, 3][3]", "null"),
+            ("[1, 2, 3][-1]", "null"),
+            ("[1, true, fn(x) { x }][2](5)", "5"),
+            ("len([1, 2, 3]) + len([])", "3"),
+            ("first([7, 8])", "7"),
+            ("first([])", "null"),
+            ("rest([1, 2, 3])", "[2, 3]"),
+            ("rest([])", "null"),
+            ("push([1, 2], 3)", "[1, 2, 3]"),
+            ("push([1], true)", "[1, true]"),
+            ("push([1], 9223372036854775808)", "[1, 9223372036854775808]"),
+            ("map([1, 2, 3], fn(x) { x * 2 })", "[2, 4, 6]"),
+            ("map([[1, 2], [3]], len)", "[2, 1]"),
+            ("reduce([1, 2, 3, 4], 0, fn(acc, x) { acc + x })", "10"),
+            ("sum([1, 2, 3]) + sum([])", "6"),
+            ("let len = fn(x) { 42 }; len([1])", "42"),
+            (
+                "let s = fn(a) {"
+                " if (len(a) == 0) { 0 } else { first(a) + s(rest(a)) } };"
+                " s([1, 2, 3, 4])",
+                "10",
+            ),
+            (
+                "let a = []; let i = 0;"
+                " while (i < 4) { a = push(a, i * i); i = i + 1; } a[3]",
+                "9",
+            ),
+            ("let mk = fn() { let x = 3; [fn() { x }] }; mk()[0]()", "3"),
+            (
+                "let f = fn(n) { let g = fn(k) { if (k == 0) { n } else { g(k - 1) } };"
+                " [g] }; f(7)[0](3)",
+                "7",
+            ),
+            ("1[0]", "ERROR: index operator not supported: INTEGER"),
+            ("[1][true]", "ERROR: index operator not supported: ARRAY"),
+            ("len(1)", "ERROR: argument to `len` not supported, got INTEGER"),
+            ("len([1], [2])", "ERROR: wrong number of arguments: want=1, got=2"),
+            ("push(1, 1)", "ERROR: argument to `push` must be ARRAY, got INTEGER"),
+            (
+                "sum([1, true])",
+                "ERROR: argument to `sum` must hold INTEGER, got BOOLEAN",
+            ),
+            ("map([1], fn(x) { x + true })", "ERROR: type mismatch: INTEGER + BOOLEAN"),
+            ("map([1, 2], 3)", "ERROR: not a function: INTEGER"),
+        ]
+        for source, expected in tests:
+            for name in engine.ENGINES:
+                with self.subTest(source=source, engine=name):
+                    self.assertEqual(str(engine.run(source, name)), expected)
+                    result = engine.run(source, name, optimize=False)
+                    self.assertEqual(str(result), expected)
+
+    def test_engine_keeps_globals(self):
+        for name in engine.ENGINES:
+            with self.subTest(name):
+                eng = engine.new_engine(name)
+                eng.run(engine.parse("let a = 40;"))
+                result = eng.run(engine.parse("a + 2"))
+                self.assertEqual(cast(objmod.Integer, result).value, 42)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            engine.new_engine("nope")
+
+    def test_parse_error(self):
+        with self.assertRaises(engine.ParseError):
+            engine.run("let = 5;")